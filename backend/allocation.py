@@ -0,0 +1,167 @@
+"""
+Shelter and hospital allocation for survival zones
+Splits each damage ring into demand sectors, assigns the ring population to the
+nearest shelters and the injured to the nearest hospitals with spare capacity,
+and derives per-zone survival from the resulting coverage.
+"""
+
+import heapq
+import time
+
+import numpy as np
+
+import city_assets
+
+SECTORS_PER_RING = 24
+EPSILON = 1e-9
+
+# per-zone parameters a scenario model may set (fractions); used when a zone omits them
+ZONE_DEFAULTS = {
+    'shelter_protection': 0.5,   # share of otherwise-fatal outcomes a shelter place prevents
+    'injury_rate': 0.1,          # share of the ring population needing a hospital bed
+    'treatment_benefit': 0.3     # share of otherwise-fatal outcomes hospital care prevents
+}
+
+
+def assign_nearest(demand_x, demand_y, demand, facility_x, facility_y, capacity, reach_km):
+    """Capacity-limited nearest-facility assignment.
+
+    Greedy over (demand point, facility) pairs within reach in order of distance: the
+    closest open pair takes as much as both sides have left, so every step either
+    serves a demand point completely or fills a facility and the pass ends after at
+    most demand points + facilities steps. Returns (served per demand point, load per
+    facility, mean assigned distance in km).
+    """
+    remaining = np.asarray(demand, dtype=float).tolist()
+    spare = np.asarray(capacity, dtype=float).copy()
+    served = np.zeros(len(remaining))
+    if len(remaining) == 0 or len(spare) == 0:
+        return served, np.zeros(len(spare)), 0.0
+
+    dist = np.hypot(np.asarray(demand_x)[:, None] - np.asarray(facility_x)[None, :],
+                    np.asarray(demand_y)[:, None] - np.asarray(facility_y)[None, :])
+    # each demand point's reachable facilities, nearest first
+    order = np.argsort(dist, axis=1)
+    ranked = np.take_along_axis(dist, order, axis=1)
+    reachable = (dist <= reach_km).sum(axis=1).tolist()
+    is_open = spare > EPSILON
+
+    def next_open(point, start):
+        """Position of the point's nearest facility with spare capacity from start on"""
+        candidates = is_open[order[point, start:reachable[point]]]
+        first = int(candidates.argmax()) if len(candidates) else 0
+        return start + first if len(candidates) and candidates[first] else None
+
+    # one entry per unserved demand point: (distance, point, position in its facility order)
+    heap = [(float(ranked[p, 0]), p, 0) for p in range(len(remaining))
+            if reachable[p] and remaining[p] > EPSILON]
+    heapq.heapify(heap)
+    distance_sum = 0.0
+    while heap:
+        km, point, position = heapq.heappop(heap)
+        facility = order[point, position]
+        if is_open[facility]:
+            amount = min(remaining[point], spare[facility])
+            remaining[point] -= amount
+            spare[facility] -= amount
+            is_open[facility] = spare[facility] > EPSILON
+            served[point] += amount
+            distance_sum += amount * km
+            if remaining[point] <= EPSILON:
+                continue
+        # the facility is full (possibly filled by a closer pair since this one was queued)
+        position = next_open(point, position + 1)
+        if position is not None:
+            heapq.heappush(heap, (float(ranked[point, position]), point, position))
+
+    total = served.sum()
+    return served, np.asarray(capacity, dtype=float) - spare, distance_sum / total if total > 0 else 0.0
+
+
+def _ring_sectors(zones, city_data):
+    """Demand points (x, y km), populations and zone index for every ring sector"""
+    city_radius = city_assets.city_radius_km(city_data)
+    density = city_data['population'] / city_data['area_km2']
+    angles = 2 * np.pi * (np.arange(SECTORS_PER_RING) + 0.5) / SECTORS_PER_RING
+    xs, ys, pops, zone_index = [], [], [], []
+    inner = 0.0
+    for i, zone in enumerate(zones):
+        outer = max(inner, float(zone['radius']))
+        # only the part of the ring inside the built-up area is populated
+        lo, hi = min(inner, city_radius), min(outer, city_radius)
+        population = density * np.pi * (hi ** 2 - lo ** 2)
+        mid = (lo + hi) / 2 if hi > lo else (inner + outer) / 2
+        xs.append(mid * np.cos(angles))
+        ys.append(mid * np.sin(angles))
+        pops.append(np.full(SECTORS_PER_RING, population / SECTORS_PER_RING))
+        zone_index.append(np.full(SECTORS_PER_RING, i))
+        inner = outer
+    return np.concatenate(xs), np.concatenate(ys), np.concatenate(pops), np.concatenate(zone_index)
+
+
+def _surviving_capacity(zones, facility_x, facility_y, capacity):
+    """Facility capacity scaled by the baseline survival of the zone it stands in"""
+    distance = np.hypot(facility_x, facility_y)
+    radii = np.array([float(z['radius']) for z in zones])
+    survival = np.array([float(z['survival_rate']) for z in zones] + [100.0]) / 100.0
+    return capacity * survival[np.searchsorted(radii, distance)]
+
+
+def allocate_zone_resources(zones, city_id, city_data, shelter_reach_km=5.0, hospital_reach_km=50.0):
+    """Survival zones with shelter/hospital coverage and survival derived from the assignment"""
+    started = time.perf_counter()
+    facilities = city_assets.load_facilities(city_id, city_data)
+    x, y, population, zone_of = _ring_sectors(zones, city_data)
+
+    params = {key: np.array([float(z.get(key, default)) for z in zones]) for key, default in ZONE_DEFAULTS.items()}
+    injured = population * params['injury_rate'][zone_of]
+
+    results = {}
+    for kind, demand, reach in (('shelter', population, shelter_reach_km), ('hospital', injured, hospital_reach_km)):
+        mask = facilities['kind'] == kind
+        capacity = _surviving_capacity(zones, facilities['x'][mask], facilities['y'][mask], facilities['capacity'][mask])
+        served, load, mean_km = assign_nearest(x, y, demand, facilities['x'][mask], facilities['y'][mask], capacity, reach)
+        results[kind] = {
+            'served': np.bincount(zone_of, weights=served, minlength=len(zones)),
+            'demand': np.bincount(zone_of, weights=demand, minlength=len(zones)),
+            'summary': {
+                'facilities': int(mask.sum()),
+                'operational_capacity': round(float(capacity.sum())),
+                'assigned': round(float(served.sum())),
+                'facilities_full': int(((capacity - load) <= EPSILON).sum() - (capacity <= EPSILON).sum()),
+                'mean_distance_km': round(mean_km, 2)
+            }
+        }
+
+    shelter_cover = np.divide(results['shelter']['served'], results['shelter']['demand'],
+                              out=np.zeros(len(zones)), where=results['shelter']['demand'] > 0)
+    hospital_cover = np.divide(results['hospital']['served'], results['hospital']['demand'],
+                               out=np.zeros(len(zones)), where=results['hospital']['demand'] > 0)
+    baseline_fatality = 1.0 - np.array([float(z['survival_rate']) for z in zones]) / 100.0
+    fatality = (baseline_fatality
+                * (1.0 - params['shelter_protection'] * shelter_cover)
+                * (1.0 - params['treatment_benefit'] * hospital_cover))
+
+    allocated = []
+    for i, zone in enumerate(zones):
+        entry = {k: v for k, v in zone.items() if k not in ZONE_DEFAULTS}
+        entry['baseline_survival_rate'] = zone['survival_rate']
+        entry['survival_rate'] = round(float(100.0 * (1.0 - fatality[i])), 1)
+        # coverage is undefined for rings with nobody living in them (beyond the built-up area)
+        populated = results['shelter']['demand'][i] > 0
+        entry['factors'] = dict(zone.get('factors', {}),
+                                shelters=round(float(100 * shelter_cover[i])) if populated else None,
+                                hospitals=round(float(100 * hospital_cover[i])) if populated else None)
+        entry['population'] = round(float(results['shelter']['demand'][i]))
+        entry['sheltered'] = round(float(results['shelter']['served'][i]))
+        entry['injured'] = round(float(results['hospital']['demand'][i]))
+        entry['treated'] = round(float(results['hospital']['served'][i]))
+        allocated.append(entry)
+
+    summary = {
+        'shelters': results['shelter']['summary'],
+        'hospitals': results['hospital']['summary'],
+        'facility_source': facilities['source'],
+        'compute_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+    return allocated, summary
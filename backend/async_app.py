@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Async serving path for the Impact Simulator backend
+ASGI app that serves the I/O-bound endpoints natively (NASA via httpx, Gemini via
+generate_content_async) and mounts the existing Flask app for every other route.
+
+Run with:
+    uvicorn async_app:app --host 0.0.0.0 --port 5000
+    gunicorn -k uvicorn.workers.UvicornWorker async_app:app
+"""
+
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+import enhanced_app as core
+import briefings
+import neo_catalog
+import neo_feed
+from scenario_model import ScenarioModelError
+
+logger = logging.getLogger(__name__)
+
+NASA_TIMEOUT = 10
+MAX_UPSTREAM_CONNECTIONS = int(os.getenv('MAX_UPSTREAM_CONNECTIONS', '1000'))
+PHYSICS_WORKERS = int(os.getenv('PHYSICS_WORKERS', str(os.cpu_count() or 4)))
+NEO_STREAM_POLL_SECONDS = float(os.getenv('NEO_STREAM_POLL_SECONDS', '60'))
+NEO_STREAM_HEARTBEAT_SECONDS = 15
+
+# CPU-bound scoring/physics runs here so it never stalls the event loop
+physics_executor = ThreadPoolExecutor(max_workers=PHYSICS_WORKERS, thread_name_prefix='physics')
+
+
+class AsyncNASADataService:
+    """Awaitable NASA NEO client sharing one pooled HTTP connection set"""
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.client = None
+
+    async def start(self):
+        limits = httpx.Limits(max_connections=MAX_UPSTREAM_CONNECTIONS,
+                              max_keepalive_connections=min(100, MAX_UPSTREAM_CONNECTIONS))
+        self.client = httpx.AsyncClient(timeout=NASA_TIMEOUT, limits=limits)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def get(self, url, params=None):
+        return await self.client.get(url, params=params)
+
+    async def get_neo_lookup(self, asteroid_id):
+        """Fetch detailed asteroid data from NASA NEO API"""
+        try:
+            response = await self.get(core.nasa_service.lookup_url(asteroid_id), params={"api_key": self.api_key})
+            response.raise_for_status()
+            return await run_physics(lambda: neo_catalog.compact_record(response.json()))
+        except httpx.HTTPError as e:
+            logger.error(f"NASA API request failed for asteroid {asteroid_id}: {e}")
+            return {"error": str(e)}
+        except Exception as e:
+            logger.error(f"Unexpected error fetching asteroid {asteroid_id}: {e}")
+            return {"error": str(e)}
+
+
+nasa = AsyncNASADataService(core.NASA_API_KEY)
+
+
+async def run_physics(fn, *args, **kwargs):
+    """Run a CPU-bound helper on the physics executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(physics_executor, functools.partial(fn, *args, **kwargs))
+
+
+async def generate_ai_text(prompt):
+    """Awaitable Gemini call; returns the response text"""
+    response = await core.model.generate_content_async(prompt)
+    return response.text
+
+
+# in-flight Gemini calls in this worker, by cache key
+ai_tasks = {}
+
+
+async def complete_ai_call(key, prompt, parse):
+    try:
+        value = parse(await generate_ai_text(prompt))
+    except Exception as e:
+        logger.error(f"Gemini API error for {key}: {e}")
+        value = None
+    core.ai_finish(key, value)
+    ai_tasks.pop(key, None)
+    return value
+
+
+async def hedged_ai(key, make_prompt, parse):
+    """Awaitable counterpart of core.hedged_ai: a call that misses the deadline keeps
+    running (shielded) and caches its answer for the next request"""
+    state, value = await run_physics(core.ai_state, key)
+    if state == 'ready':
+        return value, 'ready'
+    if core.model is None or state == 'failed':
+        return None, 'unavailable'
+    task = ai_tasks.get(key)
+    if task is None:
+        if state == 'pending':
+            return None, 'pending'
+        await run_physics(core.ai_begin, key)
+        prompt = await run_physics(make_prompt)
+        task = ai_tasks[key] = asyncio.create_task(complete_ai_call(key, prompt, parse))
+    try:
+        value = await asyncio.wait_for(asyncio.shield(task), core.AI_DEADLINE_SECONDS)
+    except asyncio.TimeoutError:
+        return None, 'pending'
+    return (value, 'ready') if value is not None else (None, 'unavailable')
+
+
+async def read_json(request):
+    """Request body as a dict (mirrors Flask's get_json for an empty body)"""
+    body = await request.body()
+    return await request.json() if body else None
+
+
+def error_response(message, status_code=500):
+    return JSONResponse({'success': False, 'error': message}, status_code=status_code)
+
+
+async def fetch_neo_feed():
+    """Current 7-day NASA feed; one fetch per TTL serves every worker. The shared-store
+    reads and writes (unpickling, a file lock) and the catalogue merge stay off the loop."""
+    start_date, end_date = core.feed_date_range()
+    feed_key = f"neo_feed_{start_date}_{end_date}"
+    hit, feed = await run_physics(core.cache_lookup, feed_key, core.NEO_CACHE_TTL)
+    if not hit:
+        response = await nasa.get(core.nasa_service.feed_url(start_date, end_date))
+        if response.status_code != 200:
+            raise core.UpstreamError(f'NASA API error: {response.status_code}')
+        feed = await run_physics(lambda: neo_catalog.compact_feed(response.json()))
+        await run_physics(core.cache_store, feed_key, feed)
+    await run_physics(core.catalog_feed, feed_key, feed, not hit)
+    return feed
+
+
+async def score_neo_feed(feed, model):
+    return await run_physics(core.score_hazardous_asteroids, feed, core.scenario_models.get(model))
+
+
+# One poller for the live feed, shared by every stream subscriber in this worker
+neo_hub = neo_feed.NEOFeedHub(fetch_neo_feed, score_neo_feed, NEO_STREAM_POLL_SECONDS)
+
+
+async def get_hazardous_asteroids(request):
+    """Get hazardous Near Earth Objects from NASA API"""
+    try:
+        scenario = core.scenario_models.get(request.query_params.get('model', core.DEFAULT_SCENARIO_MODEL))
+        feed = await fetch_neo_feed()
+        return JSONResponse(await run_physics(core.build_hazardous_asteroids, feed, scenario))
+
+    except ScenarioModelError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response(str(e))
+
+
+def stream_model(params):
+    """Scenario model named by a stream request (validated before subscribing)"""
+    model = params.get('model', core.DEFAULT_SCENARIO_MODEL)
+    core.scenario_models.get(model)
+    return model
+
+
+async def neo_stream(request):
+    """Server-sent events: a snapshot of the hazardous objects, then only what changes.
+    Query: model (optional scenario model)
+    """
+    try:
+        model = stream_model(request.query_params)
+    except ScenarioModelError as e:
+        return error_response(str(e), 400)
+
+    async def events():
+        subscriber = neo_hub.subscribe(model)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.next(), NEO_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b': keep-alive\n\n'
+                    continue
+                yield message.sse
+        finally:
+            neo_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def neo_socket(websocket):
+    """WebSocket version of /api/neo/stream (same messages, as text frames)"""
+    try:
+        model = stream_model(websocket.query_params)
+    except ScenarioModelError as e:
+        await websocket.close(code=1008, reason=str(e)[:120])
+        return
+    await websocket.accept()
+    subscriber = neo_hub.subscribe(model)
+
+    async def send():
+        while True:
+            await websocket.send_text((await subscriber.next()).text)
+
+    async def receive():
+        # clients have nothing to say; this only notices the disconnect
+        with contextlib.suppress(WebSocketDisconnect):
+            while True:
+                await websocket.receive_text()
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        neo_hub.unsubscribe(subscriber)
+
+
+async def neo_stream_stats(request):
+    """Live feed poller state and subscriber counts for this worker"""
+    return JSONResponse({'success': True, 'stream': neo_hub.stats()})
+
+
+async def get_neo_statistics(request):
+    """Get comprehensive NEO statistics"""
+    try:
+        hit, stats = await run_physics(core.cache_lookup, 'neo_stats', core.NEO_CACHE_TTL)
+        if not hit:
+            response = await nasa.get(core.nasa_service.stats_url())
+            if response.status_code != 200:
+                return error_response(f'NASA API error: {response.status_code}')
+            stats = await run_physics(response.json)
+            await run_physics(core.cache_store, 'neo_stats', stats)
+
+        try:
+            await fetch_neo_feed()
+        except (core.UpstreamError, httpx.HTTPError) as e:
+            # the catalogue keeps what earlier feeds put in it
+            logger.warning(f"NEO feed unavailable for statistics: {e}")
+        return JSONResponse(await run_physics(core.build_neo_statistics, stats, neo_catalog.current()))
+    except Exception as e:
+        return error_response(str(e))
+
+
+async def ai_risk_analysis(request):
+    """AI-powered city risk analysis using Gemini.
+    Body: city_id, asteroid_size
+    analysis.ai_status is 'ready' (AI text), 'unavailable' (templated briefing only) or
+    'pending': Gemini is still answering, the briefing is templated for now and the same
+    request repeated a few seconds later returns the cached answer. Clients re-send only
+    while the status is 'pending'.
+    """
+    try:
+        data = await read_json(request)
+        city_id = data.get('city_id', 'new-york')
+        asteroid_size = data.get('asteroid_size', 100)
+
+        city_data = core.get_city(city_id)
+        key, bucket = briefings.bucket_key('risk', city_id, asteroid_size)
+        ai_analysis, ai_status = await hedged_ai(
+            key, lambda: core.build_risk_prompt(city_data, bucket['diameter_m']), briefings.parse_briefing)
+
+        return JSONResponse(await run_physics(core.build_risk_analysis, city_data, asteroid_size,
+                                              ai_analysis, ai_status, bucket))
+
+    except Exception as e:
+        return error_response(str(e))
+
+
+async def ai_mitigations(request):
+    """Generate technical and civil protection mitigations using Gemini, strictly grounded to provided data.
+    Body: city_id, asteroid_size, velocity
+    ai_status follows the risk-analysis contract: while it is 'pending' the mitigations are
+    templated and the same request repeated a few seconds later picks up the AI fields.
+    """
+    try:
+        data = await read_json(request)
+        city_id = data.get('city_id', 'new-york')
+        asteroid_size = data.get('asteroid_size', 100)
+        velocity = data.get('velocity', 20)
+
+        city_data = core.get_city(city_id)
+        base_context = await run_physics(core.build_mitigation_context, city_data, asteroid_size, velocity)
+
+        key, bucket = briefings.bucket_key('mitigations', city_id, asteroid_size, velocity)
+        ai, ai_status = await hedged_ai(key, lambda: core.build_mitigation_prompt(
+            core.build_mitigation_context(city_data, bucket['diameter_m'], bucket['velocity_km_s'])),
+            briefings.parse_mitigations)
+
+        return JSONResponse(await run_physics(core.build_mitigations, base_context, ai, ai_status, bucket))
+    except Exception as e:
+        return error_response(str(e))
+
+
+async def asteroid_physics(request):
+    """Same contract as the Flask /api/physics/asteroid endpoint"""
+    asteroid_id = request.query_params.get("asteroid_id") or request.query_params.get("designation")
+    if not asteroid_id:
+        return JSONResponse({"error": "Provide asteroid_id or designation query param"}, status_code=400)
+
+    cache_key = f"physics_{asteroid_id}"
+    hit, data = await run_physics(core.cache_lookup, cache_key, 300)
+    if not hit:
+        data = await nasa.get_neo_lookup(asteroid_id)
+        await run_physics(core.cache_store, cache_key, data)
+
+    if not data or "error" in data:
+        return JSONResponse({"error": "Failed to fetch asteroid data", "details": data}, status_code=500)
+
+    await run_physics(neo_catalog.ingest, [data])
+    return JSONResponse(await run_physics(core.build_asteroid_physics, asteroid_id, data))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await nasa.start()
+    try:
+        yield
+    finally:
+        await neo_hub.close()
+        await nasa.close()
+        physics_executor.shutdown(wait=False)
+
+
+routes = [
+    Route('/api/neo/hazardous', get_hazardous_asteroids, methods=['GET']),
+    Route('/api/neo/stats', get_neo_statistics, methods=['GET']),
+    Route('/api/neo/stream', neo_stream, methods=['GET']),
+    Route('/api/neo/stream/stats', neo_stream_stats, methods=['GET']),
+    WebSocketRoute('/api/neo/ws', neo_socket),
+    Route('/api/physics/asteroid', asteroid_physics, methods=['GET']),
+    Route('/api/ai/risk-analysis', ai_risk_analysis, methods=['POST']),
+    Route('/api/ai/mitigations', ai_mitigations, methods=['POST']),
+    # Everything else is served by the existing Flask app on a worker thread
+    Mount('/', app=WsgiToAsgi(core.app)),
+]
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])]
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🚀 Async Impact Simulator Backend Starting (ASGI)...")
+    uvicorn.run(app, host='0.0.0.0', port=int(os.getenv('PORT', '5000')))
@@ -0,0 +1,228 @@
+"""
+Grounded briefings and AI response handling
+Risk briefings and mitigation plans are rendered from the simulator's own numbers by
+templates parsed once at import, so a complete answer never waits on the network.
+Gemini output is parsed against a fixed schema and cached per (city, size bucket,
+velocity bucket), so one call serves every similar request.
+"""
+
+import json
+import math
+import string
+
+SIZE_BUCKET_DEX = 0.1            # ~26% wide diameter buckets
+VELOCITY_BUCKET_KM_S = 2.0
+MITIGATION_KEYS = ('technical_mitigations', 'civil_mitigations', 'priority_actions')
+MAX_ITEMS = 8
+MAX_ITEM_CHARS = 300
+MAX_RATIONALE_CHARS = 1200
+
+METHOD_LABELS = {
+    'kinetic_impactor': 'Kinetic impactor',
+    'gravity_tractor': 'Gravity tractor',
+    'nuclear_standoff': 'Nuclear standoff detonation'
+}
+
+CONTEXT_FIELDS = frozenset((
+    'name', 'population', 'density', 'area_km2', 'diameter_m', 'velocity_km_s', 'energy_mt',
+    'fireball_km', 'thermal_km', 'shock_km', 'airblast_km', 'crater_km', 'evac_km', 'shock_cover_pct',
+    'exposed', 'hospitals', 'persons_per_hospital', 'shelters', 'persons_per_shelter', 'routes',
+    'preparedness', 'infrastructure', 'elevation', 'scale', 'method', 'lead_years'
+))
+
+
+class Template:
+    """A str.format template parsed once; rendering only formats values and joins"""
+
+    def __init__(self, text):
+        self.parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            if field is not None and (field not in CONTEXT_FIELDS or conversion):
+                raise ValueError(f"Unknown briefing field '{field}'")
+            self.parts.append((literal, field, spec or ''))
+
+    def render(self, context):
+        return ''.join(literal + (format(context[field], spec) if field is not None else '')
+                       for literal, field, spec in self.parts)
+
+
+def _rules(*rules):
+    """(predicate or None, template text) pairs, compiled"""
+    return [(predicate, Template(text)) for predicate, text in rules]
+
+
+def _render(rules, context):
+    return [template.render(context) for predicate, template in rules
+            if predicate is None or predicate(context)]
+
+
+RISK_RULES = _rules(
+    (None, "{name} ({population:,} residents, {density:,.0f} people/km²) faces a {diameter_m:,.0f} m "
+           "impactor releasing about {energy_mt:,.1f} Mt TNT, a {scale} event."),
+    (None, "The shockwave radius of {shock_km:.1f} km covers {shock_cover_pct:.0f}% of the city's "
+           "{area_km2:,.0f} km², putting roughly {exposed:,.0f} people inside the severe blast zone; "
+           "thermal burns extend to {thermal_km:.1f} km."),
+    (lambda c: c['coastal'], "As a coastal city, {name} must also plan for tsunami run-up and "
+                             "flooding of low-lying districts."),
+    (lambda c: c['preparedness'] < 70, "Emergency preparedness scores only {preparedness}/100, so a "
+                                       "unified command and public warning should be stood up first."),
+    (lambda c: c['preparedness'] >= 70, "Preparedness of {preparedness}/100 supports a coordinated "
+                                        "response if warning time allows."),
+    (lambda c: c['persons_per_hospital'] > 100000, "With {hospitals} hospitals (about "
+                                                   "{persons_per_hospital:,.0f} residents each), "
+                                                   "casualties will far exceed local medical capacity."),
+    (lambda c: c['persons_per_hospital'] <= 100000, "{hospitals} hospitals give a reasonable base for "
+                                                    "triage outside the damage zone."),
+    (None, "Evacuation over {routes} routes should clear everyone to beyond {evac_km:.0f} km of the "
+           "predicted impact point.")
+)
+
+TECHNICAL_RULES = _rules(
+    (None, "Extend survey and tracking to refine the impact corridor and warning time"),
+    (lambda c: c['energy_mt'] >= 1, "Prepare a rapid-launch reconnaissance mission to characterise "
+                                    "the {diameter_m:,.0f} m object")
+)
+METHOD_RULE = Template("{method}: workable with at least {lead_years:.1f} years of lead time")
+
+CIVIL_RULES = _rules(
+    (None, "Evacuate in concentric zones out to {evac_km:.0f} km, clearing the {shock_km:.1f} km "
+           "shockwave zone first"),
+    (None, "Open {shelters} shelters (about {persons_per_shelter:,.0f} residents each) for those who "
+           "cannot leave"),
+    (lambda c: c['shock_cover_pct'] >= 100, "All {hospitals} city hospitals lie inside the blast zone; "
+                                            "stage regional triage and medical surge beyond {evac_km:.0f} km"),
+    (lambda c: c['shock_cover_pct'] < 100, "Set up triage beyond {evac_km:.0f} km and shift patients to "
+                                           "city hospitals outside the blast zone"),
+    (lambda c: c['coastal'], "Activate tsunami protocols and move coastal residents to high ground"),
+    (lambda c: c['infrastructure'] < 80, "Stockpile fuel, water and backup power; infrastructure "
+                                         "scores {infrastructure}/100")
+)
+
+PRIORITY_RULES = _rules(
+    (None, "Issue public guidance and activate the emergency operations centre"),
+    (None, "Pre-stage evacuation of the {shock_km:.1f} km shockwave zone ({exposed:,.0f} people)"),
+    (lambda c: c['coastal'], "Warn coastal districts of tsunami risk"),
+    (lambda c: not c['coastal'], "Secure hospitals, fuel, water and shelters")
+)
+
+
+def impact_scale(energy_mt):
+    if energy_mt < 1:
+        return 'local'
+    if energy_mt < 100:
+        return 'city-scale'
+    if energy_mt < 100000:
+        return 'regional'
+    return 'global'
+
+
+def briefing_context(city_data, physics):
+    """Flat numbers the templates are grounded to"""
+    city_radius = math.sqrt(city_data['area_km2'] / math.pi)
+    cover = min(1.0, (physics['shockwave_radius_km'] / max(city_radius, 1e-9)) ** 2)
+    population = city_data['population']
+    return {
+        'name': city_data['name'],
+        'population': population,
+        'density': city_data['population_density'],
+        'area_km2': city_data['area_km2'],
+        'coastal': bool(city_data['coastal']),
+        'elevation': city_data['elevation'],
+        'diameter_m': physics['diameter_m'],
+        'velocity_km_s': physics['velocity_km_s'],
+        'energy_mt': physics['kinetic_energy_mt'],
+        'fireball_km': physics['fireball_radius_km'],
+        'thermal_km': physics['thermal_radius_km'],
+        'shock_km': physics['shockwave_radius_km'],
+        'airblast_km': physics['airblast_radius_km'],
+        'crater_km': physics['crater_diameter_km'],
+        'evac_km': max(physics['thermal_radius_km'], physics['shockwave_radius_km']),
+        'shock_cover_pct': cover * 100,
+        'exposed': population * cover,
+        'hospitals': city_data['hospitals'],
+        'persons_per_hospital': population / max(city_data['hospitals'], 1),
+        'shelters': city_data['shelters'],
+        'persons_per_shelter': population / max(city_data['shelters'], 1),
+        'routes': city_data['evacuation_routes'],
+        'preparedness': city_data['emergency_preparedness'],
+        'infrastructure': city_data['infrastructure_score'],
+        'scale': impact_scale(physics['kinetic_energy_mt'])
+    }
+
+
+def risk_briefing(context):
+    return ' '.join(_render(RISK_RULES, context))
+
+
+def mitigation_plan(context, deflection_summary):
+    """Technical, civil and priority actions from the context and deflection lead times"""
+    technical = _render(TECHNICAL_RULES, context)
+    lead_times = deflection_summary['min_lead_time_years']
+    for method, years in sorted(lead_times.items(), key=lambda item: (item[1] is None, item[1])):
+        if years is not None:
+            technical.append(METHOD_RULE.render(dict(context, method=METHOD_LABELS.get(method, method),
+                                                     lead_years=years)))
+    return {
+        'technical_mitigations': technical,
+        'civil_mitigations': _render(CIVIL_RULES, context),
+        'priority_actions': _render(PRIORITY_RULES, context)[:3],
+        'rationale': 'Rendered from the simulated radii and energy, the city catalogue and the '
+                     'deflection trade study.'
+    }
+
+
+def bucket_key(kind, city_id, diameter_m, velocity_km_s=None):
+    """Cache key and the bucket-centre parameters the AI is asked about"""
+    size_bucket = round(math.log10(max(float(diameter_m), 1e-3)) / SIZE_BUCKET_DEX)
+    centre = {'diameter_m': round(10 ** (size_bucket * SIZE_BUCKET_DEX), 1)}
+    key = f"ai:{kind}:{city_id}:{size_bucket}"
+    if velocity_km_s is not None:
+        velocity_bucket = round(float(velocity_km_s) / VELOCITY_BUCKET_KM_S)
+        centre['velocity_km_s'] = velocity_bucket * VELOCITY_BUCKET_KM_S
+        key += f":{velocity_bucket}"
+    return key, centre
+
+
+def _json_objects(text):
+    """Every top-level JSON object embedded in text, in order"""
+    decoder = json.JSONDecoder()
+    position = text.find('{')
+    while position != -1:
+        try:
+            obj, end = decoder.raw_decode(text, position)
+        except ValueError:
+            position = text.find('{', position + 1)
+            continue
+        if isinstance(obj, dict):
+            yield obj
+        position = text.find('{', end)
+
+
+def _clean_items(value):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return None
+    items = [str(item).strip()[:MAX_ITEM_CHARS] for item in value if isinstance(item, (str, int, float))]
+    return [item for item in items if item][:MAX_ITEMS] or None
+
+
+def parse_mitigations(text):
+    """Schema-checked mitigation JSON from model output (fenced or surrounded by prose), or None"""
+    for obj in _json_objects(text or ''):
+        parsed = {}
+        for key in MITIGATION_KEYS:
+            items = _clean_items(obj.get(key))
+            if items is not None:
+                parsed[key] = items
+        if isinstance(obj.get('rationale'), str) and obj['rationale'].strip():
+            parsed['rationale'] = obj['rationale'].strip()[:MAX_RATIONALE_CHARS]
+        if any(key in parsed for key in MITIGATION_KEYS):
+            return parsed
+    return None
+
+
+def parse_briefing(text):
+    """Free-text risk briefing, or None when the model returned nothing usable"""
+    text = (text or '').strip()
+    return text if len(text) >= 40 else None
@@ -0,0 +1,144 @@
+"""
+Canonical scenario inputs
+Slider-driven clients send sizes and speeds that differ only in their last decimals,
+so results keyed on the raw floats almost never repeat. Inputs are snapped to grids
+at configurable physical tolerances (diameter on a log grid, since the effects scale
+as powers of it) and the canonical scenario is hashed into the shared result store
+key. A client can instead ask for the result interpolated between the neighbouring
+grid points, each of which is cached. Responses report what was applied.
+"""
+
+import hashlib
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+
+MODES = ('snap', 'interpolate', 'exact')
+DEFAULT_MODE = os.getenv('QUANTIZE_MODE', 'snap')
+# ('log', relative step) or ('linear', absolute step in the input's unit)
+TOLERANCES = {
+    'diameter_m': ('log', float(os.getenv('QUANTIZE_DIAMETER_REL', '0.005'))),
+    'velocity_km_s': ('linear', float(os.getenv('QUANTIZE_VELOCITY_KM_S', '0.05'))),
+    'density_kg_m3': ('linear', float(os.getenv('QUANTIZE_DENSITY_KG_M3', '10')))
+}
+SIGNIFICANT_DIGITS = 12
+
+
+def _clean(value):
+    """Grid values rounded so the same grid point always prints (and hashes) the same"""
+    return float(f'{value:.{SIGNIFICANT_DIGITS}g}')
+
+
+def _position(name, value):
+    scale, step = TOLERANCES[name]
+    if scale == 'log':
+        return math.log(value) / math.log1p(step)
+    return value / step
+
+
+def _grid_value(name, index):
+    scale, step = TOLERANCES[name]
+    if scale == 'log':
+        return _clean(math.exp(index * math.log1p(step)))
+    return _clean(index * step)
+
+
+class Canonical:
+    """Requested inputs, the grid values they map to and the corners to blend when
+    interpolating"""
+
+    def __init__(self, values, mode):
+        self.requested = values
+        self.mode = mode
+        self.positions = {}
+        for name, value in values.items():
+            if mode == 'exact' or TOLERANCES[name][1] <= 0:
+                continue
+            if TOLERANCES[name][0] == 'log' and value <= 0:
+                raise ValueError(f'{name} must be positive')
+            self.positions[name] = _position(name, value)
+        self.values = dict(values, **{name: _grid_value(name, round(u)) for name, u in self.positions.items()})
+
+    def corners(self):
+        """(weight, grid values) of the cell around the requested point, multilinear in the
+        grid coordinates; grid points the request sits on exactly get no neighbour"""
+        axes = []
+        for name, u in self.positions.items():
+            lower = math.floor(u)
+            t = u - lower
+            axes.append([(name, lower, 1 - t)] + ([(name, lower + 1, t)] if t > 1e-9 else []))
+        corners = []
+        for combination in itertools.product(*axes):
+            weight = math.prod(w for _, _, w in combination)
+            if weight > 0:
+                corners.append((weight, dict(self.requested, **{name: _grid_value(name, index)
+                                                                for name, index, _ in combination})))
+        return corners
+
+    def report(self):
+        inputs = {}
+        for name, value in self.requested.items():
+            entry = {'requested': value, 'used': value if self.mode == 'interpolate' else self.values[name]}
+            if name in self.positions:
+                scale, step = TOLERANCES[name]
+                entry['step'] = step
+                entry['scale'] = scale
+                if self.mode == 'interpolate':
+                    lower = math.floor(self.positions[name])
+                    entry['grid'] = [_grid_value(name, lower), _grid_value(name, lower + 1)]
+            inputs[name] = entry
+        return {'mode': self.mode, 'inputs': inputs}
+
+
+def canonicalize(data, interpolable=True, **values):
+    """Canonical inputs for a request; data['quantize'] picks the mode. Endpoints whose
+    results cannot be blended (routes, allocations) serve 'interpolate' as 'snap'."""
+    mode = str(data.get('quantize') or DEFAULT_MODE).lower()
+    if mode not in MODES:
+        raise ValueError(f"quantize must be one of {', '.join(MODES)}")
+    if mode == 'interpolate' and not interpolable:
+        mode = 'snap'
+    return Canonical({name: float(value) for name, value in values.items()}, mode)
+
+
+def digest(parts):
+    """Stable hash of a canonical scenario (a nested structure of plain values)"""
+    text = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+def blend(results, weights):
+    """Weighted mix of results with the same structure: numbers and numeric arrays are
+    blended (integers stay integers), anything else comes from the heaviest result"""
+    first = results[0]
+    if isinstance(first, dict):
+        return {key: blend([r[key] for r in results], weights) if all(key in r for r in results)
+                else first[key] for key in first}
+    if isinstance(first, (list, tuple)) and all(isinstance(r, type(first)) and len(r) == len(first) for r in results):
+        return type(first)(blend(list(items), weights) for items in zip(*results))
+    if isinstance(first, np.ndarray) and first.dtype.kind in 'iuf' and all(
+            isinstance(r, np.ndarray) and r.shape == first.shape for r in results):
+        mixed = sum(w * r.astype(float) for w, r in zip(weights, results))
+        return np.rint(mixed).astype(first.dtype) if first.dtype.kind in 'iu' else mixed.astype(first.dtype)
+    if isinstance(first, (int, float, np.number)) and not isinstance(first, (bool, np.bool_)) and all(
+            isinstance(r, (int, float, np.number)) and not isinstance(r, (bool, np.bool_)) for r in results):
+        mixed = sum(w * float(r) for w, r in zip(weights, results))
+        if all(isinstance(r, (int, np.integer)) for r in results):
+            return int(round(mixed))
+        return mixed
+    return results[int(np.argmax(weights))]
+
+
+def evaluate(canonical, compute):
+    """compute(**inputs) at the canonical point, or blended over the surrounding grid
+    points when interpolating"""
+    if canonical.mode != 'interpolate':
+        return compute(**canonical.values)
+    corners = canonical.corners()
+    if len(corners) == 1:
+        return compute(**corners[0][1])
+    weights = [weight for weight, _ in corners]
+    return blend([compute(**values) for _, values in corners], weights)
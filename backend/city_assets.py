@@ -0,0 +1,172 @@
+"""
+Per-city infrastructure assets
+Loads road-graph extracts and facility (shelter/hospital) lists from
+backend/data/<city_id>/. Cities without local extracts get a deterministic
+synthetic layout built from their city-catalogue counts, so planners still run.
+
+Files (all optional, CSV with a header row):
+    road_nodes.csv   id,lat,lng
+    road_edges.csv   u,v,length_m,speed_kmh,lanes[,oneway]   (OSM-derived edge list)
+    facilities.csv   kind,lat,lng,capacity[,name]             (kind: shelter | hospital)
+"""
+
+import csv
+import math
+import os
+import zlib
+
+import numpy as np
+
+DATA_DIR = os.getenv('CITY_ASSET_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LNG = 111.320
+VEHICLES_PER_LANE_HOUR = 1800
+DEFAULT_SHELTER_CAPACITY = 2500     # persons
+DEFAULT_HOSPITAL_BEDS = 400
+
+
+def city_dir(city_id):
+    return os.path.join(DATA_DIR, city_id)
+
+
+def asset_mtime(city_id, filename):
+    """Modification time of an asset file, or None when it is not provided"""
+    path = os.path.join(city_dir(city_id), filename)
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def _rng(city_id, salt):
+    # deterministic per city so repeated scenarios see the same synthetic layout
+    return np.random.default_rng(zlib.crc32(f"{city_id}:{salt}".encode('utf-8')))
+
+
+def to_local_km(lat, lng, city_data):
+    """Equirectangular projection to km east/north of the city centre"""
+    lat0, lng0 = city_data['lat'], city_data['lng']
+    x = (np.asarray(lng, dtype=float) - lng0) * KM_PER_DEG_LNG * math.cos(math.radians(lat0))
+    y = (np.asarray(lat, dtype=float) - lat0) * KM_PER_DEG_LAT
+    return x, y
+
+
+def from_local_km(x, y, city_data):
+    lat0, lng0 = city_data['lat'], city_data['lng']
+    lat = lat0 + np.asarray(y) / KM_PER_DEG_LAT
+    lng = lng0 + np.asarray(x) / (KM_PER_DEG_LNG * math.cos(math.radians(lat0)))
+    return lat, lng
+
+
+def city_radius_km(city_data):
+    return math.sqrt(city_data['area_km2'] / math.pi)
+
+
+def _read_csv(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def load_road_graph(city_id, city_data):
+    """Road graph as arrays: node x/y (km), edge src/dst/length_m/speed_kmh/lanes, source"""
+    nodes_path = os.path.join(city_dir(city_id), 'road_nodes.csv')
+    edges_path = os.path.join(city_dir(city_id), 'road_edges.csv')
+    if os.path.exists(nodes_path) and os.path.exists(edges_path):
+        node_rows = _read_csv(nodes_path)
+        index = {row['id']: i for i, row in enumerate(node_rows)}
+        x, y = to_local_km([float(r['lat']) for r in node_rows], [float(r['lng']) for r in node_rows], city_data)
+        src, dst, length, speed, lanes = [], [], [], [], []
+        for row in _read_csv(edges_path):
+            if row['u'] not in index or row['v'] not in index:
+                continue
+            pairs = [(row['u'], row['v'])]
+            if str(row.get('oneway', '')).lower() not in ('1', 'true', 'yes'):
+                pairs.append((row['v'], row['u']))
+            for u, v in pairs:
+                src.append(index[u])
+                dst.append(index[v])
+                length.append(float(row['length_m']))
+                speed.append(float(row.get('speed_kmh') or 50))
+                lanes.append(float(row.get('lanes') or 1))
+        return {
+            'x': x, 'y': y,
+            'src': np.asarray(src, dtype=np.int64), 'dst': np.asarray(dst, dtype=np.int64),
+            'length_m': np.asarray(length), 'speed_kmh': np.asarray(speed), 'lanes': np.asarray(lanes),
+            'source': 'file'
+        }
+    return _synthetic_road_graph(city_id, city_data)
+
+
+def _synthetic_road_graph(city_id, city_data):
+    """Radial arterials (one per evacuation route) crossed by ring roads out to the region edge"""
+    spokes = max(4, int(city_data.get('evacuation_routes', 8)))
+    extent_km = max(60.0, 4 * city_radius_km(city_data))
+    rings = np.geomspace(0.5, extent_km, 28)
+    jitter = _rng(city_id, 'roads').uniform(-0.15, 0.15, size=(len(rings), spokes))
+    angles = 2 * math.pi * (np.arange(spokes) / spokes) + jitter
+    radius = rings[:, None] * np.ones((1, spokes))
+    x = np.concatenate(([0.0], (radius * np.cos(angles)).ravel()))
+    y = np.concatenate(([0.0], (radius * np.sin(angles)).ravel()))
+
+    def node(ring, spoke):
+        return 1 + ring * spokes + (spoke % spokes)
+
+    src, dst, lanes, speed = [], [], [], []
+
+    def road(u, v, lane_count, speed_kmh):
+        src.append(u)
+        dst.append(v)
+        lanes.append(lane_count)
+        speed.append(speed_kmh)
+
+    city_radius = city_radius_km(city_data)
+    for spoke in range(spokes):
+        road(0, node(0, spoke), 2, 40)
+        for ring in range(len(rings) - 1):
+            road(node(ring, spoke), node(ring + 1, spoke), 3, 60 if rings[ring] < city_radius else 90)
+    for ring in range(len(rings)):
+        for spoke in range(spokes):
+            road(node(ring, spoke), node(ring, spoke + 1), 2, 50)
+
+    src, dst = np.asarray(src), np.asarray(dst)
+    length = np.hypot(x[src] - x[dst], y[src] - y[dst]) * 1000.0
+    lanes, speed = np.asarray(lanes, dtype=float), np.asarray(speed, dtype=float)
+    return {
+        'x': x, 'y': y,
+        'src': np.concatenate([src, dst]), 'dst': np.concatenate([dst, src]),
+        'length_m': np.concatenate([length, length]), 'speed_kmh': np.concatenate([speed, speed]),
+        'lanes': np.concatenate([lanes, lanes]),
+        'source': 'synthetic'
+    }
+
+
+def load_facilities(city_id, city_data):
+    """Facilities as arrays: kind, x/y (km), capacity, source"""
+    path = os.path.join(city_dir(city_id), 'facilities.csv')
+    if os.path.exists(path):
+        rows = _read_csv(path)
+        x, y = to_local_km([float(r['lat']) for r in rows], [float(r['lng']) for r in rows], city_data)
+        return {
+            'kind': np.asarray([r['kind'].strip().lower() for r in rows]),
+            'x': x, 'y': y,
+            'capacity': np.asarray([float(r['capacity']) for r in rows]),
+            'source': 'file'
+        }
+
+    # synthetic: facilities spread uniformly over (and just beyond) the built-up area
+    kinds, xs, ys, caps = [], [], [], []
+    radius = city_radius_km(city_data)
+    for kind, count, capacity in (('shelter', city_data.get('shelters', 0), DEFAULT_SHELTER_CAPACITY),
+                                  ('hospital', city_data.get('hospitals', 0), DEFAULT_HOSPITAL_BEDS)):
+        rng = _rng(city_id, kind)
+        r = radius * 1.5 * np.sqrt(rng.uniform(0, 1, count))
+        theta = rng.uniform(0, 2 * math.pi, count)
+        kinds += [kind] * count
+        xs.append(r * np.cos(theta))
+        ys.append(r * np.sin(theta))
+        caps.append(capacity * rng.uniform(0.5, 1.5, count))
+    return {
+        'kind': np.asarray(kinds),
+        'x': np.concatenate(xs) if xs else np.zeros(0),
+        'y': np.concatenate(ys) if ys else np.zeros(0),
+        'capacity': np.concatenate(caps) if caps else np.zeros(0),
+        'source': 'synthetic'
+    }
@@ -0,0 +1,416 @@
+"""
+City catalogue
+Loads cities (and an optional infrastructure overlay) from CSV or Parquet files in
+backend/data/, validates them, derives missing metrics column-wise and builds the
+id and latitude-sorted lookup indexes. The loaded catalogue is immutable; a reload
+builds a new one and swaps the module reference, so readers never see a half-built
+table. Source files are re-checked every RELOAD_CHECK_SECONDS and reloaded on change.
+
+Files (first row is the header; several files of one kind are concatenated):
+    cities*.csv | cities*.parquet
+        id,name,country,lat,lng,population,area_km2[,coastal,elevation,geographic_risk]
+    infrastructure*.csv | infrastructure*.parquet                   (optional, merged on id)
+        id[,hospitals,shelters,evacuation_routes,infrastructure_score,emergency_preparedness]
+"""
+
+import csv
+import glob
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+try:
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # CSV still loads without pyarrow, just more slowly; Parquet needs it
+    pa_csv = pq = None
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.getenv('CITY_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+RELOAD_CHECK_SECONDS = float(os.getenv('CITY_RELOAD_CHECK_SECONDS', '2'))
+MAX_REPORTED_ERRORS = 20
+EARTH_RADIUS_KM = 6371.0
+
+ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]*$')
+REQUIRED_COLUMNS = ('id', 'name', 'lat', 'lng', 'population', 'area_km2')
+TEXT_COLUMNS = ('id', 'name', 'country')
+INFRASTRUCTURE_COLUMNS = ('hospitals', 'shelters', 'evacuation_routes', 'infrastructure_score', 'emergency_preparedness')
+SCORE_COLUMNS = ('infrastructure_score', 'emergency_preparedness', 'geographic_risk')
+INTEGER_COLUMNS = ('population', 'population_density', 'hospitals', 'shelters', 'evacuation_routes',
+                   'infrastructure_score', 'emergency_preparedness', 'geographic_risk', 'elevation')
+# record layout (and order) served by the API
+RECORD_FIELDS = ('name', 'country', 'lat', 'lng', 'population', 'area_km2', 'population_density',
+                 'infrastructure_score', 'emergency_preparedness', 'hospitals', 'shelters',
+                 'evacuation_routes', 'geographic_risk', 'coastal', 'elevation')
+DEFAULT_SCORE = 50
+PERSONS_PER_HOSPITAL = 150000
+PERSONS_PER_SHELTER = 185000
+
+
+class CityDataError(ValueError):
+    """The city files could not be loaded (missing columns, no valid rows, unreadable file)"""
+
+
+def source_files(data_dir=None):
+    data_dir = data_dir or DATA_DIR
+    found = {}
+    for kind in ('cities', 'infrastructure'):
+        paths = glob.glob(os.path.join(data_dir, f'{kind}*.csv')) + glob.glob(os.path.join(data_dir, f'{kind}*.parquet'))
+        found[kind] = sorted(paths)
+    return found
+
+
+def _signature(files):
+    parts = []
+    for paths in files.values():
+        for path in paths:
+            stat = os.stat(path)
+            parts.append(f'{path}:{stat.st_mtime_ns}:{stat.st_size}')
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:12]
+
+
+def _read_file(path):
+    """Column name -> sequence of raw values"""
+    if path.endswith('.parquet'):
+        if pq is None:
+            raise CityDataError(f'pyarrow is required to load {os.path.basename(path)}')
+        table = pq.read_table(path)
+    elif pa_csv is not None:
+        table = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(
+            column_types={name: 'string' for name in TEXT_COLUMNS}, strings_can_be_null=True))
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        if not rows:
+            return {}
+        header, body = rows[0], rows[1:]
+        return {name.strip(): list(values) for name, values in zip(header, zip(*body))} if body else \
+            {name.strip(): [] for name in header}
+    return {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+
+
+def _numeric(values, count):
+    if values is None:
+        return np.full(count, np.nan)
+    values = np.asarray(values)
+    try:
+        if values.dtype.kind in 'OU':
+            values = values.astype(object)
+            values[np.equal(values, None) | np.equal(values, '')] = 'nan'
+            # Python's float() parses text far faster than numpy's string casts
+            return np.fromiter(map(float, values.tolist()), dtype=float, count=len(values))
+        return values.astype(float)
+    except (TypeError, ValueError):
+        # blanks or stray text become NaN and are caught by validation
+        out = np.full(count, np.nan)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def _text(values, count, default=''):
+    if values is None:
+        return np.full(count, default)
+    values = np.asarray(values, dtype=object)
+    values[np.equal(values, None)] = ''
+    return np.char.strip(values.astype(str))
+
+
+def _boolean(values, count):
+    if values is None:
+        return np.zeros(count, dtype=bool)
+    return np.isin(np.char.lower(_text(values, count)), ('1', 'true', 'yes', 'y', 't'))
+
+
+_ID_BYTES = np.zeros(256, dtype=bool)
+_ID_BYTES[np.frombuffer(b'abcdefghijklmnopqrstuvwxyz0123456789_-', dtype=np.uint8)] = True
+_ID_FIRST = _ID_BYTES.copy()
+_ID_FIRST[np.frombuffer(b'_-', dtype=np.uint8)] = False
+
+
+def _valid_ids(ids):
+    """Column-wise ID_PATTERN check on the ids' byte matrix"""
+    if len(ids) == 0:
+        return np.zeros(0, dtype=bool)
+    try:
+        raw = ids.astype('S')
+    except UnicodeEncodeError:
+        return np.array([bool(ID_PATTERN.match(v)) for v in ids.tolist()], dtype=bool)
+    codes = raw.view(np.uint8).reshape(len(raw), raw.dtype.itemsize)
+    # trailing NUL bytes are fixed-width padding
+    return (_ID_BYTES[codes] | (codes == 0)).all(axis=1) & _ID_FIRST[codes[:, 0]]
+
+
+def _concat(tables, kind):
+    if not tables:
+        return {}
+    columns = set().union(*(t.keys() for t in tables))
+    merged = {}
+    for name in columns:
+        parts = []
+        for table in tables:
+            count = len(next(iter(table.values()))) if table else 0
+            values = table.get(name)
+            parts.append(np.asarray(values) if values is not None else np.full(count, None, dtype=object))
+        # a column present in every file keeps its parsed dtype
+        merged[name] = parts[0] if len(parts) == 1 else np.concatenate(
+            parts if len({p.dtype for p in parts}) == 1 else [p.astype(object) for p in parts])
+    if kind == 'cities':
+        missing = [c for c in REQUIRED_COLUMNS if c not in merged]
+        if missing:
+            raise CityDataError(f"City files are missing required columns: {', '.join(missing)}")
+    elif 'id' not in merged:
+        raise CityDataError('Infrastructure files need an id column')
+    return merged
+
+
+class CityCatalog:
+    """Immutable column store of cities with id and latitude indexes"""
+
+    def __init__(self, columns, version, sources=(), report=None):
+        self.columns = columns
+        self.version = version
+        self.sources = list(sources)
+        self.report = report or {}
+        self.ids = columns['id']
+        self.index = dict(zip(self.ids.tolist(), range(len(self.ids))))
+        # rows sorted by latitude, for band / radius / nearest queries
+        self.lat_order = np.argsort(columns['lat'], kind='stable')
+        self.sorted_lat = columns['lat'][self.lat_order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, city_id):
+        return city_id in self.index
+
+    def record(self, row):
+        c = self.columns
+        record = {}
+        for name in RECORD_FIELDS:
+            value = c[name][row]
+            if name in INTEGER_COLUMNS:
+                value = int(value)
+            elif name == 'coastal':
+                value = bool(value)
+            elif name in ('lat', 'lng', 'area_km2'):
+                value = float(value)
+            else:
+                value = str(value)
+            record[name] = value
+        return record
+
+    def get(self, city_id):
+        row = self.index.get(city_id)
+        return None if row is None else self.record(row)
+
+    def records(self, rows=None):
+        rows = range(len(self)) if rows is None else rows
+        return {str(self.ids[row]): self.record(row) for row in rows}
+
+    def in_band(self, lat_min, lat_max):
+        lo, hi = np.searchsorted(self.sorted_lat, lat_min, 'left'), np.searchsorted(self.sorted_lat, lat_max, 'right')
+        return self.lat_order[lo:hi]
+
+    def near_points(self, lats, lngs, margin_km):
+        """Rows inside the bounding box of a point set widened by margin_km"""
+        if len(lats) == 0 or len(self) == 0:
+            return np.zeros(0, dtype=np.int64)
+        dlat = math.degrees(margin_km / EARTH_RADIUS_KM)
+        lat_min, lat_max = float(np.min(lats)) - dlat, float(np.max(lats)) + dlat
+        rows = self.in_band(lat_min, lat_max)
+        lng_min, lng_max = float(np.min(lngs)), float(np.max(lngs))
+        widest = max(abs(lat_min), abs(lat_max))
+        if lng_max - lng_min > 180 or widest >= 89:
+            # straddles the antimeridian or a pole: keep the whole band
+            return rows
+        dlng = dlat / max(math.cos(math.radians(widest)), 1e-6)
+        lng = self.columns['lng'][rows]
+        return rows[(lng >= lng_min - dlng) & (lng <= lng_max + dlng)]
+
+    def within_km(self, lat, lng, radius_km):
+        """Rows whose centre lies within radius_km of a point"""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        rows = self.in_band(lat - dlat, lat + dlat)
+        if len(rows) == 0:
+            return rows
+        d = haversine_km(lat, lng, self.columns['lat'][rows], self.columns['lng'][rows])
+        return rows[d <= radius_km]
+
+    def nearest(self, lat, lng):
+        """Row of the nearest city centre (expanding the latitude band until it is certain)"""
+        if len(self) == 0:
+            return None
+        radius = 50.0
+        while True:
+            rows = self.within_km(lat, lng, radius)
+            if len(rows) or radius >= math.pi * EARTH_RADIUS_KM:
+                break
+            radius *= 4
+        if len(rows) == 0:
+            rows = np.arange(len(self))
+        d = haversine_km(lat, lng, self.columns['lat'][rows], self.columns['lng'][rows])
+        return int(rows[np.argmin(d)])
+
+    def describe(self):
+        return {'version': self.version, 'cities': len(self), 'sources': [os.path.basename(p) for p in self.sources],
+                **self.report}
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = (np.radians(v) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def build_catalog(cities, infrastructure=None, version='', sources=()):
+    """Validate raw columns, derive metrics and index them (all column-wise)"""
+    started = time.perf_counter()
+    n = len(cities['id'])
+    c = {
+        'id': _text(cities['id'], n),
+        'name': _text(cities['name'], n),
+        'country': _text(cities.get('country'), n),
+        'lat': _numeric(cities['lat'], n),
+        'lng': _numeric(cities['lng'], n),
+        'population': _numeric(cities['population'], n),
+        'area_km2': _numeric(cities['area_km2'], n),
+        'coastal': _boolean(cities.get('coastal'), n),
+        'elevation': np.nan_to_num(_numeric(cities.get('elevation'), n)),
+        'geographic_risk': _numeric(cities.get('geographic_risk'), n)
+    }
+    for name in INFRASTRUCTURE_COLUMNS:
+        c[name] = _numeric(cities.get(name), n)
+
+    # infrastructure overlay: later values win, joined on id through a sorted index
+    if infrastructure:
+        infra_ids = _text(infrastructure['id'], len(infrastructure['id']))
+        order = np.argsort(c['id'], kind='stable')
+        pos = np.searchsorted(c['id'][order], infra_ids)
+        pos = np.minimum(pos, max(n - 1, 0))
+        matched = (c['id'][order][pos] == infra_ids) if n else np.zeros(len(infra_ids), dtype=bool)
+        rows = order[pos[matched]]
+        for name in INFRASTRUCTURE_COLUMNS:
+            if name in infrastructure:
+                values = _numeric(infrastructure[name], len(infra_ids))[matched]
+                ok = ~np.isnan(values)
+                c[name][rows[ok]] = values[ok]
+
+    checks = {
+        'invalid_id': ~_valid_ids(c['id']),
+        'missing_name': c['name'] == '',
+        'invalid_coordinates': ~((np.abs(c['lat']) <= 90) & (np.abs(c['lng']) <= 180)),
+        'invalid_population': ~(c['population'] >= 0),
+        'invalid_area': ~(c['area_km2'] > 0)
+    }
+    for name in SCORE_COLUMNS:
+        checks[f'invalid_{name}'] = (c[name] < 0) | (c[name] > 100)
+    for name in ('hospitals', 'shelters', 'evacuation_routes'):
+        checks[f'invalid_{name}'] = c[name] < 0
+    # the first occurrence of an id wins
+    _, first = np.unique(c['id'], return_index=True)
+    duplicate = np.ones(n, dtype=bool)
+    duplicate[first] = False
+    checks['duplicate_id'] = duplicate
+
+    bad = np.zeros(n, dtype=bool)
+    errors = []
+    for rule, mask in checks.items():
+        mask = mask & ~bad
+        if mask.any():
+            errors.append({'rule': rule, 'rows': int(mask.sum()),
+                           'examples': [str(v) for v in c['id'][mask][:MAX_REPORTED_ERRORS]]})
+        bad |= mask
+    keep = ~bad
+    if not keep.any():
+        raise CityDataError('No valid city rows' + (f" ({errors[0]['rule']})" if errors else ''))
+    c = {name: values[keep] for name, values in c.items()}
+
+    # derived metrics; counts the files leave blank are estimated from population and area
+    c['population_density'] = np.round(c['population'] / c['area_km2'])
+    defaults = {
+        'hospitals': np.maximum(1, np.round(c['population'] / PERSONS_PER_HOSPITAL)),
+        'shelters': np.maximum(1, np.round(c['population'] / PERSONS_PER_SHELTER)),
+        'evacuation_routes': np.maximum(2, np.round(np.sqrt(c['area_km2']) / 2)),
+        'infrastructure_score': np.full(len(c['id']), DEFAULT_SCORE),
+        'emergency_preparedness': np.full(len(c['id']), DEFAULT_SCORE),
+        'geographic_risk': np.full(len(c['id']), DEFAULT_SCORE)
+    }
+    estimated = {}
+    for name, fallback in defaults.items():
+        missing = np.isnan(c[name])
+        estimated[name] = int(missing.sum())
+        c[name] = np.where(missing, fallback, c[name])
+    for name in INTEGER_COLUMNS:
+        c[name] = np.round(c[name]).astype(np.int64)
+
+    report = {
+        'rows_read': n,
+        'rows_loaded': int(keep.sum()),
+        'rows_rejected': int(bad.sum()),
+        'errors': errors,
+        'estimated': {k: v for k, v in estimated.items() if v},
+        'build_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+    return CityCatalog(c, version, sources, report)
+
+
+def load_catalog(data_dir=None):
+    files = source_files(data_dir)
+    if not files['cities']:
+        raise CityDataError(f"No cities*.csv or cities*.parquet files in {data_dir or DATA_DIR}")
+    started = time.perf_counter()
+    version = _signature(files)
+    try:
+        cities = _concat([_read_file(p) for p in files['cities']], 'cities')
+        infrastructure = _concat([_read_file(p) for p in files['infrastructure']], 'infrastructure')
+    except CityDataError:
+        raise
+    except Exception as e:
+        raise CityDataError(f'Could not read city files: {e}')
+    catalog = build_catalog(cities, infrastructure, version, files['cities'] + files['infrastructure'])
+    catalog.report['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return catalog
+
+
+_current = None
+_checked_at = 0.0
+_reload_lock = threading.Lock()
+
+
+def reload(force=False):
+    """Load the files again when they changed (or always, with force) and swap the catalogue in.
+    A failed load keeps serving the previous catalogue and re-raises."""
+    global _current, _checked_at
+    with _reload_lock:
+        _checked_at = time.monotonic()
+        if not force and _current is not None and _current.version == _signature(source_files()):
+            return _current
+        catalog = load_catalog()
+        _current = catalog
+        logger.info(f"Loaded city catalogue {catalog.version}: {len(catalog)} cities "
+                    f"({catalog.report['rows_rejected']} rejected) in {catalog.report['load_ms']} ms")
+        return catalog
+
+
+def current():
+    """The live catalogue, re-checking the source files at most every RELOAD_CHECK_SECONDS"""
+    catalog = _current
+    if catalog is None:
+        return reload()
+    if time.monotonic() - _checked_at > RELOAD_CHECK_SECONDS:
+        try:
+            return reload()
+        except CityDataError as e:
+            logger.error(f"City catalogue reload failed, keeping {catalog.version}: {e}")
+    return _current
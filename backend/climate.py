@@ -0,0 +1,178 @@
+"""
+Reduced-order aftermath climate model
+Stratospheric dust and fire soot from an impact decay with fixed e-folding times;
+their combined optical depth dims the sun, and a land / ocean mixed layer / deep ocean
+energy balance turns that forcing into surface cooling. The five-variable system is
+integrated with fixed-step RK4 over ten years for every energy bucket at once, so a
+request only indexes into a precomputed table.
+"""
+
+import math
+import threading
+
+import numpy as np
+
+EARTH_AREA_M2 = 5.1e14
+LAND_AREA_KM2 = 1.49e8
+LAND_FRACTION = 0.29
+ABSORBED_SOLAR_W_M2 = 238.0
+MEGATON_J = 4.184e15
+
+# sources
+FINE_DUST_KG_PER_MT = 1e6            # submicron dust, Toon et al. 1997
+DUST_LOFTING_HALF_MT = 1e4           # half the fine dust reaches the stratosphere at this energy
+FUEL_KG_PER_KM2 = 5e6
+SOOT_EMISSION_FACTOR = 0.02
+SOOT_LOFTED_FRACTION = 0.5
+
+# optics and removal
+DUST_EXTINCTION_M2_KG = 3000.0
+SOOT_EXTINCTION_M2_KG = 5000.0
+DUST_EFOLD_YEARS = 0.5
+SOOT_EFOLD_YEARS = 4.0
+FORCING_EFFICACY = 0.6               # share of the blocked sunlight not made up by trapped longwave
+
+# energy balance (heat capacities in W yr m^-2 K^-1, couplings in W m^-2 K^-1)
+LAND_HEAT_CAPACITY = 0.5
+MIXED_LAYER_HEAT_CAPACITY = 8.0
+DEEP_OCEAN_HEAT_CAPACITY = 100.0
+CLIMATE_FEEDBACK = 2.0               # net feedback; Planck-dominated for large, fast cooling
+LAND_OCEAN_COUPLING = 4.0
+DEEP_OCEAN_COUPLING = 0.7
+
+YEARS = 10
+STEPS_PER_MONTH = 6
+DT_YEARS = 1.0 / (12 * STEPS_PER_MONTH)
+BUCKET_DEX = 0.1
+BUCKET_RANGE_MT = (1e-3, 1e10)
+PHOTOSYNTHESIS_SUNLIGHT = 0.01       # below ~1% of normal sunlight photosynthesis stops
+SERIES_FIELDS = ('dust_tg', 'soot_tg', 'optical_depth', 'sunlight_fraction',
+                 'land_temperature_anomaly_c', 'global_temperature_anomaly_c')
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def bucket_index(energy_mt):
+    lo, hi = (math.log10(e) for e in BUCKET_RANGE_MT)
+    log_e = min(max(math.log10(max(energy_mt, BUCKET_RANGE_MT[0])), lo), hi)
+    return int(round((log_e - lo) / BUCKET_DEX))
+
+
+def bucket_energies():
+    lo, hi = (math.log10(e) for e in BUCKET_RANGE_MT)
+    return 10.0 ** np.linspace(lo, hi, int(round((hi - lo) / BUCKET_DEX)) + 1)
+
+
+def sources(energy_mt):
+    """Stratospheric fine dust and soot (kg) for a land impact of the given energy"""
+    energy_mt = np.asarray(energy_mt, dtype=float)
+    dust = FINE_DUST_KG_PER_MT * energy_mt * energy_mt / (energy_mt + DUST_LOFTING_HALF_MT)
+    # same thermal-ignition radius as the physics summary
+    burned_km2 = np.minimum(math.pi * (1.9 * energy_mt ** 0.41) ** 2, LAND_AREA_KM2)
+    soot = burned_km2 * FUEL_KG_PER_KM2 * SOOT_EMISSION_FACTOR * SOOT_LOFTED_FRACTION
+    return dust, soot, burned_km2
+
+
+def _optical_depth(dust, soot):
+    return (DUST_EXTINCTION_M2_KG * dust + SOOT_EXTINCTION_M2_KG * soot) / EARTH_AREA_M2
+
+
+def _tendency(state):
+    dust, soot, land, ocean, deep = state
+    forcing = -ABSORBED_SOLAR_W_M2 * FORCING_EFFICACY * -np.expm1(-_optical_depth(dust, soot))
+    land_share = LAND_FRACTION / (1.0 - LAND_FRACTION)
+    return np.stack([
+        -dust / DUST_EFOLD_YEARS,
+        -soot / SOOT_EFOLD_YEARS,
+        (forcing - CLIMATE_FEEDBACK * land + LAND_OCEAN_COUPLING * (ocean - land)) / LAND_HEAT_CAPACITY,
+        (forcing - CLIMATE_FEEDBACK * ocean + LAND_OCEAN_COUPLING * land_share * (land - ocean)
+         + DEEP_OCEAN_COUPLING * (deep - ocean)) / MIXED_LAYER_HEAT_CAPACITY,
+        DEEP_OCEAN_COUPLING * (ocean - deep) / DEEP_OCEAN_HEAT_CAPACITY
+    ])
+
+
+def integrate(energy_mt):
+    """Monthly series (months + 1 samples per energy) from fixed-step RK4 over all energies at once"""
+    dust, soot, burned = sources(energy_mt)
+    zeros = np.zeros_like(dust)
+    state = np.stack([dust, soot, zeros, zeros, zeros])
+    months = YEARS * 12
+    samples = np.empty((months + 1,) + state.shape)
+    samples[0] = state
+    for month in range(1, months + 1):
+        for _ in range(STEPS_PER_MONTH):
+            k1 = _tendency(state)
+            k2 = _tendency(state + 0.5 * DT_YEARS * k1)
+            k3 = _tendency(state + 0.5 * DT_YEARS * k2)
+            k4 = _tendency(state + DT_YEARS * k3)
+            state = state + DT_YEARS / 6.0 * (k1 + 2 * k2 + 2 * k3 + k4)
+        samples[month] = state
+    dust, soot, land, ocean, _ = np.moveaxis(samples, 1, 0)
+    tau = _optical_depth(dust, soot)
+    return {
+        'dust_tg': dust / 1e9,
+        'soot_tg': soot / 1e9,
+        'optical_depth': tau,
+        'sunlight_fraction': np.exp(-tau),
+        'land_temperature_anomaly_c': land,
+        'global_temperature_anomaly_c': LAND_FRACTION * land + (1.0 - LAND_FRACTION) * ocean,
+        'burned_area_km2': burned
+    }
+
+
+def _months_until(mask):
+    """First month (per energy) after which mask stays False, capped at the horizon;
+    mask is (months + 1, energies)"""
+    last = np.where(mask.any(axis=0), mask.shape[0] - 1 - np.argmax(mask[::-1], axis=0), -1)
+    return np.minimum(last + 1, mask.shape[0] - 1)
+
+
+def table():
+    """Series and summaries for every energy bucket, computed once per process"""
+    global _table
+    with _table_lock:
+        if _table is None:
+            series = integrate(bucket_energies())
+            tau, sun = series['optical_depth'], series['sunlight_fraction']
+            cooling = -series['global_temperature_anomaly_c']
+            peak = cooling.max(axis=0)
+            _table = {
+                'series': series,
+                'summary': {
+                    'stratospheric_dust_tg': series['dust_tg'][0],
+                    'soot_tg': series['soot_tg'][0],
+                    'burned_area_km2': series['burned_area_km2'],
+                    'peak_optical_depth': tau.max(axis=0),
+                    'min_sunlight_fraction': sun.min(axis=0),
+                    'peak_land_cooling_c': (-series['land_temperature_anomaly_c']).max(axis=0),
+                    'peak_global_cooling_c': peak,
+                    'dark_months': (sun < PHOTOSYNTHESIS_SUNLIGHT).sum(axis=0),
+                    'dust_clear_years': _months_until(tau >= 0.1) / 12.0,
+                    # back within a tenth of the peak (or 0.1 C) of normal; both capped at YEARS
+                    'cooling_recovery_years': _months_until(cooling > np.maximum(0.1 * peak, 0.1)) / 12.0
+                }
+            }
+    return _table
+
+
+def summary(energy_mt):
+    """Scalar climate outputs for an impact energy (usable as scenario-model inputs)"""
+    k = bucket_index(energy_mt)
+    return {name: float(values[k]) for name, values in table()['summary'].items()}
+
+
+def series(energy_mt, years=YEARS, decimals=4):
+    """Compact monthly time series for an impact energy"""
+    k = bucket_index(energy_mt)
+    months = int(min(max(years, 1), YEARS) * 12)
+    data = table()['series']
+    return {
+        'month': list(range(months + 1)),
+        **{field: np.round(data[field][:months + 1, k], decimals).tolist() for field in SERIES_FIELDS}
+    }
+
+
+def bucket_of(energy_mt):
+    """Energy bucket used for an impact (the bucket's centre energy in Mt)"""
+    return float(bucket_energies()[bucket_index(energy_mt)])
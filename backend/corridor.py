@@ -0,0 +1,187 @@
+"""
+Probabilistic impact corridor
+Samples virtual impactors from a B-plane (target plane) uncertainty ellipse around a
+nominal impact, maps each one through gravitational focusing onto the Earth's
+surface along the incoming asymptote, and bins the hits on the multi-impact world
+grid. This is a linearised B-plane model: the covariance stands in for a full orbit
+propagation, which is what a real warning's line of variations reduces to near Earth.
+"""
+
+import math
+
+import numpy as np
+
+import multi_impact
+
+EARTH_RADIUS_KM = multi_impact.EARTH_RADIUS_KM
+EARTH_ESCAPE_KM_S = 11.186
+EARTH_ROTATION_RAD_S = 7.2921159e-5
+AU_KM = 1.495978707e8
+ARCSEC = math.pi / (180 * 3600)
+SAMPLES_PER_CHUNK = 100000
+MAX_SAMPLES = 5000000
+
+
+def uncertainty_from_neo(data, years_to_impact=10.0):
+    """B-plane sigmas (km) from the MPC uncertainty parameter U of a NASA lookup.
+
+    U bins the along-track runoff in arcsec per decade on a log scale
+    (U = ln(runoff) / (ln(648000) / 9) + 1); the runoff at 1 AU, scaled to the time
+    to impact, is taken as the major axis and 1% of it as the minor axis.
+    """
+    try:
+        u = float(data.get('orbital_data', {}).get('orbit_uncertainty'))
+    except (TypeError, ValueError):
+        u = 5.0
+    runoff_arcsec = math.exp((u - 0.5) * math.log(648000) / 9)
+    major = runoff_arcsec * ARCSEC * AU_KM * years_to_impact / 10.0
+    return {'sigma_major_km': major, 'sigma_minor_km': major * 0.01, 'uncertainty_parameter': u}
+
+
+def _unit(lat_deg, lng_deg):
+    lat, lng = np.radians(lat_deg), np.radians(lng_deg)
+    return np.array([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)])
+
+
+def geometry(lat, lng, impact_angle_deg=45.0, azimuth_deg=90.0):
+    """Entry point, travel direction and B-plane axes (Earth-fixed, unit vectors)"""
+    up = _unit(lat, lng)
+    east = np.array([-math.sin(math.radians(lng)), math.cos(math.radians(lng)), 0.0])
+    north = np.cross(up, east)
+    angle, azimuth = math.radians(impact_angle_deg), math.radians(azimuth_deg)
+    # the body arrives from `azimuth` at `impact_angle` above the horizon
+    source = math.cos(angle) * (math.sin(azimuth) * east + math.cos(azimuth) * north) + math.sin(angle) * up
+    direction = -source
+    # B-plane axes: xi horizontal-ish (east-projected), zeta completes the frame
+    xi = np.cross(direction, up)
+    if np.linalg.norm(xi) < 1e-9:
+        xi = east
+    xi /= np.linalg.norm(xi)
+    zeta = np.cross(direction, xi)
+    entry = up * EARTH_RADIUS_KM
+    nominal_b = entry - np.dot(entry, direction) * direction
+    return {'direction': direction, 'xi': xi, 'zeta': zeta, 'nominal_b': nominal_b}
+
+
+def sample_chunk(args):
+    """Hit cell ids for one chunk of virtual impactors (runs on the multi-impact pool)"""
+    (geom, covariance, sigma_time_s, v_inf_km_s, count, seed, resolution_deg) = args
+    rng = np.random.default_rng(seed)
+    offsets = rng.multivariate_normal([0.0, 0.0], covariance, size=count, method='cholesky')
+    # gravitational focusing pulls a B-plane offset b in to b / focus at the surface
+    focus = math.sqrt(1.0 + (EARTH_ESCAPE_KM_S / max(v_inf_km_s, 0.1)) ** 2)
+    b = (geom['nominal_b'][None, :]
+         + (offsets[:, :1] * geom['xi'][None, :] + offsets[:, 1:] * geom['zeta'][None, :]) / focus)
+    b_len2 = np.einsum('ij,ij->i', b, b)
+    hit = b_len2 < EARTH_RADIUS_KM ** 2
+    b = b[hit]
+    surface = b - np.sqrt(EARTH_RADIUS_KM ** 2 - b_len2[hit])[:, None] * geom['direction'][None, :]
+    lat = np.degrees(np.arcsin(np.clip(surface[:, 2] / EARTH_RADIUS_KM, -1.0, 1.0)))
+    lng = np.degrees(np.arctan2(surface[:, 1], surface[:, 0]))
+    if sigma_time_s:
+        # arrival-time error lets the Earth turn under the corridor
+        lng = lng - np.degrees(EARTH_ROTATION_RAD_S * rng.normal(0.0, sigma_time_s, len(lng)))
+    lng = (lng + 180.0) % 360.0 - 180.0
+    cells = multi_impact.WorldGrid(resolution_deg).cell_of(lat, lng)
+    unique, counts = np.unique(cells, return_counts=True)
+    return unique, counts.astype(float), count
+
+
+def covariance_matrix(sigma_major_km, sigma_minor_km, angle_deg=0.0):
+    """2x2 B-plane covariance from ellipse sigmas and the major axis angle from xi"""
+    c, s = math.cos(math.radians(angle_deg)), math.sin(math.radians(angle_deg))
+    rotation = np.array([[c, -s], [s, c]])
+    return rotation @ np.diag([sigma_major_km ** 2, sigma_minor_km ** 2]) @ rotation.T
+
+
+def sample_corridor(geom, covariance, v_inf_km_s, samples, sigma_time_s=0.0, resolution_deg=0.25,
+                    seed=0, workers=None, progress=None):
+    """Sparse (cells, hit counts, samples drawn) over all chunks; progress(fraction, message)
+    is called as chunks complete"""
+    covariance = np.asarray(covariance, dtype=float)
+    if covariance.shape != (2, 2) or not np.allclose(covariance, covariance.T) or np.linalg.eigvalsh(covariance).min() < 0:
+        raise ValueError('covariance_km2 must be a symmetric positive semi-definite 2x2 matrix')
+    samples = int(samples)
+    if not 1 <= samples <= MAX_SAMPLES:
+        raise ValueError(f'samples must be between 1 and {MAX_SAMPLES}')
+    sizes = [SAMPLES_PER_CHUNK] * (samples // SAMPLES_PER_CHUNK)
+    if samples % SAMPLES_PER_CHUNK:
+        sizes.append(samples % SAMPLES_PER_CHUNK)
+    jobs = [(geom, covariance, sigma_time_s, v_inf_km_s, n, (seed, k), resolution_deg) for k, n in enumerate(sizes)]
+    workers = multi_impact.WORKERS if workers is None else workers
+    if len(jobs) > 1 and workers > 1:
+        chunks = multi_impact.get_pool().map(sample_chunk, jobs)
+    else:
+        chunks = map(sample_chunk, jobs)
+    results = []
+    for result in chunks:
+        results.append(result)
+        if progress:
+            progress(len(results) / len(jobs), f'{sum(r[2] for r in results):,} samples')
+    cells = np.concatenate([r[0] for r in results])
+    counts = np.concatenate([r[1] for r in results])
+    order = np.argsort(cells, kind='stable')
+    cells, counts = cells[order], counts[order]
+    if len(cells):
+        starts = np.concatenate(([0], np.nonzero(np.diff(cells))[0] + 1))
+        cells, counts = cells[starts], np.add.reduceat(counts, starts)
+    return cells, counts, samples
+
+
+def expected_casualties(grid, cells, probability, cities, lethal_radius_km, casualties_at_centre):
+    """Expected casualties per city: sum over cells of P(cell) x casualties for a hit there.
+
+    A hit at distance d from a city centre is credited with the share of the city's
+    centre-impact casualties given by the overlap of the lethal disc with the city disc.
+    casualties_at_centre(city_id, city) is only called for cities the corridor can reach,
+    and only those cities are listed.
+    """
+    lat, lng = grid.cell_centres(cells)
+    rows = []
+    for city_id, city in cities.items():
+        city_radius = math.sqrt(city['area_km2'] / math.pi)
+        d = multi_impact.great_circle_km(city['lat'], city['lng'], lat, lng)
+        overlap = np.clip((lethal_radius_km + city_radius - d) / (2 * min(lethal_radius_km, city_radius)), 0.0, 1.0)
+        p_affected = float((probability * (overlap > 0)).sum())
+        if p_affected <= 0:
+            continue
+        expected = float((probability * overlap).sum()) * casualties_at_centre(city_id, city)
+        rows.append({
+            'city_id': city_id,
+            'name': city['name'],
+            'country': city.get('country'),
+            'probability_affected': p_affected,
+            'expected_casualties': round(expected, 1)
+        })
+    return sorted(rows, key=lambda r: -r['expected_casualties'])
+
+
+def corridor_shape(grid, cells, probability):
+    """Probability-weighted centroid and principal extents (km) of the corridor.
+
+    Hits are mapped with an azimuthal equidistant projection about the centroid, where
+    a great-circle corridor through the centroid stays straight, before taking axes.
+    """
+    if len(cells) == 0 or probability.sum() <= 0:
+        return None
+    lat, lng = grid.cell_centres(cells)
+    weights = probability / probability.sum()
+    centre = (weights[:, None] * _unit(lat, lng).T).sum(axis=0)
+    centre /= np.linalg.norm(centre)
+    centre_lat = math.degrees(math.asin(centre[2]))
+    centre_lng = math.degrees(math.atan2(centre[1], centre[0]))
+
+    distance = multi_impact.great_circle_km(centre_lat, centre_lng, lat, lng)
+    phi1, phi2, dlng = math.radians(centre_lat), np.radians(lat), np.radians(lng - centre_lng)
+    bearing = np.arctan2(np.sin(dlng) * np.cos(phi2),
+                         math.cos(phi1) * np.sin(phi2) - math.sin(phi1) * np.cos(phi2) * np.cos(dlng))
+    xy = np.column_stack([distance * np.sin(bearing), distance * np.cos(bearing)])
+    mean = (weights[:, None] * xy).sum(axis=0)
+    spread = np.einsum('i,ij,ik->jk', weights, xy - mean, xy - mean)
+    minor, major = np.sqrt(np.maximum(np.linalg.eigvalsh(spread), 0.0))
+    return {
+        'centroid': {'lat': round(centre_lat, 4), 'lng': round(centre_lng, 4)},
+        # 2-sigma extents of the hit cloud along and across the corridor
+        'length_km': round(float(4 * major), 1),
+        'width_km': round(float(4 * minor), 1)
+    }
@@ -0,0 +1,234 @@
+"""
+Deflection mission trade study
+Required miss distance versus warning time, and the deflection delivered by kinetic
+impactors (with momentum enhancement beta), gravity tractors and nuclear standoff
+bursts, swept over lead time x spacecraft mass x beta as one numpy batch.
+"""
+
+import math
+
+import numpy as np
+
+G = 6.674e-11
+EARTH_RADIUS_M = 6.371e6
+EARTH_ESCAPE_KM_S = 11.186
+SECONDS_PER_YEAR = 3.15576e7
+SECONDS_PER_DAY = 86400.0
+
+DEFAULT_DENSITY = 2500.0               # kg/m³, matches the NASA physics summary
+DEFAULT_PERIOD_DAYS = 550.0            # typical NEO when no orbit is known
+IMPACTOR_SPEED_KM_S = 6.0              # relative arrival speed (DART: 6.1 km/s)
+CRUISE_YEARS = 1.0                     # launch to arrival at the asteroid
+TRACTOR_HOVER_RADII = 1.5              # hover distance in asteroid radii
+STANDOFF_KT_PER_KG = 1.0               # device yield per kg of payload
+STANDOFF_PAYLOAD_FRACTION = 0.5
+STANDOFF_MOMENTUM_PER_KT = 1.4e7       # N s delivered per kt at optimal standoff height
+SWEEP_BLOCK = 1_000_000                # options evaluated per block in large sweeps
+
+METHODS = ('kinetic_impactor', 'gravity_tractor', 'nuclear_standoff')
+
+
+def target_from_neo(data, velocity_km_s=None, density_kg_m3=DEFAULT_DENSITY):
+    """Deflection target from a NASA NEO lookup record (diameter, v_inf, orbital period)"""
+    diameter = None
+    meters = data.get('estimated_diameter', {}).get('meters', {})
+    if meters.get('estimated_diameter_min') is not None and meters.get('estimated_diameter_max') is not None:
+        diameter = (float(meters['estimated_diameter_min']) + float(meters['estimated_diameter_max'])) / 2.0
+    if velocity_km_s is None and data.get('close_approach_data'):
+        try:
+            velocity_km_s = float(data['close_approach_data'][0]['relative_velocity']['kilometers_per_second'])
+        except (KeyError, TypeError, ValueError):
+            velocity_km_s = None
+    orbit = data.get('orbital_data', {})
+    period_days = None
+    try:
+        period_days = float(orbit['orbital_period'])
+    except (KeyError, TypeError, ValueError):
+        try:
+            period_days = 365.25 * float(orbit['semi_major_axis']) ** 1.5
+        except (KeyError, TypeError, ValueError):
+            period_days = None
+    return make_target(diameter or 100.0, velocity_km_s or 20.0, density_kg_m3, period_days,
+                       name=data.get('name'))
+
+
+def make_target(diameter_m, velocity_km_s, density_kg_m3=DEFAULT_DENSITY, period_days=None, name=None):
+    radius = diameter_m / 2.0
+    return {
+        'name': name,
+        'diameter_m': float(diameter_m),
+        'mass_kg': (4.0 / 3.0) * math.pi * radius ** 3 * density_kg_m3,
+        'density_kg_m3': float(density_kg_m3),
+        'v_inf_km_s': float(velocity_km_s),
+        'orbital_period_days': float(period_days or DEFAULT_PERIOD_DAYS)
+    }
+
+
+def required_miss_m(target, safety_factor=1.0):
+    """B-plane displacement that clears the Earth, including gravitational focusing"""
+    focus = math.sqrt(1.0 + (EARTH_ESCAPE_KM_S / max(target['v_inf_km_s'], 0.1)) ** 2)
+    return EARTH_RADIUS_M * focus * safety_factor
+
+
+def _drift_factor(t_s, period_s):
+    # along-track drift per unit delta-v: 1 for a push just before arrival, growing to
+    # 3 once the changed period has had a full orbit to act
+    return 1.0 + 2.0 * np.minimum(np.asarray(t_s, dtype=float) / period_s, 1.0)
+
+
+def impulsive_displacement_m(delta_v_m_s, t_s, period_s):
+    return _drift_factor(t_s, period_s) * delta_v_m_s * np.maximum(t_s, 0.0)
+
+
+def towed_displacement_m(accel_m_s2, tow_s, period_s):
+    """Displacement from constant along-track acceleration held until arrival
+    (integral of drift_factor(tau) * a * tau over the tow window)"""
+    T = np.maximum(tow_s, 0.0)
+    P = period_s
+    short = T * T / 2.0 + 2.0 * T ** 3 / (3.0 * P)
+    long_ = P * P / 2.0 + 2.0 * P * P / 3.0 + 1.5 * (T * T - P * P)
+    return accel_m_s2 * np.where(T <= P, short, long_)
+
+
+def required_delta_v_curve(target, lead_years, safety_factor=1.0):
+    """Impulsive delta-v (m/s) needed when applied lead_years before impact"""
+    t = np.asarray(lead_years, dtype=float) * SECONDS_PER_YEAR
+    period = target['orbital_period_days'] * SECONDS_PER_DAY
+    return required_miss_m(target, safety_factor) / (_drift_factor(t, period) * t)
+
+
+def pareto_front(mass, lead, beta):
+    """Indices of non-dominated options, minimising mass, lead time and beta.
+
+    Lead times and betas come from sweep grids, so the options are laid out on a
+    lead x beta matrix of least mass; a prefix minimum over both axes then tells
+    whether any option with no more lead time and no more beta is lighter.
+    """
+    if len(mass) == 0:
+        return np.zeros(0, dtype=np.int64)
+    lead_values, lead_rank = np.unique(lead, return_inverse=True)
+    beta_values, beta_rank = np.unique(beta, return_inverse=True)
+    best = np.full((len(lead_values), len(beta_values)), np.inf)
+    np.minimum.at(best, (lead_rank, beta_rank), mass)
+    prefix = np.minimum.accumulate(np.minimum.accumulate(best, axis=0), axis=1)
+    # least mass among options with strictly less lead time or strictly less beta
+    shifted = np.full_like(best, np.inf)
+    shifted[1:, :] = prefix[:-1, :]
+    below = np.full_like(best, np.inf)
+    below[:, 1:] = prefix[:, :-1]
+    on_front = best < np.minimum(shifted, below)
+    return np.nonzero(on_front[lead_rank, beta_rank] & (mass == best[lead_rank, beta_rank]))[0]
+
+
+def trade_study(target, lead_years, spacecraft_mass_kg, betas, methods=METHODS, safety_factor=1.0,
+                impactor_speed_km_s=IMPACTOR_SPEED_KM_S, cruise_years=CRUISE_YEARS, progress=None):
+    """Evaluate every (method, lead time, spacecraft mass, beta) option as numpy batches.
+
+    Returns a dict of equal-length arrays plus the indices of the Pareto front over
+    successful options (minimise spacecraft mass, lead time and the beta relied on).
+    """
+    unknown = set(methods) - set(METHODS)
+    if unknown:
+        raise ValueError(f"Unknown deflection method(s): {', '.join(sorted(unknown))}")
+    lead = np.asarray(lead_years, dtype=float)
+    mass = np.asarray(spacecraft_mass_kg, dtype=float)
+    beta = np.asarray(betas, dtype=float)
+    period = target['orbital_period_days'] * SECONDS_PER_DAY
+    miss = required_miss_m(target, safety_factor)
+    m_ast = target['mass_kg']
+    radius = target['diameter_m'] / 2.0
+
+    columns = {k: [] for k in ('method', 'lead_time_years', 'spacecraft_mass_kg', 'beta', 'delta_v_m_s', 'displacement_m')}
+
+    def add(method, L, M, B, dv, x):
+        columns['method'].append(np.full(L.size, METHODS.index(method), dtype=np.int8))
+        for key, value in (('lead_time_years', L), ('spacecraft_mass_kg', M), ('beta', B),
+                           ('delta_v_m_s', dv), ('displacement_m', x)):
+            columns[key].append(np.ravel(value).astype(float))
+
+    # the spacecraft acts only after it has cruised to the asteroid
+    def kinetic_impactor(lead):
+        L, M, B = (a.ravel() for a in np.meshgrid(lead, mass, beta, indexing='ij'))
+        t_act = (L - cruise_years) * SECONDS_PER_YEAR
+        dv = B * M * impactor_speed_km_s * 1000.0 / (m_ast + M)
+        add('kinetic_impactor', L, M, B, np.where(t_act > 0, dv, 0.0), impulsive_displacement_m(dv, t_act, period))
+
+    def gravity_tractor(lead):
+        L, M = (a.ravel() for a in np.meshgrid(lead, mass, indexing='ij'))
+        tow = np.maximum(L - cruise_years, 0.0) * SECONDS_PER_YEAR
+        accel = G * M / (TRACTOR_HOVER_RADII * radius) ** 2
+        add('gravity_tractor', L, M, np.ones_like(L), accel * tow, towed_displacement_m(accel, tow, period))
+
+    def nuclear_standoff(lead):
+        L, M = (a.ravel() for a in np.meshgrid(lead, mass, indexing='ij'))
+        t_act = (L - cruise_years) * SECONDS_PER_YEAR
+        yield_kt = STANDOFF_KT_PER_KG * STANDOFF_PAYLOAD_FRACTION * M
+        dv = STANDOFF_MOMENTUM_PER_KT * yield_kt / m_ast
+        add('nuclear_standoff', L, M, np.ones_like(L), np.where(t_act > 0, dv, 0.0),
+            impulsive_displacement_m(dv, t_act, period))
+
+    # large sweeps go a block of lead times at a time (lead is the outer axis, so the
+    # option order is unchanged), reporting progress(fraction, message) after each block
+    evaluate = {'kinetic_impactor': kinetic_impactor, 'gravity_tractor': gravity_tractor,
+                'nuclear_standoff': nuclear_standoff}
+    block_count = math.ceil(lead.size * mass.size * beta.size / SWEEP_BLOCK)
+    blocks = np.array_split(lead, min(max(lead.size, 1), max(block_count, 1)))
+    steps = [(method, block) for method in METHODS if method in methods for block in blocks]
+    for done, (method, block) in enumerate(steps, 1):
+        evaluate[method](block)
+        if progress:
+            progress(done / len(steps), f'{method}: {done}/{len(steps)} blocks')
+
+    options = {k: np.concatenate(v) if v else np.zeros(0) for k, v in columns.items()}
+    options['margin'] = options['displacement_m'] / miss
+    success = np.nonzero(options['margin'] >= 1.0)[0]
+
+    def front_of(indices):
+        front = indices[pareto_front(options['spacecraft_mass_kg'][indices], options['lead_time_years'][indices],
+                                     options['beta'][indices])]
+        return front[np.lexsort((options['lead_time_years'][front], options['spacecraft_mass_kg'][front]))]
+
+    # one method tends to dominate overall, so each method's own front is kept as well
+    by_method = {method: front_of(success[options['method'][success] == METHODS.index(method)])
+                 for method in methods}
+    return {'options': options, 'successful': success, 'pareto': front_of(success),
+            'pareto_by_method': by_method, 'required_miss_m': miss}
+
+
+def option_records(options, indices):
+    return [{
+        'method': METHODS[int(options['method'][i])],
+        'lead_time_years': round(float(options['lead_time_years'][i]), 3),
+        'spacecraft_mass_kg': round(float(options['spacecraft_mass_kg'][i]), 1),
+        'beta': round(float(options['beta'][i]), 2),
+        'delta_v_mm_s': round(float(options['delta_v_m_s'][i]) * 1000.0, 4),
+        'displacement_km': round(float(options['displacement_m'][i]) / 1000.0, 1),
+        'margin': round(float(options['margin'][i]), 3)
+    } for i in indices]
+
+
+def method_summary(target, max_mass_kg=20000.0, beta=2.0):
+    """Shortest workable lead time per method at a given spacecraft mass (for mitigation text)"""
+    lead = np.geomspace(0.1, 50.0, 200)
+    study = trade_study(target, lead, [max_mass_kg], [beta])
+    options = study['options']
+    summary = {}
+    for code, method in enumerate(METHODS):
+        ok = (options['method'] == code) & (options['margin'] >= 1.0)
+        summary[method] = round(float(options['lead_time_years'][ok].min()), 2) if ok.any() else None
+    return {'min_lead_time_years': summary, 'spacecraft_mass_kg': max_mass_kg, 'beta': beta}
+
+
+def sweep(spec, default):
+    """Sweep values from a list, a single number or {min, max, steps[, log]}"""
+    if spec is None:
+        return np.asarray(default, dtype=float)
+    if isinstance(spec, dict):
+        lo, hi, steps = float(spec['min']), float(spec['max']), int(spec.get('steps', 10))
+        if not 0 < lo <= hi or not 1 <= steps <= 1000:
+            raise ValueError('Sweep needs 0 < min <= max and 1-1000 steps')
+        return np.geomspace(lo, hi, steps) if spec.get('log') else np.linspace(lo, hi, steps)
+    values = np.atleast_1d(np.asarray(spec, dtype=float))
+    if len(values) > 1000 or (values <= 0).any():
+        raise ValueError('Sweep values must be positive (at most 1000 of them)')
+    return values
@@ -9,11 +9,34 @@ import json
 import math
 import requests
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timedelta
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
 import google.generativeai as genai
+import numpy as np
+import scenario_model
+from scenario_model import ScenarioModelError, ScenarioModelRegistry, to_python
+import timelapse
+import city_assets
+import evacuation
+import allocation
+import multi_impact
+import deflection
+import corridor
+import inverse
+import briefings
+import secondary_effects
+import climate
+import city_catalog
+import regions
+import neo_catalog
+import jobs
+import columnar
+import canonical
+from shared_store import open_result_store
 
 # Load environment variables
 load_dotenv()
@@ -34,10 +57,36 @@ except Exception as e:
     print(f"⚠️ Gemini AI configuration failed: {e}")
     model = None
 
+# AI answers are hedged: a templated briefing goes out if Gemini misses the deadline,
+# and the late answer is cached (per city, size and velocity bucket) for the next request
+AI_DEADLINE_SECONDS = float(os.getenv('AI_DEADLINE_SECONDS', '2.0'))
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', str(7 * 86400)))
+AI_CALL_TIMEOUT = 120      # how long a call may be reported as pending
+AI_RETRY_SECONDS = 60      # after a failed call, serve templates without retrying for this long
+ai_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='gemini')
+ai_inflight = {}
+ai_lock = threading.Lock()
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Declarative damage models (coefficients, zones, formulas), hot-reloaded on change
+SCENARIO_MODEL_DIR = os.getenv('SCENARIO_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenario_models'))
+DEFAULT_SCENARIO_MODEL = os.getenv('DEFAULT_SCENARIO_MODEL', 'default')
+scenario_models = ScenarioModelRegistry(SCENARIO_MODEL_DIR)
+
+# Result store shared by all workers on this host (NEO cache, city table, scenario memo)
+result_store = open_result_store()
+NEO_CACHE_TTL = 300
+SCENARIO_MEMO_TTL = int(os.getenv('SCENARIO_MEMO_TTL', '3600'))
+# Memo keys change whenever the code results are computed with does, so a restart never
+# serves stale results; a module added to the physics belongs here
+RESULT_MODULES = (scenario_model, timelapse, city_assets, evacuation, allocation, multi_impact, deflection,
+                  corridor, inverse, briefings, secondary_effects, climate, city_catalog, regions, canonical,
+                  columnar)
+MEMO_NAMESPACE = '%x' % int(max(os.path.getmtime(f) for f in (__file__,) + tuple(m.__file__ for m in RESULT_MODULES)))
+
 class NASADataService:
     """Service for fetching NASA NEO data"""
 
@@ -45,14 +94,23 @@ class NASADataService:
         self.api_key = api_key
         self.base_url = "https://api.nasa.gov/neo/rest/v1"
 
+    def lookup_url(self, asteroid_id):
+        return f"{self.base_url}/neo/{asteroid_id}"
+
+    def feed_url(self, start_date, end_date):
+        return f"{self.base_url}/feed?start_date={start_date}&end_date={end_date}&api_key={self.api_key}"
+
+    def stats_url(self):
+        return f"{self.base_url}/stats?api_key={self.api_key}"
+
     def get_neo_lookup(self, asteroid_id):
         """Fetch detailed asteroid data from NASA NEO API"""
         try:
-            url = f"{self.base_url}/neo/{asteroid_id}"
+            url = self.lookup_url(asteroid_id)
             params = {"api_key": self.api_key}
             response = requests.get(url, params=params, timeout=10)
             response.raise_for_status()
-            return response.json()
+            return neo_catalog.compact_record(response.json())
         except requests.RequestException as e:
             logger.error(f"NASA API request failed for asteroid {asteroid_id}: {e}")
             return {"error": str(e)}
@@ -60,103 +118,53 @@ class NASADataService:
             logger.error(f"Unexpected error fetching asteroid {asteroid_id}: {e}")
             return {"error": str(e)}
 
+class UpstreamError(Exception):
+    """NASA returned no usable data for a request that depends on it"""
+
+def feed_date_range(days=7):
+    """Current date and N days ahead, formatted for the NASA feed"""
+    start_date = datetime.now().strftime('%Y-%m-%d')
+    end_date = (datetime.now() + timedelta(days=days)).strftime('%Y-%m-%d')
+    return start_date, end_date
+
 # Initialize NASA service
 nasa_service = NASADataService(NASA_API_KEY)
 
-# Enhanced city database with detailed metrics
-CITY_DATABASE = {
-    'new-york': {
-        'name': 'New York City',
-        'lat': 40.7128,
-        'lng': -74.0060,
-        'population': 8336817,
-        'area_km2': 778.2,
-        'population_density': 10715,
-        'infrastructure_score': 85,
-        'emergency_preparedness': 78,
-        'hospitals': 62,
-        'shelters': 45,
-        'evacuation_routes': 12,
-        'geographic_risk': 65,
-        'coastal': True,
-        'elevation': 10
-    },
-    'london': {
-        'name': 'London',
-        'lat': 51.5074,
-        'lng': -0.1278,
-        'population': 9648110,
-        'area_km2': 1572,
-        'population_density': 6140,
-        'infrastructure_score': 88,
-        'emergency_preparedness': 82,
-        'hospitals': 78,
-        'shelters': 52,
-        'evacuation_routes': 15,
-        'geographic_risk': 45,
-        'coastal': False,
-        'elevation': 35
-    },
-    'tokyo': {
-        'name': 'Tokyo',
-        'lat': 35.6762,
-        'lng': 139.6503,
-        'population': 37400068,
-        'area_km2': 2194,
-        'population_density': 17045,
-        'infrastructure_score': 92,
-        'emergency_preparedness': 95,
-        'hospitals': 156,
-        'shelters': 89,
-        'evacuation_routes': 28,
-        'geographic_risk': 85,
-        'coastal': True,
-        'elevation': 40
-    },
-    'paris': {
-        'name': 'Paris',
-        'lat': 48.8566,
-        'lng': 2.3522,
-        'population': 2161000,
-        'area_km2': 105.4,
-        'population_density': 20500,
-        'infrastructure_score': 86,
-        'emergency_preparedness': 75,
-        'hospitals': 45,
-        'shelters': 32,
-        'evacuation_routes': 8,
-        'geographic_risk': 35,
-        'coastal': False,
-        'elevation': 35
-    },
-    'sydney': {
-        'name': 'Sydney',
-        'lat': -33.8688,
-        'lng': 151.2093,
-        'population': 5312163,
-        'area_km2': 12368,
-        'population_density': 430,
-        'infrastructure_score': 84,
-        'emergency_preparedness': 80,
-        'hospitals': 38,
-        'shelters': 28,
-        'evacuation_routes': 18,
-        'geographic_risk': 55,
-        'coastal': True,
-        'elevation': 58
-    }
-}
-
-def calculate_detailed_impact_physics(diameter_m, velocity_km_s):
-    """Calculate comprehensive impact physics"""
+# City catalogue (backend/data/cities*.csv|parquet), hot-reloaded when the files change
+city_catalog.reload()
+
+def get_city(city_id):
+    """City record by id, defaulting to New York (or the first city) like the original handlers"""
+    catalog = city_catalog.current()
+    return catalog.get(city_id) or catalog.get('new-york') or catalog.record(0)
+
+def resolve_city(city_id):
+    """(catalogue id, record) for a city id. Unlike get_city there is no fallback: the id
+    also names the city's asset files, memo keys and RNG seeds, so unknown ids raise ValueError."""
+    catalog = city_catalog.current()
+    row = catalog.index.get(city_id) if isinstance(city_id, str) else None
+    if row is None:
+        raise ValueError(f"Unknown city_id: {city_id!r}")
+    return str(catalog.ids[row]), catalog.record(row)
+
+def memoize_scenario(kind, key_parts, compute_fn):
+    """Serve a scenario result from the shared store, computing it at most once per TTL.
+    key_parts should hold canonical (quantized) inputs, so near-identical requests share it."""
+    # a reloaded city catalogue invalidates results computed from the old city data
+    key = f"scenario:{MEMO_NAMESPACE}:{city_catalog.current().version}:{kind}:{canonical.digest(key_parts)}"
+    return result_store.get_or_compute(key, SCENARIO_MEMO_TTL, compute_fn)
+
+ASTEROID_DENSITY = 2600  # kg/m³ (typical rocky asteroid)
+
+def calculate_detailed_impact_physics(diameter_m, velocity_km_s, density_kg_m3=ASTEROID_DENSITY):
+    """Calculate comprehensive impact physics (inputs may also be numpy arrays)"""
     # Constants
     EARTH_GRAVITY = 9.81  # m/s²
-    ASTEROID_DENSITY = 2600  # kg/m³ (typical rocky asteroid)
     
     # Basic calculations
     radius_m = diameter_m / 2
     volume_m3 = (4/3) * math.pi * (radius_m ** 3)
-    mass_kg = volume_m3 * ASTEROID_DENSITY
+    mass_kg = volume_m3 * density_kg_m3
     velocity_m_s = velocity_km_s * 1000
     
     # Kinetic energy (Joules)
@@ -173,7 +181,7 @@ def calculate_detailed_impact_physics(diameter_m, velocity_km_s):
     shockwave_radius_km = 4.6 * (kinetic_energy_mt ** 0.33)
     airblast_radius_km = 8.2 * (kinetic_energy_mt ** 0.33)
     
-    return {
+    physics = {
         'diameter_m': diameter_m,
         'mass_kg': mass_kg,
         'velocity_km_s': velocity_km_s,
@@ -185,6 +193,48 @@ def calculate_detailed_impact_physics(diameter_m, velocity_km_s):
         'shockwave_radius_km': shockwave_radius_km,
         'airblast_radius_km': airblast_radius_km
     }
+    # seismic shaking and ejecta blanket
+    physics.update(secondary_effects.summary(physics))
+    return physics
+
+def run_impact_scenario(scenario, diameter, velocity, city_key, city_data):
+    """Physics plus scenario-model impact outputs, memoized across workers"""
+    def compute():
+        physics = calculate_detailed_impact_physics(diameter, velocity)
+        return physics, to_python(scenario.evaluate_impact(build_impact_inputs(physics, city_data)))
+    return memoize_scenario('impact', (scenario.name, scenario.fingerprint, city_key, diameter, velocity), compute)
+
+def impact_fatality(physics, scenario):
+    """Fatality fraction against distance (km): the scenario model's blast lethalities add up
+    inside each zone, as in its city formulas, and shaking and ejecta take a share of the rest"""
+    zones = [(physics[f'{zone}_radius_km'], float(scenario.coefficients.get(f'{zone}_lethality', 0.0)))
+             for zone in ('fireball', 'thermal', 'shockwave')]
+    def fatality(r_km):
+        blast = np.minimum(sum(rate * (r_km <= radius) for radius, rate in zones), 1.0)
+        effects = secondary_effects.profile(physics, r_km)
+        return np.minimum(blast + (1.0 - blast) * (effects['shaking_fatality_rate'] + effects['ejecta_fatality_rate']), 1.0)
+    return fatality
+
+def run_region_exposure(lat, lng, physics, scenario):
+    """Population, casualties and infrastructure per country and admin region under a footprint"""
+    catalog = city_catalog.current()
+    radii = {name: physics[f'{name}_radius_km'] for name in ('fireball', 'thermal', 'shockwave', 'airblast')}
+    radii['seismic_damage'] = physics['seismic_damage_radius_km']
+    radii['ejecta'] = physics['ejecta_radius_km']
+    return regions.current(catalog).exposure(lat, lng, radii, impact_fatality(physics, scenario), catalog)
+
+def build_impact_inputs(physics, city_data):
+    """Inputs for a scenario model's impact plan (physics plus city metrics)"""
+    inputs = dict(physics)
+    fatalities = secondary_effects.city_fatality_fractions(physics, city_data['area_km2'])
+    inputs.update({
+        'population': city_data['population'],
+        'area_km2': city_data['area_km2'],
+        'buildings': city_data.get('buildings'),
+        'seismic_fatality_fraction': fatalities['seismic'],
+        'ejecta_fatality_fraction': fatalities['ejecta']
+    })
+    return inputs
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -195,64 +245,90 @@ def health_check():
         'services': {
             'nasa_api': 'connected' if NASA_API_KEY else 'missing_key',
             'gemini_ai': 'connected' if model else 'disconnected'
-        }
+        },
+        'result_store': result_store.stats(),
+        'city_catalog': {'version': city_catalog.current().version, 'cities': len(city_catalog.current())},
+        'neo_catalog': neo_catalog.current().describe(),
+        'regions': regions.current(city_catalog.current()).describe(),
+        'jobs': job_queue.stats()
     })
 
+def score_hazardous_asteroids(data, scenario):
+    """Score every hazardous object in a NASA feed response, highest risk first"""
+    hazardous_asteroids = []
+
+    for date, asteroids in data['near_earth_objects'].items():
+        for asteroid in asteroids:
+            if asteroid.get('is_potentially_hazardous_asteroid', False):
+                # Calculate enhanced risk score
+                diameter = asteroid['estimated_diameter']['meters']['estimated_diameter_max']
+                velocity = float(asteroid['close_approach_data'][0]['relative_velocity']['kilometers_per_second'])
+                miss_distance = float(asteroid['close_approach_data'][0]['miss_distance']['kilometers'])
+
+                # Risk scoring algorithm (weights come from the scenario model)
+                risk_score = float(scenario.evaluate_risk({
+                    'diameter_m': diameter,
+                    'velocity_km_s': velocity,
+                    'miss_distance_km': miss_distance
+                })['risk_score'])
+
+                hazardous_asteroids.append({
+                    'id': asteroid['id'],
+                    'name': asteroid['name'],
+                    'diameter_m': diameter,
+                    'velocity_km_s': velocity,
+                    'miss_distance_km': miss_distance,
+                    'approach_date': asteroid['close_approach_data'][0]['close_approach_date'],
+                    'risk_score': round(risk_score, 1),
+                    'threat_level': get_threat_level(risk_score)
+                })
+
+    # Sort by risk score
+    hazardous_asteroids.sort(key=lambda x: x['risk_score'], reverse=True)
+    return hazardous_asteroids
+
+def build_hazardous_asteroids(data, scenario):
+    """Score hazardous objects from a NASA feed response and keep the top 10"""
+    hazardous_asteroids = score_hazardous_asteroids(data, scenario)
+    return {
+        'success': True,
+        'count': len(hazardous_asteroids),
+        'asteroids': hazardous_asteroids[:10]  # Top 10 most dangerous
+    }
+
+def catalog_feed(feed_key, feed, fetched):
+    """Merge a feed into this worker's NEO catalogue when it is new here (fetched now,
+    never seen, or last merged more than a cache TTL ago)"""
+    seen = neo_catalog.ingested_at(feed_key)
+    if fetched or seen is None or time.time() - seen > NEO_CACHE_TTL:
+        neo_catalog.ingest_feed(feed, feed_key)
+
+def load_neo_feed():
+    """Current 7-day NASA feed; one fetch per TTL serves every worker"""
+    start_date, end_date = feed_date_range()
+    feed_key = f"neo_feed_{start_date}_{end_date}"
+    hit, feed = cache_lookup(feed_key, NEO_CACHE_TTL)
+    if not hit:
+        response = requests.get(nasa_service.feed_url(start_date, end_date), timeout=10)
+        if response.status_code != 200:
+            raise UpstreamError(f'NASA API error: {response.status_code}')
+        feed = neo_catalog.compact_feed(response.json())
+        cache_store(feed_key, feed)
+    catalog_feed(feed_key, feed, not hit)
+    return feed
+
 @app.route('/api/neo/hazardous', methods=['GET'])
 def get_hazardous_asteroids():
     """Get hazardous Near Earth Objects from NASA API"""
     try:
-        # Get current date and 7 days ahead
-        start_date = datetime.now().strftime('%Y-%m-%d')
-        end_date = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-        
-        url = f"https://api.nasa.gov/neo/rest/v1/feed?start_date={start_date}&end_date={end_date}&api_key={NASA_API_KEY}"
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            hazardous_asteroids = []
-            
-            for date, asteroids in data['near_earth_objects'].items():
-                for asteroid in asteroids:
-                    if asteroid.get('is_potentially_hazardous_asteroid', False):
-                        # Calculate enhanced risk score
-                        diameter = asteroid['estimated_diameter']['meters']['estimated_diameter_max']
-                        velocity = float(asteroid['close_approach_data'][0]['relative_velocity']['kilometers_per_second'])
-                        miss_distance = float(asteroid['close_approach_data'][0]['miss_distance']['kilometers'])
-                        
-                        # Risk scoring algorithm
-                        size_score = min(diameter / 1000 * 100, 100)  # Normalize to 100
-                        velocity_score = min(velocity / 30 * 100, 100)  # Normalize to 100
-                        proximity_score = max(0, 100 - (miss_distance / 7480000 * 100))  # Moon distance = 0 score
-                        
-                        risk_score = (size_score * 0.4 + velocity_score * 0.3 + proximity_score * 0.3)
-                        
-                        hazardous_asteroids.append({
-                            'id': asteroid['id'],
-                            'name': asteroid['name'],
-                            'diameter_m': diameter,
-                            'velocity_km_s': velocity,
-                            'miss_distance_km': miss_distance,
-                            'approach_date': asteroid['close_approach_data'][0]['close_approach_date'],
-                            'risk_score': round(risk_score, 1),
-                            'threat_level': get_threat_level(risk_score)
-                        })
-            
-            # Sort by risk score
-            hazardous_asteroids.sort(key=lambda x: x['risk_score'], reverse=True)
-            
-            return jsonify({
-                'success': True,
-                'count': len(hazardous_asteroids),
-                'asteroids': hazardous_asteroids[:10]  # Top 10 most dangerous
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': f'NASA API error: {response.status_code}'
-            }), 500
-            
+        scenario = scenario_models.get(request.args.get('model', DEFAULT_SCENARIO_MODEL))
+        return jsonify(build_hazardous_asteroids(load_neo_feed(), scenario))
+
+    except ScenarioModelError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -272,47 +348,90 @@ def get_threat_level(risk_score):
     else:
         return 'MINIMAL'
 
+def build_neo_statistics(stats, catalog):
+    """Enhanced statistics payload from a NASA stats response and the NEO catalogue"""
+    # size classes (< 140 m, 140 m - 1 km, > 1 km) are counted over the catalogued objects
+    sample = catalog.aggregate()
+    enhanced_stats = {
+        'total_discovered': stats['near_earth_object_count'],
+        'potentially_hazardous': stats.get('potentially_hazardous_asteroid_count', 0),
+        'size_distribution': sample['size_distribution'],
+        'size_fractions': sample['size_fractions'],
+        'catalog': dict(sample, **catalog.describe()),
+        'discovery_rate': {
+            'per_year': 2000,  # Approximate current rate
+            'trend': 'increasing'
+        },
+        'impact_probability': {
+            'next_100_years': 0.01,  # 1% chance
+            'civilization_threat': 0.0001  # 0.01% chance
+        }
+    }
+
+    return {
+        'success': True,
+        'statistics': enhanced_stats,
+        'last_updated': datetime.now().isoformat()
+    }
+
 @app.route('/api/neo/stats', methods=['GET'])
 def get_neo_statistics():
     """Get comprehensive NEO statistics"""
     try:
         # Get NEO statistics from NASA
-        url = f"https://api.nasa.gov/neo/rest/v1/stats?api_key={NASA_API_KEY}"
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
+        hit, stats = cache_lookup('neo_stats', NEO_CACHE_TTL)
+        if not hit:
+            response = requests.get(nasa_service.stats_url(), timeout=10)
+            if response.status_code != 200:
+                return jsonify({
+                    'success': False,
+                    'error': f'NASA API error: {response.status_code}'
+                }), 500
             stats = response.json()
-            
-            # Enhanced statistics
-            enhanced_stats = {
-                'total_discovered': stats['near_earth_object_count'],
-                'potentially_hazardous': stats.get('potentially_hazardous_asteroid_count', 0),
-                'size_distribution': {
-                    'small': stats.get('near_earth_object_count', 0) * 0.85,  # < 140m
-                    'medium': stats.get('near_earth_object_count', 0) * 0.12,  # 140m - 1km
-                    'large': stats.get('near_earth_object_count', 0) * 0.03   # > 1km
-                },
-                'discovery_rate': {
-                    'per_year': 2000,  # Approximate current rate
-                    'trend': 'increasing'
-                },
-                'impact_probability': {
-                    'next_100_years': 0.01,  # 1% chance
-                    'civilization_threat': 0.0001  # 0.01% chance
-                }
-            }
-            
-            return jsonify({
-                'success': True,
-                'statistics': enhanced_stats,
-                'last_updated': datetime.now().isoformat()
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': f'NASA API error: {response.status_code}'
-            }), 500
-            
+            cache_store('neo_stats', stats)
+
+        try:
+            load_neo_feed()
+        except (UpstreamError, requests.RequestException) as e:
+            # the catalogue keeps what earlier feeds put in it
+            logger.warning(f"NEO feed unavailable for statistics: {e}")
+        return jsonify(build_neo_statistics(stats, neo_catalog.current()))
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/neo/catalog', methods=['GET'])
+def query_neo_catalog():
+    """Filter, sort and aggregate the catalogued NEOs.
+    Query: hazardous, min_/max_ diameter_m | diameter_min_m | diameter_max_m | velocity_km_s |
+    miss_distance_km | h_magnitude, from / to (approach dates), name (substring),
+    sort (a range field, approach_date or name), order (asc | desc), offset, limit,
+    format ('json' | 'arrow' | 'parquet': every matching row as a columnar table)
+    """
+    try:
+        fmt = columnar.export_format(request.args)
+        query, offset, limit = neo_catalog.parse_query(request.args)
+        catalog = neo_catalog.current()
+        rows = catalog.query(**query)
+        if fmt != 'json':
+            return columnar.table_response(catalog.export_columns(rows), fmt, catalog.describe(), name='neo_catalog')
+        return jsonify({
+            'success': True,
+            'asteroids': catalog.records(rows[offset:offset + limit]),
+            'total': int(len(rows)),
+            'offset': offset,
+            'aggregate': catalog.aggregate(rows),
+            'catalog': catalog.describe()
+        })
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -321,57 +440,44 @@ def get_neo_statistics():
 
 @app.route('/api/impact/simulate', methods=['POST'])
 def simulate_impact():
-    """Simulate asteroid impact with detailed physics"""
+    """Simulate asteroid impact with detailed physics.
+    Body: diameter, velocity, city_id, model, quantize ('snap' | 'interpolate' | 'exact')
+    """
     try:
         data = request.get_json()
         diameter = data.get('diameter', 100)  # meters
         velocity = data.get('velocity', 20)   # km/s
         city_id = data.get('city_id', 'new-york')
 
-        # Get city data
-        city_data = CITY_DATABASE.get(city_id, CITY_DATABASE['new-york'])
-
-        # Calculate physics
-        physics = calculate_detailed_impact_physics(diameter, velocity)
-
-        # Calculate casualties and damage
-        population = city_data['population']
-        area_km2 = city_data['area_km2']
-
-        # Damage zones and casualties
-        fireball_area = math.pi * (physics['fireball_radius_km'] ** 2)
-        thermal_area = math.pi * (physics['thermal_radius_km'] ** 2)
-        shockwave_area = math.pi * (physics['shockwave_radius_km'] ** 2)
+        scenario = scenario_models.get(data.get('model', DEFAULT_SCENARIO_MODEL))
+        inputs = canonical.canonicalize(data, diameter_m=diameter, velocity_km_s=velocity)
 
-        # Population density in damage zones
-        pop_density = population / area_km2
-
-        # Casualty estimates (simplified model)
-        fireball_casualties = min(fireball_area * pop_density * 0.95, population)
-        thermal_casualties = min(thermal_area * pop_density * 0.6, population)
-        shockwave_casualties = min(shockwave_area * pop_density * 0.3, population)
-
-        total_casualties = min(fireball_casualties + thermal_casualties + shockwave_casualties, population)
+        # Get city data
+        city_data = get_city(city_id)
 
-        # Infrastructure damage
-        buildings_destroyed = min(shockwave_area * 1000, city_data.get('buildings', 100000))
-        economic_damage_billion = physics['kinetic_energy_mt'] * 10  # Rough estimate
+        # Physics, casualties and infrastructure damage from the compiled scenario model
+        physics, impact = canonical.evaluate(inputs, lambda diameter_m, velocity_km_s: run_impact_scenario(
+            scenario, diameter_m, velocity_km_s, city_id, city_data))
 
         result = {
             'physics': physics,
             'casualties': {
-                'total': int(total_casualties),
-                'fireball_zone': int(fireball_casualties),
-                'thermal_zone': int(thermal_casualties),
-                'shockwave_zone': int(shockwave_casualties),
-                'survival_rate': max(0, (population - total_casualties) / population * 100)
+                'total': int(impact['total_casualties']),
+                'fireball_zone': int(impact['fireball_casualties']),
+                'thermal_zone': int(impact['thermal_casualties']),
+                'shockwave_zone': int(impact['shockwave_casualties']),
+                'seismic': int(impact.get('seismic_casualties', 0)),
+                'ejecta': int(impact.get('ejecta_casualties', 0)),
+                'survival_rate': float(impact['survival_rate'])
             },
             'damage': {
-                'buildings_destroyed': int(buildings_destroyed),
-                'economic_damage_billion_usd': round(economic_damage_billion, 2),
-                'infrastructure_damage_percent': min(90, physics['kinetic_energy_mt'] * 5)
+                'buildings_destroyed': int(impact['buildings_destroyed']),
+                'economic_damage_billion_usd': round(float(impact['economic_damage_billion_usd']), 2),
+                'infrastructure_damage_percent': float(impact['infrastructure_damage_percent'])
             },
             'city_data': city_data,
+            'model': scenario.name,
+            'quantization': inputs.report(),
             'timestamp': datetime.now().isoformat()
         }
 
@@ -380,25 +486,20 @@ def simulate_impact():
             'simulation': result
         })
 
+    except (ScenarioModelError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
-@app.route('/api/ai/risk-analysis', methods=['POST'])
-def ai_risk_analysis():
-    """AI-powered city risk analysis using Gemini"""
-    try:
-        data = request.get_json()
-        city_id = data.get('city_id', 'new-york')
-        asteroid_size = data.get('asteroid_size', 100)
-
-        city_data = CITY_DATABASE.get(city_id, CITY_DATABASE['new-york'])
-
-        if model:
-            # Create detailed prompt for Gemini AI
-            prompt = f"""
+def build_risk_prompt(city_data, asteroid_size):
+    """Detailed Gemini prompt for a city risk briefing"""
+    return f"""
             You are Dr. Sarah Chen, a leading planetary defense expert with 20 years of experience at NASA's Planetary Defense Coordination Office.
 
             Analyze the asteroid impact risk for {city_data['name']} with the following parameters:
@@ -426,35 +527,109 @@ def ai_risk_analysis():
             Write as an expert briefing to emergency management officials. Be scientific but accessible.
             """
 
-            try:
-                response = model.generate_content(prompt)
-                ai_analysis = response.text
-            except Exception as e:
-                print(f"Gemini API error: {e}")
-                ai_analysis = f"AI analysis temporarily unavailable. Based on the data, {city_data['name']} shows moderate to high vulnerability due to population density of {city_data['population_density']:,} people/km². Immediate evacuation protocols should be activated for a {asteroid_size}m asteroid impact."
-        else:
-            ai_analysis = f"AI analysis unavailable. {city_data['name']} requires immediate assessment for {asteroid_size}m asteroid impact scenario."
-
-        # Calculate basic risk factors
-        risk_factors = {
-            'population_density': min(100, city_data['population_density'] / 200),
-            'infrastructure_vulnerability': 100 - city_data['infrastructure_score'],
-            'emergency_preparedness': city_data['emergency_preparedness'],
-            'geographic_risk': city_data.get('geographic_risk', 50)
+def ai_state(key):
+    """('ready', value) from the shared AI cache, else the shared marker ('pending' | 'failed' | None)"""
+    hit, value = cache_lookup(key, AI_CACHE_TTL)
+    if hit:
+        return 'ready', value
+    return result_store.get(f"ai-state:{key}"), None
+
+def ai_begin(key):
+    result_store.set(f"ai-state:{key}", 'pending', AI_CALL_TIMEOUT)
+
+def ai_finish(key, value):
+    """Cache a parsed answer, or hold off retries for a while after a failure"""
+    if value is not None:
+        cache_store(key, value, AI_CACHE_TTL)
+    else:
+        result_store.set(f"ai-state:{key}", 'failed', AI_RETRY_SECONDS)
+
+def complete_ai_call(key, prompt, parse):
+    try:
+        value = parse(model.generate_content(prompt).text)
+    except Exception as e:
+        logger.error(f"Gemini API error for {key}: {e}")
+        value = None
+    ai_finish(key, value)
+    with ai_lock:
+        ai_inflight.pop(key, None)
+    return value
+
+def hedged_ai(key, make_prompt, parse):
+    """(value, status) for a cached or freshly parsed AI answer. status is 'ready', 'pending'
+    (still running after AI_DEADLINE_SECONDS; the same request later gets it from the cache)
+    or 'unavailable'. At most one call per key runs at a time on this host."""
+    state, value = ai_state(key)
+    if state == 'ready':
+        return value, 'ready'
+    if model is None or state == 'failed':
+        return None, 'unavailable'
+    with ai_lock:
+        future = ai_inflight.get(key)
+        if future is None:
+            if state == 'pending':
+                # another worker is already asking
+                return None, 'pending'
+            ai_begin(key)
+            future = ai_inflight[key] = ai_executor.submit(complete_ai_call, key, make_prompt(), parse)
+    try:
+        value = future.result(timeout=AI_DEADLINE_SECONDS)
+    except FutureTimeout:
+        return None, 'pending'
+    return (value, 'ready') if value is not None else (None, 'unavailable')
+
+def build_risk_analysis(city_data, asteroid_size, ai_analysis=None, ai_status='unavailable', ai_bucket=None):
+    """Risk analysis payload: the templated briefing (or AI text when available) with computed risk factors"""
+    briefing = briefings.risk_briefing(
+        briefings.briefing_context(city_data, calculate_detailed_impact_physics(asteroid_size, 20)))
+    # Calculate basic risk factors
+    risk_factors = {
+        'population_density': min(100, city_data['population_density'] / 200),
+        'infrastructure_vulnerability': 100 - city_data['infrastructure_score'],
+        'emergency_preparedness': city_data['emergency_preparedness'],
+        'geographic_risk': city_data.get('geographic_risk', 50)
+    }
+
+    overall_risk = sum(risk_factors.values()) / len(risk_factors)
+
+    return {
+        'success': True,
+        'analysis': {
+            'ai_analysis': ai_analysis or briefing,
+            'briefing': briefing,
+            'source': 'ai' if ai_analysis else 'template',
+            'ai_status': ai_status,
+            # the AI answer is shared by all sizes in this bucket
+            'ai_bucket': ai_bucket if ai_analysis else None,
+            'risk_score': round(overall_risk, 1),
+            'risk_factors': risk_factors,
+            'city_data': city_data,
+            'recommendations': generate_recommendations(city_data, asteroid_size)
         }
+    }
 
-        overall_risk = sum(risk_factors.values()) / len(risk_factors)
+@app.route('/api/ai/risk-analysis', methods=['POST'])
+def ai_risk_analysis():
+    """AI-powered city risk analysis using Gemini.
+    Body: city_id, asteroid_size
+    analysis.ai_status is 'ready' (AI text), 'unavailable' (templated briefing only) or
+    'pending': Gemini is still answering, the briefing is templated for now and the same
+    request repeated a few seconds later returns the cached answer. Clients re-send only
+    while the status is 'pending'.
+    """
+    try:
+        data = request.get_json()
+        city_id = data.get('city_id', 'new-york')
+        asteroid_size = data.get('asteroid_size', 100)
 
-        return jsonify({
-            'success': True,
-            'analysis': {
-                'ai_analysis': ai_analysis,
-                'risk_score': round(overall_risk, 1),
-                'risk_factors': risk_factors,
-                'city_data': city_data,
-                'recommendations': generate_recommendations(city_data, asteroid_size)
-            }
-        })
+        city_data = get_city(city_id)
+
+        # Gemini is asked about the bucket centre so its cached answer fits the whole bucket
+        key, bucket = briefings.bucket_key('risk', city_id, asteroid_size)
+        ai_analysis, ai_status = hedged_ai(key, lambda: build_risk_prompt(city_data, bucket['diameter_m']),
+                                           briefings.parse_briefing)
+
+        return jsonify(build_risk_analysis(city_data, asteroid_size, ai_analysis, ai_status, bucket))
 
     except Exception as e:
         return jsonify({
@@ -465,8 +640,10 @@ def ai_risk_analysis():
 @app.route('/api/impact/simulate-real', methods=['GET'])
 def simulate_real_impact():
     """Simulate asteroid impact using lat/lng and optional provided asteroid parameters.
-    Query params: asteroid_id (optional), lat, lng, diameter (m, optional), velocity (km/s, optional)
-    Picks nearest known city to ground population metrics, then computes physics.
+    Query params: asteroid_id (optional), lat, lng, diameter (m, optional), velocity (km/s, optional),
+    quantize ('snap' | 'interpolate' | 'exact')
+    Picks nearest known city to ground population metrics, then computes physics; exposure
+    breaks the whole footprint down by country and admin region.
     """
     try:
         asteroid_id = request.args.get('asteroid_id')  # currently unused, kept for compatibility
@@ -476,37 +653,14 @@ def simulate_real_impact():
         velocity = float(request.args.get('velocity', '20'))
 
         # Find nearest city in our database to ground casualty/damage calcs
-        def haversine(lat1, lon1, lat2, lon2):
-            R = 6371.0
-            dlat = math.radians(lat2 - lat1)
-            dlon = math.radians(lon2 - lon1)
-            a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-            return R * c
-
-        nearest_key = None
-        nearest_dist = float('inf')
-        for key, cd in CITY_DATABASE.items():
-            d = haversine(lat, lng, cd['lat'], cd['lng'])
-            if d < nearest_dist:
-                nearest_dist = d
-                nearest_key = key
-        city_data = CITY_DATABASE.get(nearest_key or 'new-york')
-
-        physics = calculate_detailed_impact_physics(diameter, velocity)
-
-        population = city_data['population']
-        area_km2 = city_data['area_km2']
-        pop_density = population / max(area_km2, 1)
-
-        fireball_area = math.pi * (physics['fireball_radius_km'] ** 2)
-        thermal_area = math.pi * (physics['thermal_radius_km'] ** 2)
-        shockwave_area = math.pi * (physics['shockwave_radius_km'] ** 2)
+        catalog = city_catalog.current()
+        nearest_key = str(catalog.ids[catalog.nearest(lat, lng)])
+        city_data = catalog.get(nearest_key)
 
-        fireball_casualties = min(fireball_area * pop_density * 0.95, population)
-        thermal_casualties = min(thermal_area * pop_density * 0.6, population)
-        shockwave_casualties = min(shockwave_area * pop_density * 0.3, population)
-        total_casualties = min(fireball_casualties + thermal_casualties + shockwave_casualties, population)
+        scenario = scenario_models.get(request.args.get('model', DEFAULT_SCENARIO_MODEL))
+        inputs = canonical.canonicalize(request.args, diameter_m=diameter, velocity_km_s=velocity)
+        physics, impact = canonical.evaluate(inputs, lambda diameter_m, velocity_km_s: run_impact_scenario(
+            scenario, diameter_m, velocity_km_s, nearest_key, city_data))
 
         result = {
             'asteroid': {
@@ -523,108 +677,373 @@ def simulate_real_impact():
                 'velocity_kms': velocity
             },
             'casualties': {
-                'total': int(total_casualties),
-                'fireball_zone': int(fireball_casualties),
-                'thermal_zone': int(thermal_casualties),
-                'shockwave_zone': int(shockwave_casualties)
+                'total': int(impact['total_casualties']),
+                'fireball_zone': int(impact['fireball_casualties']),
+                'thermal_zone': int(impact['thermal_casualties']),
+                'shockwave_zone': int(impact['shockwave_casualties']),
+                'seismic': int(impact.get('seismic_casualties', 0)),
+                'ejecta': int(impact.get('ejecta_casualties', 0))
             },
             'city_data': city_data,
             'nearest_city_key': nearest_key,
+            'exposure': run_region_exposure(lat, lng, physics, scenario),
+            'model': scenario.name,
+            'quantization': inputs.report()
         }
 
         return jsonify({ 'success': True, 'simulation': result })
+    except (ScenarioModelError, ValueError) as e:
+        return jsonify({ 'success': False, 'error': str(e) }), 400
     except Exception as e:
         return jsonify({ 'success': False, 'error': str(e) }), 500
 
 
-@app.route('/api/ai/mitigations', methods=['POST'])
-def ai_mitigations():
-    """Generate technical and civil protection mitigations using Gemini, strictly grounded to provided data."""
-    try:
-        data = request.get_json()
-        city_id = data.get('city_id', 'new-york')
-        asteroid_size = data.get('asteroid_size', 100)
-        velocity = data.get('velocity', 20)
-
-        city_data = CITY_DATABASE.get(city_id, CITY_DATABASE['new-york'])
-        physics = calculate_detailed_impact_physics(asteroid_size, velocity)
-
-        base_context = {
-            'city': city_data,
-            'asteroid': {
-                'diameter_m': asteroid_size,
-                'velocity_km_s': velocity,
-                'energy_mt': physics['kinetic_energy_mt']
-            }
-        }
-
-        technical_defaults = [
-            'Kinetic impactor mission planning (multi-year lead time, trajectory change)',
-            'Gravity tractor station-keeping (requires years of engagement)',
-            'Nuclear standoff detonation (last resort; fragmentation risk management)',
-            'Wide-field survey expansion to extend warning time',
-            'Rapid-launch capability and mission rehearsal'
-        ]
-        civil_defaults = [
-            'Tiered evacuations by concentric zones based on shock/thermal radii',
-            'Hardened shelters and underground facilities activation',
-            'Medical surge capacity and triage centers near low-risk zones',
-            'Fuel, food, water stockpiles; backup comms and power',
-            'Tsunami protocols for coastal areas; traffic contraflow plans'
-        ]
+def build_mitigation_context(city_data, asteroid_size, velocity):
+    """Structured context the mitigation prompt and response are grounded to"""
+    physics = calculate_detailed_impact_physics(asteroid_size, velocity)
+    return {
+        'city': city_data,
+        'asteroid': {
+            'diameter_m': asteroid_size,
+            'velocity_km_s': velocity,
+            'energy_mt': physics['kinetic_energy_mt']
+        },
+        'effects': {name: round(physics[name], 2) for name in
+                    ('fireball_radius_km', 'thermal_radius_km', 'shockwave_radius_km', 'crater_diameter_km')},
+        'deflection': deflection.method_summary(deflection.make_target(asteroid_size, velocity))
+    }
 
-        if model:
-            prompt = f"""
+def build_mitigation_prompt(base_context):
+    """Gemini prompt asking for mitigations as compact JSON"""
+    return f"""
 You are a mitigation planner. ONLY use the structured JSON context below. Do not invent data. If something is not present, say 'Not available'.
 Return a compact JSON with keys: technical_mitigations, civil_mitigations, priority_actions (3 items), rationale.
 
 CONTEXT (JSON):
-City: {json.dumps(city_data)}
+City: {json.dumps(base_context['city'])}
 Asteroid: {json.dumps(base_context['asteroid'])}
+Effects (radii from the impact point): {json.dumps(base_context['effects'])}
+Deflection (shortest workable lead time per method): {json.dumps(base_context['deflection'])}
 
 Rules:
 - Ground all numbers to provided context (e.g., use energy_mt, population, coastal, hospitals).
 - If coastal is true, include tsunami-specific steps.
+- Only recommend deflection methods whose lead time is available; cite the lead times given.
 - Keep items short (max 20 words each).
 - Avoid speculative technologies; stick to standard methods.
 """
-            try:
-                response = model.generate_content(prompt)
-                text = response.text or ''
-            except Exception as e:
-                print(f"Gemini API error in mitigations: {e}")
-                text = ''
-        else:
-            text = ''
-
-        mitigations = {
-            'technical_mitigations': technical_defaults,
-            'civil_mitigations': civil_defaults,
-            'priority_actions': [
-                'Issue immediate public guidance and activate EOC',
-                'Pre-stage evacuations based on shock radius',
-                'Secure hospitals, fuel, water, and shelters'
-            ],
-            'rationale': 'Defaults used; AI text merged when available.'
+
+def build_mitigations(base_context, ai=None, ai_status='unavailable', ai_bucket=None):
+    """Templated mitigations grounded to the context, with parsed AI fields merged over them"""
+    asteroid = base_context['asteroid']
+    physics = calculate_detailed_impact_physics(asteroid['diameter_m'], asteroid['velocity_km_s'])
+    mitigations = briefings.mitigation_plan(briefings.briefing_context(base_context['city'], physics),
+                                            base_context['deflection'])
+    mitigations.update(ai or {})
+
+    return {
+        'success': True,
+        'context': base_context,
+        'mitigations': mitigations,
+        'source': 'ai' if ai else 'template',
+        'ai_status': ai_status,
+        'ai_bucket': ai_bucket if ai else None
+    }
+
+def run_multi_impact(data, workers=None, progress=None, export_format='json'):
+    """Multi-impact accumulation and exposure report (shared by the endpoint and the job queue)"""
+    impacts = multi_impact.impact_array(data.get('impacts'), data.get('swarms'))
+    resolution = float(data.get('resolution_deg', multi_impact.DEFAULT_RESOLUTION_DEG))
+    if not 0.01 <= resolution <= 5:
+        raise ValueError('resolution_deg must be between 0.01 and 5')
+
+    started = time.perf_counter()
+    (cells, overpressure, fluence), workers = multi_impact.run_impacts(impacts, resolution, workers, progress)
+    grid = multi_impact.WorldGrid(resolution)
+    report = multi_impact.exposure_report(grid, cells, overpressure, fluence, city_catalog.current().columns)
+
+    response = {
+        'success': True,
+        'impacts': len(impacts),
+        'total_energy_mt': float(multi_impact.impact_energy_j(impacts[:, 2], impacts[:, 3], impacts[:, 4]).sum()
+                                 / timelapse.MEGATON_J),
+        'grid': {
+            'resolution_deg': resolution,
+            'cells_touched': int(len(cells)),
+            'cells_total': grid.rows * grid.cols,
+            'bytes': int(cells.nbytes + overpressure.nbytes + fluence.nbytes)
+        },
+        'exposure': report,
+        'workers': workers,
+        'compute_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+    if export_format != 'json':
+        lat, lng = grid.cell_centres(cells)
+        return columnar.table_response({
+            'cell': cells,
+            'lat': lat,
+            'lng': lng,
+            'overpressure_kpa': overpressure,
+            'thermal_fluence_kj_m2': fluence
+        }, export_format, summary=response, name='multi-impact')
+    if data.get('include_cells'):
+        # strongest cells first, capped so a global swarm cannot produce a huge payload
+        top = np.argsort(-overpressure)[:50000]
+        lat, lng = grid.cell_centres(cells[top])
+        response['cells'] = {
+            'lat': to_python(np.round(lat, 4)),
+            'lng': to_python(np.round(lng, 4)),
+            'overpressure_kpa': to_python(np.round(overpressure[top], 2)),
+            'thermal_fluence_kj_m2': to_python(np.round(fluence[top], 2))
         }
+    return response
+
+@app.route('/api/impact/multi', methods=['POST'])
+def simulate_multi_impact():
+    """Accumulate many simultaneous impacts on a sparse world grid.
+    Body: impacts [{lat, lng, diameter, velocity?, density?}], swarms [{lat, lng, diameter, count,
+    spread_km?, azimuth_deg?, velocity?, seed?}], resolution_deg (default 0.1), include_cells,
+    format ('json' | 'arrow' | 'parquet': every touched cell as a columnar table)
+    """
+    try:
+        data = request.get_json() or {}
+        result = run_multi_impact(data, export_format=columnar.export_format(data))
+        return result if isinstance(result, Response) else jsonify(result)
 
-        # Try to merge AI JSON if present
-        try:
-            ai_json_start = text.find('{')
-            ai_json_end = text.rfind('}')
-            if ai_json_start != -1 and ai_json_end != -1:
-                ai_obj = json.loads(text[ai_json_start:ai_json_end+1])
-                for k in ['technical_mitigations', 'civil_mitigations', 'priority_actions', 'rationale']:
-                    if k in ai_obj:
-                        mitigations[k] = ai_obj[k]
-        except Exception:
-            pass
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def run_corridor(data, workers=None, progress=None, export_format='json'):
+    """Corridor density and expected casualties (shared by the endpoint and the job queue)"""
+    scenario = scenario_models.get(data.get('model', DEFAULT_SCENARIO_MODEL))
+    nominal = get_city(data.get('city_id', 'new-york'))
+    lat, lng = float(data.get('lat', nominal['lat'])), float(data.get('lng', nominal['lng']))
+    diameter, velocity = float(data.get('diameter', 100)), float(data.get('velocity', 20))
+
+    uncertainty = None
+    if data.get('covariance_km2') is not None:
+        covariance = data['covariance_km2']
+    else:
+        sigmas = {'sigma_major_km': float(data.get('sigma_major_km', 500.0)),
+                  'sigma_minor_km': float(data.get('sigma_minor_km', 20.0))}
+        if data.get('asteroid_id'):
+            neo = get_cached(f"physics_{data['asteroid_id']}", 300,
+                             lambda: nasa_service.get_neo_lookup(data['asteroid_id']))
+            if not neo or 'error' in neo:
+                raise UpstreamError('Failed to fetch asteroid data')
+            uncertainty = corridor.uncertainty_from_neo(neo, float(data.get('years_to_impact', 10.0)))
+            sigmas = {k: uncertainty[k] for k in ('sigma_major_km', 'sigma_minor_km')}
+        covariance = corridor.covariance_matrix(sigmas['sigma_major_km'], sigmas['sigma_minor_km'],
+                                                float(data.get('angle_deg', 0.0)))
+    resolution = float(data.get('resolution_deg', 0.25))
+    if not 0.01 <= resolution <= 5:
+        raise ValueError('resolution_deg must be between 0.01 and 5')
+
+    started = time.perf_counter()
+    geom = corridor.geometry(lat, lng, float(data.get('impact_angle_deg', 45.0)), float(data.get('azimuth_deg', 90.0)))
+    # v_inf from the atmospheric-entry velocity (entry speed includes the Earth's escape speed)
+    v_inf = math.sqrt(max(velocity ** 2 - corridor.EARTH_ESCAPE_KM_S ** 2, 0.01))
+    cells, hits, samples = corridor.sample_corridor(geom, covariance, v_inf, data.get('samples', 200000),
+                                                    float(data.get('sigma_time_s', 0.0)), resolution,
+                                                    int(data.get('seed', 0)), workers, progress)
+    hit_fraction = float(hits.sum()) / samples
+    if data.get('impact_probability') is not None:
+        # conditional geometry scaled to an externally known impact probability
+        probability = hits / max(hits.sum(), 1.0) * float(data['impact_probability'])
+    else:
+        probability = hits / samples
+
+    grid = multi_impact.WorldGrid(resolution)
+    lethal_radius = calculate_detailed_impact_physics(diameter, velocity)['shockwave_radius_km']
+    catalog = city_catalog.current()
+    cell_lat, cell_lng = grid.cell_centres(cells)
+    # only cities whose disc can meet the lethal radius around some hit cell
+    margin = lethal_radius + math.sqrt(catalog.columns['area_km2'].max() / math.pi if len(catalog) else 0.0)
+    cities = catalog.records(catalog.near_points(cell_lat, cell_lng, margin))
 
+    def centre_casualties(city_id, city_data):
+        return run_impact_scenario(scenario, diameter, velocity, city_id, city_data)[1]['total_casualties']
+
+    exposure = corridor.expected_casualties(grid, cells, probability, cities, lethal_radius, centre_casualties)
+
+    if export_format != 'json':
+        top = np.arange(len(cells))
+    else:
+        top = np.argsort(-probability)[:20000]
+    cell_lat, cell_lng = grid.cell_centres(cells[top])
+    response = {
+        'success': True,
+        'samples': samples,
+        'geometric_hit_fraction': hit_fraction,
+        'impact_probability': float(probability.sum()),
+        'uncertainty': uncertainty,
+        'corridor': corridor.corridor_shape(grid, cells, probability),
+        'density': {
+            'resolution_deg': resolution,
+            'cells': int(len(cells)),
+            'lat': to_python(np.round(cell_lat, 4)),
+            'lng': to_python(np.round(cell_lng, 4)),
+            'probability': to_python(probability[top])
+        },
+        'expected_casualties': {
+            'total': round(sum(row['expected_casualties'] for row in exposure), 1),
+            'cities': exposure
+        },
+        'model': scenario.name,
+        'compute_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+    if export_format != 'json':
+        del response['density']
+        return columnar.table_response({
+            'cell': cells,
+            'lat': cell_lat,
+            'lng': cell_lng,
+            'probability': probability
+        }, export_format, summary=dict(response, resolution_deg=resolution), name='corridor')
+    return response
+
+@app.route('/api/impact/corridor', methods=['POST'])
+def impact_corridor():
+    """Impact-probability corridor from B-plane uncertainty, with expected casualties.
+    Body: lat/lng of the nominal impact (or city_id), diameter, velocity, impact_angle_deg, azimuth_deg;
+    covariance_km2 or sigma_major_km/sigma_minor_km/angle_deg (or asteroid_id + years_to_impact for
+    the NASA uncertainty parameter); sigma_time_s, samples, resolution_deg, impact_probability, model,
+    format ('json' | 'arrow' | 'parquet': the full density grid as a columnar table)
+    """
+    try:
+        data = request.get_json() or {}
+        result = run_corridor(data, export_format=columnar.export_format(data))
+        return result if isinstance(result, Response) else jsonify(result)
+
+    except UpstreamError as e:
         return jsonify({
-            'success': True,
-            'context': base_context,
-            'mitigations': mitigations
-        })
+            'success': False,
+            'error': str(e)
+        }), 502
+    except ScenarioModelError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Physics outputs that grow with size, speed and density (usable as inverse-solve targets)
+INVERSE_PHYSICS_METRICS = ('mass_kg', 'kinetic_energy_mt', 'crater_diameter_km', 'crater_depth_km',
+                           'fireball_radius_km', 'thermal_radius_km', 'shockwave_radius_km',
+                           'airblast_radius_km', 'seismic_magnitude', 'seismic_damage_radius_km',
+                           'ejecta_radius_km')
+
+def run_inverse_solve(data):
+    """Thresholds of one impactor parameter over a grid of the other two, plus iso-contours"""
+    started = time.perf_counter()
+    scenario = scenario_models.get(data.get('model', DEFAULT_SCENARIO_MODEL))
+    solve_for = data.get('solve_for', 'diameter_m')
+    if solve_for not in inverse.PARAMETERS:
+        raise ValueError(f"solve_for must be one of {', '.join(inverse.PARAMETERS)}")
+    resolution = min(max(int(data.get('resolution', inverse.DEFAULT_RESOLUTION)), 2), inverse.MAX_RESOLUTION)
+    targets = inverse.parse_targets(data.get('targets'), INVERSE_PHYSICS_METRICS + tuple(scenario.impact.outputs))
+    bounds = inverse.parse_bounds(solve_for, data.get('bounds'))
+    axes = {name: inverse.parse_axis(name, data.get(name), resolution)
+            for name in inverse.PARAMETERS if name != solve_for}
+
+    # casualty and damage targets come from the scenario model for one city
+    city_id = data.get('city_id', 'new-york')
+    uses_city = any(metric in scenario.impact.outputs for metric in targets)
+    city_data = get_city(city_id) if uses_city else None
+
+    def evaluate(params):
+        physics = calculate_detailed_impact_physics(params['diameter_m'], params['velocity_km_s'], params['density_kg_m3'])
+        if uses_city:
+            physics.update(scenario.evaluate_impact(build_impact_inputs(physics, city_data)))
+        return physics
+
+    threshold, at_minimum, unreachable = inverse.solve(evaluate, targets, solve_for, bounds, axes)
+    return {
+        'success': True,
+        'solve_for': solve_for,
+        'feasible': f'{solve_for} >= threshold',
+        'bounds': list(bounds),
+        'targets': to_python(targets),
+        'axes': {name: to_python(np.round(values, 6)) for name, values in axes.items()},
+        # [level][first axis][second axis]; null where the targets are out of reach within bounds
+        'threshold': np.where(unreachable, None, np.round(threshold, 6)).tolist(),
+        'status': {
+            'solved': int((~at_minimum & ~unreachable).sum()),
+            'met_at_minimum': int(at_minimum.sum()),
+            'unreachable': int(unreachable.sum())
+        },
+        'contours': inverse.contours(threshold, targets, solve_for, axes),
+        'city_id': city_id if uses_city else None,
+        'model': scenario.name,
+        'compute_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+
+@app.route('/api/impact/inverse', methods=['POST'])
+def inverse_impact():
+    """Impactor parameters that produce target effects.
+    Body: targets ({metric: threshold or list of thresholds}, e.g. shockwave_radius_km, total_casualties,
+    kinetic_energy_mt), solve_for ('diameter_m' | 'velocity_km_s' | 'density_kg_m3'), bounds [min, max]
+    for it, the other two parameters as a fixed value or [min, max] range, resolution, city_id, model
+    """
+    try:
+        data = request.get_json() or {}
+        return jsonify(run_inverse_solve(data))
+
+    except ScenarioModelError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/ai/mitigations', methods=['POST'])
+def ai_mitigations():
+    """Generate technical and civil protection mitigations using Gemini, strictly grounded to provided data.
+    Body: city_id, asteroid_size, velocity
+    ai_status follows the risk-analysis contract: while it is 'pending' the mitigations are
+    templated and the same request repeated a few seconds later picks up the AI fields.
+    """
+    try:
+        data = request.get_json()
+        city_id = data.get('city_id', 'new-york')
+        asteroid_size = data.get('asteroid_size', 100)
+        velocity = data.get('velocity', 20)
+
+        city_data = get_city(city_id)
+        base_context = build_mitigation_context(city_data, asteroid_size, velocity)
+
+        key, bucket = briefings.bucket_key('mitigations', city_id, asteroid_size, velocity)
+        ai, ai_status = hedged_ai(key, lambda: build_mitigation_prompt(
+            build_mitigation_context(city_data, bucket['diameter_m'], bucket['velocity_km_s'])),
+            briefings.parse_mitigations)
+
+        return jsonify(build_mitigations(base_context, ai, ai_status, bucket))
     except Exception as e:
         return jsonify({ 'success': False, 'error': str(e) }), 500
 
@@ -654,14 +1073,275 @@ def generate_recommendations(city_data, asteroid_size):
 
     return recommendations
 
+MAX_OPTIONS_PER_METHOD = 1_000_000
+MAX_EXPORT_OPTIONS_PER_METHOD = 10_000_000
+
+def run_deflection_study(data, progress=None, export_format='json'):
+    """Deflection trade study (shared by the endpoint and the job queue)"""
+    asteroid_id = data.get('asteroid_id')
+    if asteroid_id:
+        neo = get_cached(f"physics_{asteroid_id}", 300, lambda: nasa_service.get_neo_lookup(asteroid_id))
+        if not neo or 'error' in neo:
+            raise UpstreamError('Failed to fetch asteroid data')
+        target = deflection.target_from_neo(neo, density_kg_m3=float(data.get('density', deflection.DEFAULT_DENSITY)))
+    else:
+        target = deflection.make_target(float(data.get('diameter', 100)), float(data.get('velocity', 20)),
+                                        float(data.get('density', deflection.DEFAULT_DENSITY)),
+                                        data.get('orbital_period_days'))
+
+    lead = deflection.sweep(data.get('lead_time_years'), np.geomspace(0.5, 30, 24))
+    mass = deflection.sweep(data.get('spacecraft_mass_kg'), np.linspace(500, 20000, 20))
+    beta = deflection.sweep(data.get('beta'), [1.0, 1.5, 2.0, 3.0, 4.0, 5.0])
+    methods = data.get('methods') or list(deflection.METHODS)
+    safety_factor = float(data.get('safety_factor', 1.0))
+    # columnar exports never build per-option records, so they may sweep further
+    limit = MAX_OPTIONS_PER_METHOD if export_format == 'json' else MAX_EXPORT_OPTIONS_PER_METHOD
+    if len(lead) * len(mass) * len(beta) > limit:
+        raise ValueError(f'Sweep too large (limit {limit:,} options per method)')
+
+    started = time.perf_counter()
+    study = deflection.trade_study(target, lead, mass, beta, methods, safety_factor,
+                                   float(data.get('impactor_speed_km_s', deflection.IMPACTOR_SPEED_KM_S)),
+                                   float(data.get('cruise_years', deflection.CRUISE_YEARS)), progress)
+    options = study['options']
+
+    response = {
+        'success': True,
+        'target': target,
+        'required_miss_distance_km': study['required_miss_m'] / 1000.0,
+        'required_delta_v_curve': {
+            'lead_time_years': to_python(lead),
+            'delta_v_mm_s': to_python(deflection.required_delta_v_curve(target, lead, safety_factor) * 1000.0)
+        },
+        'options_evaluated': int(len(options['margin'])),
+        'options_successful': int(len(study['successful'])),
+        'pareto_front': deflection.option_records(options, study['pareto']),
+        'pareto_by_method': {method: deflection.option_records(options, front)
+                             for method, front in study['pareto_by_method'].items()},
+        'compute_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+    if export_format != 'json':
+        on_front = np.zeros(len(options['margin']), dtype=bool)
+        on_front[study['pareto']] = True
+        return columnar.table_response({
+            'method': columnar.Categorical(options['method'], deflection.METHODS),
+            'lead_time_years': options['lead_time_years'],
+            'spacecraft_mass_kg': options['spacecraft_mass_kg'],
+            'beta': options['beta'],
+            'delta_v_m_s': options['delta_v_m_s'],
+            'displacement_m': options['displacement_m'],
+            'margin': options['margin'],
+            'pareto': on_front
+        }, export_format, summary=response, name='deflection')
+    if data.get('include_options'):
+        response['options'] = deflection.option_records(options, range(min(len(options['margin']), 20000)))
+    return response
+
+@app.route('/api/mitigation/deflection', methods=['POST'])
+def deflection_trade_study():
+    """Sweep deflection missions and return the Pareto front.
+    Body: asteroid_id (NASA lookup) or diameter/velocity/density/orbital_period_days; lead_time_years,
+    spacecraft_mass_kg, beta (lists or {min, max, steps, log}); methods; safety_factor; include_options;
+    format ('json' | 'arrow' | 'parquet': every evaluated option as a columnar table)
+    """
+    try:
+        data = request.get_json() or {}
+        result = run_deflection_study(data, export_format=columnar.export_format(data))
+        return result if isinstance(result, Response) else jsonify(result)
+
+    except UpstreamError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 502
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Long-running simulations can also be submitted as background jobs; workers run
+# one job each, so the simulations themselves stay on a single process
+@jobs.register('multi_impact')
+def multi_impact_job(params, progress):
+    return run_multi_impact(params, workers=1, progress=progress)
+
+@jobs.register('corridor')
+def corridor_job(params, progress):
+    return run_corridor(params, workers=1, progress=progress)
+
+@jobs.register('deflection')
+def deflection_job(params, progress):
+    return run_deflection_study(params, progress=progress)
+
+job_queue = jobs.JobQueue()
+
+@app.route('/api/jobs', methods=['GET'])
+def list_job_kinds():
+    """Job kinds and queue statistics"""
+    return jsonify({
+        'success': True,
+        'kinds': sorted(jobs.JOB_KINDS),
+        'priorities': jobs.PRIORITIES,
+        'queue': job_queue.stats()
+    })
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a simulation job; identical inputs return the existing job.
+    Body: kind (multi_impact, corridor, deflection), params (the endpoint's request body), priority
+    """
+    try:
+        data = request.get_json() or {}
+        params = data.get('params') or {}
+        if not isinstance(params, dict):
+            raise jobs.JobError('params must be an object')
+        job = job_queue.submit(data.get('kind'), params, data.get('priority', 'normal'), version=MEMO_NAMESPACE)
+        return jsonify({'success': True, **job}), (200 if job['deduplicated'] else 202)
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Status and progress of a job"""
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, **job})
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Result of a finished job (202 while it is still queued or running)"""
+    job, result = job_queue.result(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] in jobs.ACTIVE_STATES:
+        return jsonify({'success': False, **job}), 202
+    if job['status'] != 'done':
+        return jsonify({'success': False, **job}), 409
+    return jsonify({'job': job, **result})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    if job_queue.status(job_id) is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    cancelled = job_queue.cancel(job_id)
+    return jsonify({'success': cancelled, **job_queue.status(job_id)}), (200 if cancelled else 409)
+
 @app.route('/api/cities/data', methods=['GET'])
 def get_cities_data():
-    """Get comprehensive city database"""
+    """Get comprehensive city database.
+    Query: country, offset (default 0), limit (default 1000, max 10000)
+    """
+    try:
+        catalog = city_catalog.current()
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(max(1, int(request.args.get('limit', 1000))), 10000)
+        rows = np.arange(len(catalog))
+        if request.args.get('country'):
+            rows = rows[catalog.columns['country'] == request.args['country']]
+        return jsonify({
+            'success': True,
+            'cities': catalog.records(rows[offset:offset + limit]),
+            'total': int(len(rows)),
+            'offset': offset,
+            'catalog': catalog.describe()
+        })
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/cities/reload', methods=['POST'])
+def reload_cities():
+    """Re-read the city files now and swap the new catalogue in (the old one stays on failure)"""
+    try:
+        catalog = city_catalog.reload(force=True)
+        return jsonify({
+            'success': True,
+            'catalog': catalog.describe()
+        })
+
+    except city_catalog.CityDataError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'catalog': city_catalog.current().describe()
+        }), 422
+
+@app.route('/api/models', methods=['GET'])
+def list_scenario_models():
+    """List the compiled scenario models available for side-by-side runs"""
     return jsonify({
         'success': True,
-        'cities': CITY_DATABASE
+        'default': DEFAULT_SCENARIO_MODEL,
+        'models': [scenario_models.get(name).describe() for name in scenario_models.names()],
+        'errors': scenario_models.errors()
     })
 
+@app.route('/api/models/compare', methods=['POST'])
+def compare_scenario_models():
+    """Run the same scenarios through several damage models side by side.
+    Body: models (list), city_id, diameter and velocity (numbers or equal-length lists)
+    """
+    try:
+        data = request.get_json() or {}
+        names = data.get('models') or scenario_models.names()
+        city_id = data.get('city_id', 'new-york')
+        city_data = get_city(city_id)
+
+        # Lists of diameters/velocities are evaluated as one vectorized batch per model
+        diameter = np.asarray(data.get('diameter', 100), dtype=float)
+        velocity = np.asarray(data.get('velocity', 20), dtype=float)
+        diameter, velocity = np.broadcast_arrays(diameter, velocity)
+        physics = calculate_detailed_impact_physics(diameter, velocity)
+        inputs = build_impact_inputs(physics, city_data)
+
+        results = {}
+        for name in names:
+            results[name] = to_python(scenario_models.get(name).evaluate_impact(inputs))
+
+        return jsonify({
+            'success': True,
+            'city_id': city_id,
+            'diameter': to_python(diameter),
+            'velocity': to_python(velocity),
+            'results': results
+        })
+
+    except ScenarioModelError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/timeline/phases', methods=['POST'])
 def get_timeline_phases():
     """Get impact timeline phases"""
@@ -719,58 +1399,128 @@ def get_timeline_phases():
             'error': str(e)
         }), 500
 
+@app.route('/api/timeline/frames', methods=['POST'])
+def get_timeline_frames():
+    """Precomputed time-lapse frames for a scenario.
+    Body: diameter (or asteroid_size), velocity, density, fps (default 60),
+    playback_seconds (default 10), time_scale ('log' | 'linear'), format ('binary' | 'json'),
+    quantize ('snap' | 'interpolate' | 'exact').
+    Binary responses are little-endian float32 rows of X-Frame-Fields, one row per frame;
+    the quantization report travels as JSON in X-Quantization.
+    """
+    try:
+        data = request.get_json() or {}
+        diameter = float(data.get('diameter', data.get('asteroid_size', 100)))
+        velocity = float(data.get('velocity', 20))
+        density = float(data.get('density', 2600))
+        fps = int(data.get('fps', 60))
+        playback_seconds = float(data.get('playback_seconds', 10))
+        time_scale = data.get('time_scale', 'log')
+        output_format = data.get('format', 'binary')
+
+        frame_count = int(round(fps * playback_seconds))
+        if diameter <= 0 or velocity <= 0 or density <= 0:
+            return jsonify({'success': False, 'error': 'diameter, velocity and density must be positive'}), 400
+        if not 2 <= frame_count <= timelapse.MAX_FRAMES:
+            return jsonify({'success': False, 'error': f'fps * playback_seconds must be between 2 and {timelapse.MAX_FRAMES}'}), 400
+        if time_scale not in timelapse.TIME_SCALES:
+            return jsonify({'success': False, 'error': f"time_scale must be one of {', '.join(timelapse.TIME_SCALES)}"}), 400
+
+        inputs = canonical.canonicalize(data, diameter_m=diameter, velocity_km_s=velocity, density_kg_m3=density)
+        table = canonical.evaluate(inputs, lambda diameter_m, velocity_km_s, density_kg_m3: memoize_scenario(
+            'frames', (diameter_m, velocity_km_s, density_kg_m3, frame_count, time_scale),
+            lambda: timelapse.frame_table(diameter_m, velocity_km_s, density_kg_m3, frame_count, time_scale)))
+
+        if output_format == 'json':
+            fields, scale = timelapse.delta_encode(table)
+            return jsonify({
+                'success': True,
+                'encoding': 'delta-int32-base64',
+                'scale': scale,
+                'fps': fps,
+                'frame_count': frame_count,
+                'time_scale': time_scale,
+                'fields': fields,
+                'quantization': inputs.report()
+            })
+
+        headers = {
+            'X-Frame-Count': str(frame_count),
+            'X-Frame-Fields': ','.join(timelapse.FRAME_FIELDS),
+            'X-Frame-Rate': str(fps),
+            'X-Time-Scale': time_scale,
+            'X-Quantization': json.dumps(inputs.report(), separators=(',', ':')),
+            'Access-Control-Expose-Headers': 'X-Frame-Count, X-Frame-Fields, X-Frame-Rate, X-Time-Scale, X-Quantization',
+            'Cache-Control': 'public, max-age=3600'
+        }
+        return Response(table.tobytes(), mimetype='application/octet-stream', headers=headers)
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/aftermath/layers', methods=['POST'])
 def get_aftermath_layers():
-    """Get post-impact visualization layers"""
+    """Get post-impact visualization layers.
+    Body: asteroid_size, velocity (default 20), model, climate_years (default 10),
+    quantize ('snap' | 'interpolate' | 'exact').
+    secondary_effects holds shaking and ejecta profiles against distance for drawing their
+    rings; climate holds monthly dust/soot, sunlight and temperature series.
+    """
     try:
         data = request.get_json()
         asteroid_size = data.get('asteroid_size', 100)
+        velocity = float(data.get('velocity', 20))
+        climate_years = float(data.get('climate_years', climate.YEARS))
+
+        scenario = scenario_models.get(data.get('model', DEFAULT_SCENARIO_MODEL))
+        inputs = canonical.canonicalize(data, diameter_m=asteroid_size, velocity_km_s=velocity)
+
+        def compute(diameter_m, velocity_km_s):
+            # Calculate impact energy for layer intensity
+            physics = calculate_detailed_impact_physics(diameter_m, velocity_km_s)
+            energy_mt = physics['kinetic_energy_mt']
+            # climate results are precomputed per energy bucket, so slider updates stay cheap
+            climate_summary = climate.summary(energy_mt)
+            layers = scenario.aftermath_layers(dict(physics, **climate_summary))
+
+            reach_km = max(physics['seismic_damage_radius_km'], physics['ejecta_radius_km'], 1.0) * 2
+            curves = secondary_effects.profile(physics, np.geomspace(0.1, reach_km, 48))
+            curves['ejecta_arrival_s'] = np.where(np.isnan(curves['ejecta_arrival_s']), None, curves['ejecta_arrival_s'])
+            return to_python({
+                'layers': layers,
+                'impact_energy_mt': energy_mt,
+                'secondary_effects': {
+                    'seismic_magnitude': physics['seismic_magnitude'],
+                    'seismic_damage_radius_km': physics['seismic_damage_radius_km'],
+                    'ejecta_radius_km': physics['ejecta_radius_km'],
+                    'profile': curves
+                },
+                'climate': {
+                    'energy_bucket_mt': climate.bucket_of(energy_mt),
+                    'summary': climate_summary,
+                    'series': climate.series(energy_mt, climate_years)
+                }
+            })
 
-        # Calculate impact energy for layer intensity
-        physics = calculate_detailed_impact_physics(asteroid_size, 20)
-        energy_mt = physics['kinetic_energy_mt']
+        result = canonical.evaluate(inputs, lambda diameter_m, velocity_km_s: memoize_scenario(
+            'aftermath', (scenario.name, scenario.fingerprint, diameter_m, velocity_km_s, climate_years),
+            lambda: compute(diameter_m, velocity_km_s)))
 
-        layers = [
-            {
-                'id': 'dust-cloud',
-                'name': 'Dust Cloud',
-                'intensity': min(100, energy_mt * 10),
-                'duration': '6-12 months',
-                'description': 'Atmospheric dust blocking sunlight',
-                'color': '#8B4513'
-            },
-            {
-                'id': 'fire-zones',
-                'name': 'Fire Zones',
-                'intensity': min(100, energy_mt * 15),
-                'duration': '1-4 weeks',
-                'description': 'Widespread fires from thermal radiation',
-                'color': '#FF4500'
-            },
-            {
-                'id': 'radiation-zones',
-                'name': 'Radiation Zones',
-                'intensity': min(100, energy_mt * 5),
-                'duration': '1-10 years',
-                'description': 'Radioactive contamination areas',
-                'color': '#32CD32'
-            },
-            {
-                'id': 'climate-effects',
-                'name': 'Climate Effects',
-                'intensity': min(100, energy_mt * 8),
-                'duration': '2-5 years',
-                'description': 'Global temperature and weather changes',
-                'color': '#4169E1'
-            }
-        ]
+        return jsonify(dict(result, success=True, model=scenario.name, quantization=inputs.report()))
 
+    except (ScenarioModelError, ValueError) as e:
         return jsonify({
-            'success': True,
-            'layers': layers,
-            'impact_energy_mt': energy_mt
-        })
-
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -779,104 +1529,67 @@ def get_aftermath_layers():
 
 @app.route('/api/survival/zones', methods=['POST'])
 def get_survival_zones():
-    """Calculate survival probability zones"""
+    """Calculate survival probability zones.
+    Body: city_id, asteroid_size, model, quantize ('snap' | 'exact'; facility allocations are
+    never interpolated)
+    """
     try:
         data = request.get_json()
         city_id = data.get('city_id', 'new-york')
-        asteroid_size = data.get('asteroid_size', 100)
+        inputs = canonical.canonicalize(data, interpolable=False, diameter_m=data.get('asteroid_size', 100))
+        asteroid_size = inputs.values['diameter_m']
+
+        scenario = scenario_models.get(data.get('model', DEFAULT_SCENARIO_MODEL))
 
-        city_data = CITY_DATABASE.get(city_id, CITY_DATABASE['new-york'])
+        city_id, city_data = resolve_city(city_id)
         physics = calculate_detailed_impact_physics(asteroid_size, 20)
 
-        # Calculate survival zones
+        # Calculate survival zones; shelter/hospital coverage comes from allocating the city's facilities
         base_radius = physics['shockwave_radius_km']
-
-        zones = [
-            {
-                'id': 'ground-zero',
-                'name': 'Ground Zero',
-                'radius': base_radius * 0.2,
-                'survival_rate': 0,
-                'color': '#DC2626',
-                'description': 'Complete destruction - No survival possible',
-                'factors': {
-                    'shelters': 0,
-                    'hospitals': 0,
-                    'evacuation_routes': 0,
-                    'infrastructure': 0
-                }
-            },
-            {
-                'id': 'critical-zone',
-                'name': 'Critical Impact Zone',
-                'radius': base_radius * 0.5,
-                'survival_rate': 5,
-                'color': '#EA580C',
-                'description': 'Extreme danger - Survival only in reinforced shelters',
-                'factors': {
-                    'shelters': 10,
-                    'hospitals': 5,
-                    'evacuation_routes': 15,
-                    'infrastructure': 20
-                }
-            },
-            {
-                'id': 'severe-zone',
-                'name': 'Severe Damage Zone',
-                'radius': base_radius * 0.8,
-                'survival_rate': 25,
-                'color': '#F59E0B',
-                'description': 'Heavy casualties - Underground shelters essential',
-                'factors': {
-                    'shelters': 40,
-                    'hospitals': 25,
-                    'evacuation_routes': 35,
-                    'infrastructure': 45
-                }
-            },
-            {
-                'id': 'moderate-zone',
-                'name': 'Moderate Risk Zone',
-                'radius': base_radius * 1.2,
-                'survival_rate': 60,
-                'color': '#EAB308',
-                'description': 'Significant risk - Immediate evacuation required',
-                'factors': {
-                    'shelters': 70,
-                    'hospitals': 60,
-                    'evacuation_routes': 65,
-                    'infrastructure': 70
-                }
-            },
-            {
-                'id': 'safe-zone',
-                'name': 'Relative Safety Zone',
-                'radius': base_radius * 2.5,
-                'survival_rate': 95,
-                'color': '#22C55E',
-                'description': 'High survival rate - Minor injuries possible',
-                'factors': {
-                    'shelters': 95,
-                    'hospitals': 90,
-                    'evacuation_routes': 95,
-                    'infrastructure': 95
-                }
-            }
-        ]
+        key_parts = (scenario.name, scenario.fingerprint, city_id, asteroid_size,
+                     city_assets.asset_mtime(city_id, 'facilities.csv'))
+        zones, resources = memoize_scenario('survival_zones', key_parts, lambda: allocation.allocate_zone_resources(
+            scenario.survival_zones(physics), city_id, city_data,
+            shelter_reach_km=scenario.coefficients.get('shelter_reach_km', 5.0),
+            hospital_reach_km=scenario.coefficients.get('hospital_reach_km', 50.0)))
 
         return jsonify({
             'success': True,
             'zones': zones,
+            'resources': resources,
             'city_data': city_data,
-            'impact_radius': base_radius
+            'impact_radius': base_radius,
+            'model': scenario.name,
+            'quantization': inputs.report()
         })
 
+    except (ScenarioModelError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def evacuation_radius_km(zones):
+    """Outer edge of the widest zone where evacuation is still required (survival below 95%)"""
+    at_risk = [zone['radius'] for zone in zones if zone['survival_rate'] < 95]
+    return max(at_risk) if at_risk else 0.0
+
+def plan_city_evacuation(scenario, diameter, velocity, city_id):
+    """Evacuation routing for a city-centre impact, memoized per scenario (unknown city ids
+    raise ValueError)"""
+    city_id, city_data = resolve_city(city_id)
+    physics = calculate_detailed_impact_physics(diameter, velocity)
+    radius = float(evacuation_radius_km(scenario.survival_zones(physics)))
+    key_parts = (scenario.name, scenario.fingerprint, city_id, round(radius, 3),
+                 city_assets.asset_mtime(city_id, 'road_edges.csv'), city_assets.asset_mtime(city_id, 'facilities.csv'))
+    return dict(memoize_scenario('evacuation', key_parts,
+                                 lambda: evacuation.plan_evacuation(city_id, city_data, radius)))
+
 @app.route('/api/alerts/timeline', methods=['POST'])
 def get_alert_timeline():
     """Generate global alert system timeline"""
@@ -884,6 +1597,9 @@ def get_alert_timeline():
         data = request.get_json()
         asteroid_size = data.get('asteroid_size', 100)
         detection_time = data.get('detection_time', 72)  # hours before impact
+        city_id = data.get('city_id', 'new-york')
+        velocity = data.get('velocity', 20)
+        scenario = scenario_models.get(data.get('model', DEFAULT_SCENARIO_MODEL))
 
         # Calculate timeline based on asteroid size and detection time
         timeline_phases = [
@@ -967,14 +1683,30 @@ def get_alert_timeline():
             for phase in timeline_phases:
                 phase['time_to_impact'] = phase['time_to_impact'] * 0.7
 
+        evacuation_phase = next(p for p in timeline_phases if p['id'] == 'evacuation')
+        # evacuation routing is never interpolated; snapping lets near-identical requests share it
+        inputs = canonical.canonicalize(data, interpolable=False, diameter_m=asteroid_size, velocity_km_s=velocity)
+        evacuation_plan = plan_city_evacuation(scenario, inputs.values['diameter_m'], inputs.values['velocity_km_s'], city_id)
+        hours_available = max(0.0, evacuation_phase['time_to_impact'])
+        evacuation_plan['hours_available'] = hours_available
+        evacuation_plan['feasible'] = evacuation_plan['clearance_time_hours']['p90'] <= hours_available
+
         return jsonify({
             'success': True,
             'timeline': timeline_phases,
             'total_warning_time': detection_time,
             'asteroid_size': asteroid_size,
-            'threat_level': get_threat_level_from_size(asteroid_size)
+            'threat_level': get_threat_level_from_size(asteroid_size),
+            'evacuation': evacuation_plan,
+            'model': scenario.name,
+            'quantization': inputs.report()
         })
 
+    except (ScenarioModelError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -996,18 +1728,26 @@ def get_threat_level_from_size(size):
     else:
         return 'MINIMAL_THREAT'
 
-# simple in-memory cache helper (TTL seconds)
-_cache = {}
+# TTL cache helper backed by the shared result store
 import time
-def get_cached(key, ttl_seconds, fetch_fn):
-    now = time.time()
-    entry = _cache.get(key)
+def cache_lookup(key, ttl_seconds):
+    """Return (hit, value) for a cache entry younger than ttl_seconds"""
+    entry = result_store.get(f"cache:{key}")
     if entry:
         ts, value = entry
-        if now - ts < ttl_seconds:
-            return value
+        if time.time() - ts < ttl_seconds:
+            return True, value
+    return False, None
+
+def cache_store(key, value, ttl_seconds=86400):
+    result_store.set(f"cache:{key}", (time.time(), value), ttl_seconds)
+
+def get_cached(key, ttl_seconds, fetch_fn):
+    hit, value = cache_lookup(key, ttl_seconds)
+    if hit:
+        return value
     value = fetch_fn()
-    _cache[key] = (now, value)
+    cache_store(key, value)
     return value
 
 def compute_impact_metrics(diameter_m: float, velocity_km_s: float, density_kg_m3: float = 2500.0):
@@ -1024,7 +1764,7 @@ def compute_impact_metrics(diameter_m: float, velocity_km_s: float, density_kg_m
         v_m_s = max(0.0, float(velocity_km_s)) * 1000.0         # convert km/s -> m/s
         energy_j = 0.5 * mass_kg * (v_m_s ** 2)
         megatons = energy_j / 4.184e15                          # 1 Mt TNT = 4.184e15 J
-        approx_mw = (math.log10(energy_j) - 4.8) / 1.5 if energy_j > 0 else None
+        approx_mw = secondary_effects.seismic_magnitude(energy_j)
         return {
             "mass_kg": mass_kg,
             "energy_j": energy_j,
@@ -1069,6 +1809,11 @@ def asteroid_physics():
     if not data or "error" in data:
         return jsonify({"error": "Failed to fetch asteroid data", "details": data}), 500
 
+    neo_catalog.ingest([data])
+    return jsonify(build_asteroid_physics(asteroid_id, data))
+
+def build_asteroid_physics(asteroid_id, data):
+    """Physics summary for a NASA lookup record (shared by the sync and async apps)"""
     # normalize diameter (meters)
     diam_m = None
     diam_info = data.get("estimated_diameter", {}).get("meters", {})
@@ -1133,11 +1878,10 @@ def asteroid_physics():
             "miss_distance_km": miss_km,
             "raw": ca
         },
-        "summary": summary,
-        "raw": data
+        "summary": summary
     }
 
-    return jsonify(response)
+    return response
 
 if __name__ == '__main__':
     print("🚀 Enhanced NASA Impact Simulator Backend Starting...")
@@ -1148,13 +1892,27 @@ if __name__ == '__main__':
     print("   - GET  /api/health")
     print("   - GET  /api/neo/hazardous")
     print("   - GET  /api/neo/stats")
+    print("   - GET  /api/neo/catalog")
     print("   - GET  /api/physics/asteroid")
     print("   - POST /api/impact/simulate")
     print("   - GET  /api/impact/simulate-real")
+    print("   - POST /api/impact/multi")
+    print("   - POST /api/impact/corridor")
+    print("   - POST /api/impact/inverse")
     print("   - POST /api/ai/risk-analysis")
     print("   - POST /api/ai/mitigations")
+    print("   - POST /api/mitigation/deflection")
+    print("   - GET  /api/jobs")
+    print("   - POST /api/jobs")
+    print("   - GET  /api/jobs/<id>")
+    print("   - GET  /api/jobs/<id>/result")
+    print("   - POST /api/jobs/<id>/cancel")
     print("   - GET  /api/cities/data")
+    print("   - POST /api/cities/reload")
+    print("   - GET  /api/models")
+    print("   - POST /api/models/compare")
     print("   - POST /api/timeline/phases")
+    print("   - POST /api/timeline/frames")
     print("   - POST /api/aftermath/layers")
     print("   - POST /api/survival/zones")
     print("   - POST /api/alerts/timeline")
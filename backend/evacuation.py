@@ -0,0 +1,372 @@
+"""
+Evacuation routing engine
+Builds a compact CSR road graph per city (cached after the first build), runs a
+multi-source shortest-path search from every safe destination, and pushes the
+evacuating population through the resulting route tree with shelter and road
+capacities to estimate clearance times.
+"""
+
+import heapq
+import threading
+import time
+
+import numpy as np
+
+import city_assets
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as _scipy_dijkstra
+except ImportError:  # pure numpy/heapq search is used instead
+    csr_matrix = None
+    _scipy_dijkstra = None
+
+PERSONS_PER_VEHICLE = 2.5
+MAX_SHELTER_ROUNDS = 8
+NODES_PER_BUCKET = 4
+
+
+class RoadGraph:
+    """Road network in CSR form over the reversed edges (used to search from destinations)"""
+
+    def __init__(self, arrays):
+        self.x = np.asarray(arrays['x'], dtype=float)
+        self.y = np.asarray(arrays['y'], dtype=float)
+        self.node_count = len(self.x)
+        self.source = arrays['source']
+        src, dst = arrays['src'], arrays['dst']
+
+        self.edge_src = src
+        self.edge_dst = dst
+        self.travel_s = arrays['length_m'] / (np.maximum(arrays['speed_kmh'], 1.0) / 3.6)
+        self.capacity_vph = arrays['lanes'] * city_assets.VEHICLES_PER_LANE_HOUR
+        self.edge_count = len(src)
+
+        # reversed CSR: row v lists edges u -> v, so a search from destinations walks to sources
+        order = np.argsort(dst, kind='stable')
+        self.rev_indptr = np.concatenate(([0], np.cumsum(np.bincount(dst, minlength=self.node_count))))
+        self.rev_indices = src[order]
+        self.rev_edge = order
+        self.rev_weight = self.travel_s[order]
+
+        # (u, v) -> edge id lookup for the scipy path, which only returns predecessors
+        self._edge_keys = src * self.node_count + dst
+        self._edge_key_order = np.argsort(self._edge_keys, kind='stable')
+        self._sorted_edge_keys = self._edge_keys[self._edge_key_order]
+
+        self.radius_km = np.hypot(self.x, self.y)
+
+        # square buckets of about NODES_PER_BUCKET nodes for nearest-node lookups
+        if self.node_count:
+            self.bucket_origin = (self.x.min(), self.y.min())
+            span = max(self.x.max() - self.x.min(), self.y.max() - self.y.min(), 1e-6)
+            self.bucket_km = span / max(1, int(np.sqrt(self.node_count / NODES_PER_BUCKET)))
+            self.bucket_shape = (int((self.x.max() - self.bucket_origin[0]) / self.bucket_km) + 1,
+                                 int((self.y.max() - self.bucket_origin[1]) / self.bucket_km) + 1)
+            bucket = self._bucket_of(self.x, self.y)
+            self.bucket_nodes = np.argsort(bucket, kind='stable')
+            self.bucket_indptr = np.concatenate(([0], np.cumsum(np.bincount(
+                bucket, minlength=self.bucket_shape[0] * self.bucket_shape[1]))))
+
+    def edge_between(self, u, v):
+        pos = np.searchsorted(self._sorted_edge_keys, u * self.node_count + v)
+        return self._edge_key_order[np.minimum(pos, self.edge_count - 1)]
+
+    def _bucket_of(self, x, y, clip=False):
+        bx = np.floor((x - self.bucket_origin[0]) / self.bucket_km).astype(np.int64)
+        by = np.floor((y - self.bucket_origin[1]) / self.bucket_km).astype(np.int64)
+        if clip:
+            bx, by = np.clip(bx, 0, self.bucket_shape[0] - 1), np.clip(by, 0, self.bucket_shape[1] - 1)
+        return bx * self.bucket_shape[1] + by
+
+    def nearest_nodes(self, x, y):
+        """Nearest node for each point, searching buckets in rings around the point's own
+        (points off the extract start from the closest edge bucket)"""
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        best = np.full(len(x), -1, dtype=np.int64)
+        if len(x) == 0 or self.node_count == 0:
+            return best
+        best_d2 = np.full(len(x), np.inf)
+        home = self._bucket_of(x, y, clip=True)
+        home_x, home_y = np.divmod(home, self.bucket_shape[1])
+        # how far each point lies off the bucketed area along x and y
+        off_x = np.maximum(0.0, np.maximum(self.bucket_origin[0] - x,
+                                           x - self.bucket_origin[0] - self.bucket_shape[0] * self.bucket_km))
+        off_y = np.maximum(0.0, np.maximum(self.bucket_origin[1] - y,
+                                           y - self.bucket_origin[1] - self.bucket_shape[1] * self.bucket_km))
+        active = np.arange(len(x))
+        for ring in range(max(self.bucket_shape)):
+            # buckets at Chebyshev distance `ring` from the home bucket
+            span = np.arange(-ring, ring + 1)
+            if ring == 0:
+                dx, dy = np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+            else:
+                side = np.full(len(span), ring)
+                dx = np.concatenate([span, span, -side[1:-1], side[1:-1]])
+                dy = np.concatenate([-side, side, span[1:-1], span[1:-1]])
+            bx, by = home_x[active][:, None] + dx[None, :], home_y[active][:, None] + dy[None, :]
+            valid = (bx >= 0) & (bx < self.bucket_shape[0]) & (by >= 0) & (by < self.bucket_shape[1])
+            query, slot = np.nonzero(valid)
+            bucket = bx[query, slot] * self.bucket_shape[1] + by[query, slot]
+            counts = self.bucket_indptr[bucket + 1] - self.bucket_indptr[bucket]
+            point = active[np.repeat(query, counts)]
+            position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            node = self.bucket_nodes[np.repeat(self.bucket_indptr[bucket], counts) + position]
+            d2 = (self.x[node] - x[point]) ** 2 + (self.y[node] - y[point]) ** 2
+            # closest candidate per point, ties to the lowest node id
+            order = np.lexsort((node, d2, point))
+            point, node, d2 = point[order], node[order], d2[order]
+            first = np.concatenate(([True], point[1:] != point[:-1])) if len(point) else np.zeros(0, dtype=bool)
+            better = d2[first] < best_d2[point[first]]
+            best[point[first][better]] = node[first][better]
+            best_d2[point[first][better]] = d2[first][better]
+            # buckets further out are at least `ring` buckets beyond the home bucket on one axis
+            reach = ring * self.bucket_km
+            ox, oy = off_x[active], off_y[active]
+            bound = np.minimum((ox + reach) ** 2 + oy ** 2, ox ** 2 + (oy + reach) ** 2)
+            active = active[best_d2[active] > bound]
+            if len(active) == 0:
+                break
+        return best
+
+    def nearest_destinations(self, destinations):
+        """Travel time to, next hop towards and next edge towards the closest destination"""
+        destinations = np.asarray(destinations, dtype=np.int64)
+        if _scipy_dijkstra is not None:
+            reverse = csr_matrix((self.rev_weight, self.rev_indices, self.rev_indptr),
+                                 shape=(self.node_count, self.node_count))
+            dist, pred, _ = _scipy_dijkstra(reverse, directed=True, indices=destinations,
+                                            min_only=True, return_predecessors=True)
+            next_hop = np.where(pred >= 0, pred, -1)
+            next_edge = np.full(self.node_count, -1, dtype=np.int64)
+            has_hop = next_hop >= 0
+            next_edge[has_hop] = self.edge_between(np.nonzero(has_hop)[0], next_hop[has_hop])
+            return dist, next_hop, next_edge
+
+        dist = np.full(self.node_count, np.inf)
+        next_hop = np.full(self.node_count, -1, dtype=np.int64)
+        next_edge = np.full(self.node_count, -1, dtype=np.int64)
+        dist[destinations] = 0.0
+        heap = [(0.0, int(d)) for d in destinations]
+        heapq.heapify(heap)
+        indptr, indices, weight, edge = self.rev_indptr, self.rev_indices, self.rev_weight, self.rev_edge
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > dist[v]:
+                continue
+            for k in range(indptr[v], indptr[v + 1]):
+                u = indices[k]
+                nd = d + weight[k]
+                if nd < dist[u]:
+                    dist[u] = nd
+                    next_hop[u] = v
+                    next_edge[u] = edge[k]
+                    heapq.heappush(heap, (nd, int(u)))
+        return dist, next_hop, next_edge
+
+
+_graph_cache = {}
+_graph_lock = threading.Lock()
+
+
+def get_road_graph(city_id, city_data):
+    """Per-city CSR graph, rebuilt only when the extract files change"""
+    # the synthetic layout depends on the city record, which a catalogue reload may change
+    key = (city_id, city_assets.asset_mtime(city_id, 'road_nodes.csv'), city_assets.asset_mtime(city_id, 'road_edges.csv'),
+           city_data['lat'], city_data['lng'], city_data['area_km2'], city_data.get('evacuation_routes'))
+    graph = _graph_cache.get(key)
+    if graph is None:
+        with _graph_lock:
+            graph = _graph_cache.get(key)
+            if graph is None:
+                graph = RoadGraph(city_assets.load_road_graph(city_id, city_data))
+                for stale in [k for k in _graph_cache if k[0] == city_id]:
+                    del _graph_cache[stale]
+                _graph_cache[key] = graph
+    return graph
+
+
+def _node_population(graph, city_data, node_distance, evacuation_radius_km):
+    """Evacuees per node: city population spread over the nodes inside both the city and the ring"""
+    city_radius = city_assets.city_radius_km(city_data)
+    inside = (node_distance <= evacuation_radius_km) & (graph.radius_km <= city_radius)
+    population = np.zeros(graph.node_count)
+    if inside.any():
+        area_inside = np.pi * min(evacuation_radius_km, city_radius) ** 2
+        evacuees = min(city_data['population'], city_data['population'] / city_data['area_km2'] * area_inside)
+        population[inside] = evacuees / inside.sum()
+    return population
+
+
+def plan_evacuation(city_id, city_data, evacuation_radius_km, impact_x_km=0.0, impact_y_km=0.0):
+    """Route everyone inside the evacuation ring to a shelter or out of the ring.
+
+    Shelters outside the ring take evacuees up to their capacity (nearest first);
+    everyone else drives to the nearest road node beyond the ring. Clearance for a
+    node is its free-flow travel time plus the worst queue on its route, where each
+    edge's queue is the vehicles routed over it divided by its capacity.
+    """
+    started = time.perf_counter()
+    graph = get_road_graph(city_id, city_data)
+    node_distance = np.hypot(graph.x - impact_x_km, graph.y - impact_y_km)
+
+    population = _node_population(graph, city_data, node_distance, evacuation_radius_km)
+
+    exits = np.nonzero(node_distance > evacuation_radius_km)[0]
+    if len(exits) == 0:
+        # the ring covers the whole extract: leave through its outermost nodes
+        exits = np.nonzero(node_distance >= np.quantile(node_distance, 0.95))[0]
+
+    facilities = city_assets.load_facilities(city_id, city_data)
+    is_shelter = facilities['kind'] == 'shelter'
+    shelter_x, shelter_y = facilities['x'][is_shelter], facilities['y'][is_shelter]
+    shelter_capacity = facilities['capacity'][is_shelter]
+    safe = np.hypot(shelter_x - impact_x_km, shelter_y - impact_y_km) > evacuation_radius_km
+    shelter_nodes = graph.nearest_nodes(shelter_x[safe], shelter_y[safe])
+    remaining_capacity = shelter_capacity[safe].copy()
+
+    # capacity-aware assignment: fill the nearest open shelters, reroute the overflow.
+    # Each round yields a route tree; `flows` keeps (tree, vehicles sent over it per node).
+    left = population.copy()
+    flows = []
+    sheltered = 0.0
+    open_shelters = remaining_capacity > 0
+    for _ in range(MAX_SHELTER_ROUNDS):
+        waiting = left > 1e-9
+        if not waiting.any() or not open_shelters.any():
+            break
+        open_nodes = shelter_nodes[open_shelters]
+        dist, hop, edge = graph.nearest_destinations(open_nodes)
+        target = _follow_to_destination(hop, open_nodes)
+        node_to_shelter = {int(n): int(i) for n, i in zip(open_nodes, np.nonzero(open_shelters)[0])}
+        sent = np.zeros(graph.node_count)
+        for node_id in np.nonzero(waiting)[0][np.argsort(dist[waiting])]:
+            if target[node_id] < 0 or not np.isfinite(dist[node_id]):
+                continue
+            s = node_to_shelter[int(target[node_id])]
+            take = min(left[node_id], remaining_capacity[s])
+            remaining_capacity[s] -= take
+            left[node_id] -= take
+            sent[node_id] = take
+        if not sent.any():
+            break
+        sheltered += sent.sum()
+        flows.append(((dist, hop, edge), sent))
+        open_shelters = remaining_capacity > 1e-9
+
+    # everyone not sheltered leaves the ring via the nearest exit
+    exit_tree = graph.nearest_destinations(exits)
+    flows.append((exit_tree, np.where(left > 1e-9, left, 0.0)))
+
+    edge_load = np.zeros(graph.edge_count)
+    for tree, persons in flows:
+        edge_load += _tree_edge_load(graph, tree, persons / PERSONS_PER_VEHICLE)
+    queue_h = edge_load / graph.capacity_vph
+
+    # a node clears when its slowest group (shelter- or exit-bound) arrives
+    clearance = np.zeros(graph.node_count)
+    for tree, persons in flows:
+        dist = tree[0]
+        node_clearance = dist / 3600.0 + _tree_worst_queue(tree, queue_h)
+        moving = persons > 0
+        clearance[moving] = np.maximum(clearance[moving], node_clearance[moving])
+
+    evacuating = population > 0
+    reachable = evacuating & np.isfinite(clearance)
+    clearance_h = clearance[reachable]
+    weights = population[reachable]
+    total = float(population.sum())
+
+    bottleneck_ids = np.argsort(-queue_h)[:5]
+    bottlenecks = [{
+        'from': _latlng(graph, city_data, graph.edge_src[e]),
+        'to': _latlng(graph, city_data, graph.edge_dst[e]),
+        'vehicles': round(float(edge_load[e])),
+        'capacity_vph': float(graph.capacity_vph[e]),
+        'queue_hours': round(float(queue_h[e]), 2)
+    } for e in bottleneck_ids if edge_load[e] > 0]
+
+    return {
+        'evacuation_radius_km': evacuation_radius_km,
+        'evacuees': round(total),
+        'vehicles': round(total / PERSONS_PER_VEHICLE),
+        'sheltered': round(sheltered),
+        'leaving_ring': round(total - sheltered),
+        'unreachable': round(float(population[evacuating & ~np.isfinite(clearance)].sum())),
+        'shelters_available': int(safe.sum()),
+        'shelters_full': int((remaining_capacity <= 1e-9).sum()),
+        'clearance_time_hours': {
+            'p50': _weighted_quantile(clearance_h, weights, 0.5),
+            'p90': _weighted_quantile(clearance_h, weights, 0.9),
+            'max': round(float(clearance_h.max()), 2) if len(clearance_h) else 0.0
+        },
+        'bottlenecks': bottlenecks,
+        'graph': {'nodes': graph.node_count, 'edges': graph.edge_count, 'source': graph.source},
+        'compute_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+def _tree_levels(hop):
+    """Route tree nodes grouped by hop count from their destination, by pointer doubling:
+    (nodes ordered by depth, start of each depth in that order)"""
+    depth = (hop >= 0).astype(np.int64)
+    up = hop.copy()
+    climbing = np.nonzero(up >= 0)[0]
+    while len(climbing):
+        depth[climbing] += depth[up[climbing]]
+        up[climbing] = up[up[climbing]]
+        climbing = climbing[up[climbing] >= 0]
+    order = np.argsort(depth, kind='stable')
+    return order, np.searchsorted(depth[order], np.arange(depth.max() + 2))
+
+
+def _tree_edge_load(graph, tree, vehicles):
+    """Vehicles crossing each edge when every node follows the route tree, deepest nodes first"""
+    dist, hop, edge = tree
+    through = np.where(np.isfinite(dist), vehicles, 0.0)
+    order, starts = _tree_levels(hop)
+    for depth in range(len(starts) - 2, 0, -1):
+        nodes = order[starts[depth]:starts[depth + 1]]
+        np.add.at(through, hop[nodes], through[nodes])
+    moving = order[starts[1]:]
+    return np.bincount(edge[moving], through[moving], graph.edge_count)
+
+
+def _tree_worst_queue(tree, queue_h):
+    """Longest edge queue (hours) on each node's route, accumulated from the destinations outward"""
+    dist, hop, edge = tree
+    worst = np.zeros(len(dist))
+    order, starts = _tree_levels(hop)
+    for depth in range(1, len(starts) - 1):
+        nodes = order[starts[depth]:starts[depth + 1]]
+        worst[nodes] = np.maximum(queue_h[edge[nodes]], worst[hop[nodes]])
+    return worst
+
+
+def _follow_to_destination(next_hop, destinations):
+    """Destination node each node's route ends at (-1 if unreachable), by pointer jumping"""
+    target = np.where(next_hop >= 0, next_hop, -1)
+    is_dest = np.zeros(len(next_hop), dtype=bool)
+    is_dest[destinations] = True
+    target[destinations] = destinations
+    for _ in range(64):
+        pending = (target >= 0) & ~is_dest[np.maximum(target, 0)]
+        if not pending.any():
+            break
+        target[pending] = target[target[pending]]
+    target[(target >= 0) & ~is_dest[np.maximum(target, 0)]] = -1
+    return target
+
+
+def _weighted_quantile(values, weights, q):
+    if len(values) == 0:
+        return 0.0
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    index = np.searchsorted(cumulative, q * cumulative[-1])
+    return round(float(values[order][min(index, len(values) - 1)]), 2)
+
+
+def _latlng(graph, city_data, node_id):
+    lat, lng = city_assets.from_local_km(graph.x[node_id], graph.y[node_id], city_data)
+    return {'lat': round(float(lat), 5), 'lng': round(float(lng), 5)}
@@ -0,0 +1,173 @@
+"""
+Inverse impact solver
+Finds the smallest diameter, velocity or density at which an impact reaches a set of
+target effects (a damage radius, casualties, energy...). Effects that grow with the
+solved parameter can be targeted (ones that shrink, such as survival rate, are
+rejected), so the threshold at each point of a grid over the other two parameters is
+found by bracketed root finding on the third (Illinois regula falsi in log space,
+falling back to bisection); all grid points and target levels are solved together
+as arrays.
+"""
+
+import math
+
+import numpy as np
+
+PARAMETERS = ('diameter_m', 'velocity_km_s', 'density_kg_m3')
+# solver bounds when a request gives none
+BOUNDS = {
+    'diameter_m': (1.0, 50000.0),
+    'velocity_km_s': (11.2, 72.0),
+    'density_kg_m3': (500.0, 8000.0)
+}
+# grid (or fixed value) for the parameters that are not being solved for
+DEFAULT_AXES = {
+    'diameter_m': [10.0, 10000.0],
+    'velocity_km_s': [11.2, 72.0],
+    'density_kg_m3': 2600.0
+}
+DEFAULT_RESOLUTION = 64
+MAX_RESOLUTION = 512
+MAX_LEVELS = 16
+RELATIVE_TOLERANCE = 1e-4
+MARGIN_FLOOR = 1e-6      # effects below a millionth of their target count as that far short
+
+
+def parse_bounds(name, spec):
+    lo, hi = BOUNDS[name] if spec is None else (float(spec[0]), float(spec[1]))
+    if not 0 < lo < hi:
+        raise ValueError(f"bounds for {name} must satisfy 0 < min < max")
+    return lo, hi
+
+
+def parse_axis(name, spec, resolution):
+    """A fixed value or a [min, max] range sampled geometrically"""
+    spec = DEFAULT_AXES[name] if spec is None else spec
+    if isinstance(spec, (int, float)):
+        if spec <= 0:
+            raise ValueError(f"{name} must be positive")
+        return np.array([float(spec)])
+    lo, hi = float(spec[0]), float(spec[1])
+    if not 0 < lo < hi:
+        raise ValueError(f"{name} range must satisfy 0 < min < max")
+    return np.geomspace(lo, hi, resolution)
+
+
+def parse_targets(targets, metrics):
+    """{metric: threshold or list of thresholds} -> {metric: (levels,) array}"""
+    if not targets:
+        raise ValueError("targets must name at least one effect threshold")
+    unknown = sorted(set(targets) - set(metrics))
+    if unknown:
+        raise ValueError(f"Unknown target metrics: {', '.join(unknown)} (available: {', '.join(sorted(metrics))})")
+    lengths = {len(v) for v in targets.values() if isinstance(v, (list, tuple))}
+    if len(lengths) > 1:
+        raise ValueError("Target threshold lists must all have the same length")
+    levels = lengths.pop() if lengths else 1
+    if not 1 <= levels <= MAX_LEVELS:
+        raise ValueError(f"Between 1 and {MAX_LEVELS} target levels are supported")
+    parsed = {metric: np.broadcast_to(np.asarray(value, dtype=float), (levels,)).copy()
+              for metric, value in targets.items()}
+    if any(not np.all(values > 0) for values in parsed.values()):
+        raise ValueError("Target thresholds must be positive")
+    return parsed
+
+
+def solve(evaluate, targets, solve_for, bounds, axes, tolerance=RELATIVE_TOLERANCE, max_iterations=100):
+    """Smallest value of solve_for meeting every target, over the grid of the other axes.
+
+    evaluate(params) maps {parameter: 1-D array} to {metric: array}; targets maps metrics
+    to per-level thresholds; axes holds the grids of the two other parameters in order.
+    Returns (threshold, met_at_minimum, unreachable), each shaped (levels, n_a, n_b);
+    threshold is nan where the targets are out of reach within bounds.
+    """
+    levels = len(next(iter(targets.values())))
+    grid = np.meshgrid(np.arange(levels), *axes.values(), indexing='ij')
+    shape = grid[0].shape
+    params = {name: values.ravel() for name, values in zip(axes, grid[1:])}
+    thresholds = {metric: values[grid[0].ravel()] for metric, values in targets.items()}
+
+    def effects_at(log_value, rows):
+        effects = evaluate(dict({name: values[rows] for name, values in params.items()},
+                                **{solve_for: np.exp(log_value)}))
+        return {metric: np.broadcast_to(np.nan_to_num(effects[metric], nan=0.0), rows.shape)
+                for metric in thresholds}
+
+    def excess(log_value, rows, effects=None):
+        """Log margin of the worst target (>= 0 where every target is met). Effects are
+        mostly power laws, which makes this close to linear in the log parameter."""
+        effects = effects_at(log_value, rows) if effects is None else effects
+        worst = np.full(len(rows), np.inf)
+        for metric, threshold in thresholds.items():
+            t = threshold[rows]
+            worst = np.minimum(worst, np.log(np.maximum(effects[metric], t * MARGIN_FLOOR) / t))
+        return worst
+
+    everything = np.arange(grid[0].size)
+    lo = np.full(everything.size, math.log(bounds[0]))
+    hi = np.full(everything.size, math.log(bounds[1]))
+    at_lo, at_hi = effects_at(lo, everything), effects_at(hi, everything)
+    # the bracketing only holds for effects that grow with the parameter
+    for metric in thresholds:
+        if np.any(at_lo[metric] > at_hi[metric] * (1 + RELATIVE_TOLERANCE)):
+            raise ValueError(f"{metric} does not grow with {solve_for}, so it cannot be targeted "
+                             f"as a minimum; only effects that increase with {solve_for} are supported")
+    f_lo, f_hi = excess(lo, everything, at_lo), excess(hi, everything, at_hi)
+    at_minimum, reachable = f_lo >= 0, f_hi >= 0
+
+    # Illinois regula falsi on each bracketing point; the excess is monotonic in the
+    # parameter, so the bracket always holds and only unconverged points are re-evaluated.
+    # A point is done once its bracket is narrower than tolerance (in log units) or a
+    # point meeting the targets is found within tolerance of them.
+    side = np.zeros(everything.size, dtype=np.int8)
+    active = everything[~at_minimum & reachable & (f_hi > tolerance)]
+    for _ in range(max_iterations):
+        active = active[hi[active] - lo[active] > tolerance]
+        if len(active) == 0:
+            break
+        a, b, fa, fb = lo[active], hi[active], f_lo[active], f_hi[active]
+        # aim half a tolerance past the root, so a good step lands on the met side
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = b - (fb - 0.5 * tolerance) * (b - a) / (fb - fa)
+        # fall back to bisection when the secant step is unusable
+        x = np.where(np.isfinite(x) & (x > a) & (x < b), x, 0.5 * (a + b))
+        fx = excess(x, active)
+        met = fx >= 0
+        stale_lo = met & (side[active] == 1)
+        stale_hi = ~met & (side[active] == -1)
+        hi[active] = np.where(met, x, b)
+        f_hi[active] = np.where(met, fx, np.where(stale_hi, 0.5 * fb, fb))
+        lo[active] = np.where(met, a, x)
+        f_lo[active] = np.where(met, np.where(stale_lo, 0.5 * fa, fa), fx)
+        side[active] = np.where(met, 1, -1)
+        active = active[~met | (fx > tolerance)]
+
+    threshold = np.where(at_minimum, bounds[0], np.exp(hi))
+    threshold[~reachable] = np.nan
+    return threshold.reshape(shape), at_minimum.reshape(shape), (~reachable).reshape(shape)
+
+
+def _segments(x, y):
+    """Split a polyline at its gaps (nan thresholds)"""
+    finite = np.isfinite(y)
+    breaks = np.nonzero(np.diff(finite.astype(np.int8)))[0] + 1
+    return [(x[chunk], y[chunk]) for chunk in np.split(np.arange(len(x)), breaks) if finite[chunk[0]]]
+
+
+def contours(threshold, targets, solve_for, axes, decimals=6):
+    """Iso-contours of the targets in the plane of the first ranged axis and solve_for,
+    one line per target level and value of the remaining axis"""
+    names = list(axes)
+    x_name = next((name for name in names if len(axes[name]) > 1), names[0])
+    other = names[1] if x_name == names[0] else names[0]
+    lines = []
+    for level in range(threshold.shape[0]):
+        for k, fixed in enumerate(axes[other]):
+            y = threshold[level, :, k] if x_name == names[0] else threshold[level, k, :]
+            lines.append({
+                'targets': {metric: float(values[level]) for metric, values in targets.items()},
+                'fixed': {other: round(float(fixed), decimals)},
+                'segments': [{x_name: np.round(sx, decimals).tolist(), solve_for: np.round(sy, decimals).tolist()}
+                             for sx, sy in _segments(axes[x_name], y)]
+            })
+    return lines
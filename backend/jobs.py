@@ -0,0 +1,304 @@
+"""
+Local job queue for long-running simulations
+SQLite holds the queue and the results (no external broker); a dispatcher thread in
+each web process claims queued jobs by priority and runs them on a process pool.
+Identical submissions are deduplicated by an input hash, workers report progress
+back through the database, and finished jobs are purged after JOB_RESULT_TTL.
+"""
+
+import hashlib
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join(tempfile.gettempdir(), 'meteorsim-jobs.sqlite3'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', str(24 * 3600)))
+POLL_INTERVAL = 0.5
+CLEANUP_INTERVAL = 60.0
+
+PRIORITIES = {'low': 0, 'normal': 5, 'high': 10}
+ACTIVE_STATES = ('queued', 'running')
+
+# kind -> callable(params, progress) returning a JSON-serialisable result
+JOB_KINDS = {}
+# modules defining the registered kinds, imported again in each pool worker
+JOB_MODULES = set()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result BLOB,
+    error TEXT,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS jobs_hash ON jobs (input_hash, status);
+"""
+
+
+class JobError(ValueError):
+    """Invalid submission (unknown kind, bad priority)"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job was cancelled"""
+
+
+def register(kind):
+    def decorator(fn):
+        JOB_KINDS[kind] = fn
+        JOB_MODULES.add(fn.__module__)
+        return fn
+    return decorator
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or JOB_DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def input_hash(kind, params, version=''):
+    canonical = json.dumps({'kind': kind, 'params': params, 'version': version}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _status(row):
+    return {
+        'job_id': row['id'],
+        'kind': row['kind'],
+        'status': row['status'],
+        'priority': row['priority'],
+        'progress': row['progress'],
+        'message': row['message'],
+        'error': row['error'],
+        'created_at': row['created_at'],
+        'started_at': row['started_at'],
+        'finished_at': row['finished_at']
+    }
+
+
+class Progress:
+    """Progress callback handed to job functions; raises JobCancelled once cancelled"""
+
+    def __init__(self, conn, job_id, min_interval=0.25):
+        self.conn = conn
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last = 0.0
+
+    def __call__(self, fraction, message=None):
+        now = time.monotonic()
+        if now - self._last < self.min_interval and fraction < 1.0:
+            return
+        self._last = now
+        cur = self.conn.execute("UPDATE jobs SET progress = ?, message = COALESCE(?, message) "
+                                "WHERE id = ? AND status = 'running'", (float(fraction), message, self.job_id))
+        if cur.rowcount == 0:
+            raise JobCancelled(self.job_id)
+
+
+def _init_worker(modules):
+    """Process-pool initializer: register the job kinds. Workers are spawned rather than
+    forked from the threaded web process, so every open file, flock and lock they use
+    (the shared result store's included) is their own."""
+    for name in modules:
+        if name != '__main__':    # a spawned worker re-runs the main script by itself
+            importlib.import_module(name)
+
+
+def _run_job(db_path, job_id, kind, params_json):
+    """Process-pool entry point: run one job and store its outcome"""
+    conn = connect(db_path)
+    try:
+        result = JOB_KINDS[kind](json.loads(params_json), Progress(conn, job_id))
+        blob = zlib.compress(json.dumps(result).encode('utf-8'))
+        conn.execute("UPDATE jobs SET status = 'done', progress = 1, result = ?, finished_at = ? "
+                     "WHERE id = ? AND status = 'running'", (blob, time.time(), job_id))
+    except JobCancelled:
+        pass
+    except Exception as e:
+        logger.error(f"Job {job_id} ({kind}) failed: {e}")
+        conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                     "WHERE id = ? AND status = 'running'", (str(e), time.time(), job_id))
+    finally:
+        conn.close()
+
+
+class JobQueue:
+    """Submit/status/result/cancel over the SQLite queue, plus the dispatcher thread"""
+
+    def __init__(self, db_path=None, workers=None, autostart=True):
+        self.db_path = db_path or JOB_DB_PATH
+        self.workers = workers or JOB_WORKERS
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._running = {}
+        self._dispatcher = None
+        self._last_cleanup = 0.0
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+        # jobs queued or orphaned before a restart run without waiting for a new submission
+        if autostart:
+            self.start()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.db_path)
+        return conn
+
+    # -- client API ----------------------------------------------------------
+
+    def submit(self, kind, params, priority='normal', version=''):
+        """Queue a job, or return the live/finished job with the same inputs.
+        version (e.g. a code hash) keeps results of older code from being reused."""
+        if kind not in JOB_KINDS:
+            raise JobError(f"Unknown job kind '{kind}' (available: {', '.join(sorted(JOB_KINDS))})")
+        if isinstance(priority, str):
+            if priority not in PRIORITIES:
+                raise JobError(f"Priority must be one of {', '.join(PRIORITIES)} or an integer")
+            priority = PRIORITIES[priority]
+        elif not isinstance(priority, int) or isinstance(priority, bool):
+            raise JobError(f"Priority must be one of {', '.join(PRIORITIES)} or an integer")
+        digest = input_hash(kind, params, version)
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE input_hash = ? AND status IN ('queued', 'running', 'done') "
+                               "ORDER BY created_at DESC LIMIT 1", (digest,)).fetchone()
+            if row is not None:
+                conn.execute('COMMIT')
+                return dict(_status(row), deduplicated=True)
+            job_id = uuid.uuid4().hex
+            conn.execute("INSERT INTO jobs (id, kind, input_hash, params, priority, status, created_at) "
+                         "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                         (job_id, kind, digest, json.dumps(params), int(priority), time.time()))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self.start()
+        return dict(self.status(job_id), deduplicated=False)
+
+    def status(self, job_id):
+        row = self._conn().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _status(row) if row else None
+
+    def result(self, job_id):
+        """(status dict, result) - result is None until the job is done"""
+        row = self._conn().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None, None
+        result = json.loads(zlib.decompress(row['result'])) if row['status'] == 'done' else None
+        return _status(row), result
+
+    def cancel(self, job_id):
+        cur = self._conn().execute("UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                                   "WHERE id = ? AND status IN ('queued', 'running')", (time.time(), job_id))
+        return cur.rowcount > 0
+
+    def stats(self):
+        rows = self._conn().execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status').fetchall()
+        return {'workers': self.workers, 'db_path': self.db_path, 'jobs': {r['status']: r['n'] for r in rows}}
+
+    # -- dispatcher ------------------------------------------------------------
+
+    def start(self):
+        if multiprocessing.parent_process() is not None:
+            return    # a pool worker importing the app never dispatches itself
+        with self._lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._requeue_orphans()
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name='job-dispatcher', daemon=True)
+                self._dispatcher.start()
+
+    def _requeue_orphans(self):
+        """Put back jobs whose dispatching process died mid-run"""
+        conn = self._conn()
+        for row in conn.execute("SELECT id, owner_pid FROM jobs WHERE status = 'running'").fetchall():
+            if row['owner_pid'] and not _pid_alive(row['owner_pid']):
+                conn.execute("UPDATE jobs SET status = 'queued', progress = 0, owner_pid = NULL "
+                             "WHERE id = ? AND status = 'running'", (row['id'],))
+
+    def _claim(self):
+        """Atomically move the highest-priority queued job to running"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' "
+                               "ORDER BY priority DESC, created_at LIMIT 1").fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', started_at = ?, owner_pid = ? WHERE id = ?",
+                             (time.time(), os.getpid(), row['id']))
+            conn.execute('COMMIT')
+            return row
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _dispatch_loop(self):
+        while True:
+            try:
+                self._running = {job_id: f for job_id, f in self._running.items() if not f.done()}
+                while len(self._running) < self.workers:
+                    row = self._claim()
+                    if row is None:
+                        break
+                    if self._pool is None:
+                        self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context('spawn'),
+                                                         initializer=_init_worker,
+                                                         initargs=(sorted(JOB_MODULES),))
+                    self._running[row['id']] = self._pool.submit(_run_job, self.db_path, row['id'],
+                                                                 row['kind'], row['params'])
+                if time.monotonic() - self._last_cleanup > CLEANUP_INTERVAL:
+                    # also picks up jobs of other web processes that died mid-run
+                    self._requeue_orphans()
+                    self.cleanup()
+            except Exception as e:
+                logger.error(f"Job dispatcher error: {e}")
+            time.sleep(POLL_INTERVAL)
+
+    def cleanup(self, ttl_seconds=None):
+        """Delete finished jobs (and their results) older than the TTL"""
+        self._last_cleanup = time.monotonic()
+        cutoff = time.time() - (JOB_RESULT_TTL if ttl_seconds is None else ttl_seconds)
+        cur = self._conn().execute("DELETE FROM jobs WHERE status NOT IN ('queued', 'running') "
+                                   "AND finished_at < ?", (cutoff,))
+        return cur.rowcount
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
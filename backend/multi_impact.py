@@ -0,0 +1,257 @@
+"""
+Global multi-impact engine
+Accumulates peak overpressure and thermal fluence from many simultaneous impacts
+(fragment swarms, scattered strikes) on a sparse equal-angle world grid: only the
+cells some impact actually reaches are ever materialised. Impacts are split into
+chunks that are reduced independently on a process pool and merged at the end.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import timelapse
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_RESOLUTION_DEG = 0.1
+MIN_OVERPRESSURE_KPA = 1.0        # beyond this and MIN_FLUENCE a cell is not recorded
+MIN_FLUENCE_KJ_M2 = 10.0
+MAX_EFFECT_RADIUS_KM = 3000.0
+INLINE_IMPACTS = 64               # below this a pool costs more than it saves
+MAX_IMPACTS = 100000
+
+# damage thresholds reported as affected area (Glasstone & Dolan / Collins et al.)
+OVERPRESSURE_THRESHOLDS_KPA = {'window_breakage': 5.0, 'heavy_damage': 20.0, 'total_collapse': 100.0}
+FLUENCE_THRESHOLDS_KJ_M2 = {'second_degree_burns': 250.0, 'clothing_ignition': 1000.0}
+
+WORKERS = int(os.getenv('MULTI_IMPACT_WORKERS', str(os.cpu_count() or 1)))
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS)
+    return _pool
+
+
+def great_circle_km(lat1, lng1, lat2, lng2):
+    """Haversine ground range between points given in degrees"""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    h = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(np.asarray(lng2) - np.asarray(lng1)) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def impact_energy_j(diameter_m, velocity_km_s, density_kg_m3):
+    radius = np.asarray(diameter_m, dtype=float) / 2.0
+    mass = (4.0 / 3.0) * math.pi * radius ** 3 * np.asarray(density_kg_m3, dtype=float)
+    return 0.5 * mass * (np.asarray(velocity_km_s, dtype=float) * 1000.0) ** 2
+
+
+def thermal_fluence_kj_m2(r_m, energy_j):
+    """Radiated fluence at ground range r (Collins et al. 2005: Q = eta E / 2 pi r^2)"""
+    return timelapse.LUMINOUS_EFFICIENCY * energy_j / (2 * math.pi * np.maximum(r_m, 1.0) ** 2) / 1000.0
+
+
+def effect_radius_km(energy_j):
+    """Range at which both overpressure and fluence fall below the recording thresholds"""
+    r_km = np.geomspace(0.1, MAX_EFFECT_RADIUS_KM, 256)
+    above = ((timelapse.peak_overpressure_kpa(r_km * 1000.0, energy_j) >= MIN_OVERPRESSURE_KPA)
+             | (thermal_fluence_kj_m2(r_km * 1000.0, energy_j) >= MIN_FLUENCE_KJ_M2))
+    return float(r_km[np.nonzero(above)[0][-1]]) if above.any() else 0.0
+
+
+def expand_fragments(spec, seed=None):
+    """Fragment swarm around a centre: lognormal sizes sharing the parent's volume,
+    scattered in an ellipse elongated along the entry azimuth"""
+    count = int(spec.get('count', 10))
+    if count < 1:
+        raise ValueError('Fragment count must be at least 1')
+    rng = np.random.default_rng(spec.get('seed', seed))
+    shares = rng.lognormal(0.0, float(spec.get('size_sigma', 0.8)), count)
+    diameters = float(spec['diameter']) * (shares / shares.sum()) ** (1.0 / 3.0)
+    along, across = float(spec.get('spread_km', 20.0)), float(spec.get('spread_km', 20.0)) * 0.3
+    azimuth = math.radians(float(spec.get('azimuth_deg', 90.0)))
+    u, v = rng.normal(0.0, along / 2, count), rng.normal(0.0, across / 2, count)
+    east = u * math.sin(azimuth) + v * math.cos(azimuth)
+    north = u * math.cos(azimuth) - v * math.sin(azimuth)
+    lat = float(spec['lat']) + north / 110.574
+    lng = float(spec['lng']) + east / (111.320 * max(math.cos(math.radians(float(spec['lat']))), 1e-6))
+    velocity = np.full(count, float(spec.get('velocity', 20.0)))
+    density = np.full(count, float(spec.get('density', 2600.0)))
+    return np.column_stack([lat, (lng + 180.0) % 360.0 - 180.0, diameters, velocity, density])
+
+
+def impact_array(impacts=None, swarms=None):
+    """(N, 5) array of lat, lng, diameter_m, velocity_km_s, density from request JSON"""
+    rows = [[float(i['lat']), float(i['lng']), float(i['diameter']), float(i.get('velocity', 20.0)),
+             float(i.get('density', 2600.0))] for i in (impacts or [])]
+    parts = [np.asarray(rows, dtype=float).reshape(-1, 5)]
+    parts += [expand_fragments(spec, seed=k) for k, spec in enumerate(swarms or [])]
+    table = np.concatenate(parts)
+    if len(table) == 0:
+        raise ValueError('Provide at least one impact or fragment swarm')
+    if len(table) > MAX_IMPACTS:
+        raise ValueError(f'At most {MAX_IMPACTS} impacts per run')
+    if (table[:, 2] <= 0).any() or (table[:, 3] <= 0).any() or (table[:, 4] <= 0).any():
+        raise ValueError('Diameter, velocity and density must be positive')
+    if (np.abs(table[:, 0]) > 90).any():
+        raise ValueError('Latitude must be within [-90, 90]')
+    return table
+
+
+class WorldGrid:
+    """Equal-angle global grid; a cell id is row * cols + col, rows counted from the south pole"""
+
+    def __init__(self, resolution_deg=DEFAULT_RESOLUTION_DEG):
+        self.resolution = float(resolution_deg)
+        self.rows = int(round(180.0 / self.resolution))
+        self.cols = int(round(360.0 / self.resolution))
+
+    def cell_of(self, lat, lng):
+        row = np.clip(((np.asarray(lat) + 90.0) / self.resolution).astype(np.int64), 0, self.rows - 1)
+        col = (((np.asarray(lng) + 180.0) / self.resolution).astype(np.int64)) % self.cols
+        return row * self.cols + col
+
+    def cell_centres(self, cell):
+        row, col = np.divmod(cell, self.cols)
+        return -90.0 + (row + 0.5) * self.resolution, -180.0 + (col + 0.5) * self.resolution
+
+    def cell_area_km2(self, cell):
+        lat, _ = self.cell_centres(cell)
+        side = math.radians(self.resolution) * EARTH_RADIUS_KM
+        return side * side * np.cos(np.radians(lat))
+
+    def cells_near(self, lat, lng, radius_km):
+        """Cell ids of the lat/lng bounding box around a point (wrapping in longitude)"""
+        dlat = radius_km / 110.574
+        row_lo = max(0, int((lat - dlat + 90.0) / self.resolution))
+        row_hi = min(self.rows - 1, int((lat + dlat + 90.0) / self.resolution))
+        widest = max(abs(lat) + dlat, 0.0)
+        cos_lat = math.cos(math.radians(min(widest, 89.9)))
+        dlng = radius_km / (111.320 * cos_lat)
+        if widest >= 89.9 or dlng >= 180.0:
+            cols = np.arange(self.cols)
+        else:
+            col_lo = int(math.floor((lng - dlng + 180.0) / self.resolution))
+            col_hi = int(math.floor((lng + dlng + 180.0) / self.resolution))
+            cols = np.arange(col_lo, col_hi + 1) % self.cols
+        rows = np.arange(row_lo, row_hi + 1)
+        return (rows[:, None] * self.cols + cols[None, :]).ravel()
+
+
+def _reduce(cells, overpressure, fluence):
+    """Merge duplicate cells: overpressure keeps the peak, fluence adds up"""
+    if len(cells) == 0:
+        return cells, overpressure, fluence
+    order = np.argsort(cells, kind='stable')
+    cells, overpressure, fluence = cells[order], overpressure[order], fluence[order]
+    starts = np.concatenate(([0], np.nonzero(np.diff(cells))[0] + 1))
+    return cells[starts], np.maximum.reduceat(overpressure, starts), np.add.reduceat(fluence, starts)
+
+
+def accumulate_chunk(impacts, resolution_deg):
+    """Sparse (cells, peak overpressure kPa, total fluence kJ/m²) for a block of impacts"""
+    grid = WorldGrid(resolution_deg)
+    energies = impact_energy_j(impacts[:, 2], impacts[:, 3], impacts[:, 4])
+    all_cells, all_op, all_fluence = [], [], []
+    merged_size, pending = 0, 0
+    for (lat, lng, _, _, _), energy in zip(impacts, energies):
+        cells = grid.cells_near(lat, lng, effect_radius_km(energy))
+        cell_lat, cell_lng = grid.cell_centres(cells)
+        r_m = great_circle_km(lat, lng, cell_lat, cell_lng) * 1000.0
+        op = timelapse.peak_overpressure_kpa(r_m, energy)
+        fluence = thermal_fluence_kj_m2(r_m, energy)
+        keep = (op >= MIN_OVERPRESSURE_KPA) | (fluence >= MIN_FLUENCE_KJ_M2)
+        all_cells.append(cells[keep])
+        all_op.append(op[keep])
+        all_fluence.append(fluence[keep])
+        pending += int(keep.sum())
+        if pending > max(merged_size, 4_000_000):
+            # keep the working set bounded for very large swarms; merging only once the
+            # unmerged tail outgrows the merged part keeps the total work linear
+            merged = _reduce(np.concatenate(all_cells), np.concatenate(all_op), np.concatenate(all_fluence))
+            all_cells, all_op, all_fluence = [merged[0]], [merged[1]], [merged[2]]
+            merged_size, pending = len(merged[0]), 0
+    if not all_cells:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+    return _reduce(np.concatenate(all_cells), np.concatenate(all_op), np.concatenate(all_fluence))
+
+
+def run_impacts(impacts, resolution_deg=DEFAULT_RESOLUTION_DEG, workers=None, progress=None):
+    """Accumulate all impacts; chunks run on the process pool when there are enough of them.
+    progress(fraction, message) is called as chunks complete."""
+    workers = WORKERS if workers is None else workers
+    if len(impacts) < INLINE_IMPACTS:
+        return accumulate_chunk(impacts, resolution_deg), 1
+    # a few chunks per worker so one swarm of large fragments does not leave cores idle
+    chunks = np.array_split(impacts, min(len(impacts), max(workers, 1) * 4))
+    if workers <= 1:
+        mapped = (accumulate_chunk(chunk, resolution_deg) for chunk in chunks)
+    else:
+        mapped = get_pool().map(accumulate_chunk, chunks, [resolution_deg] * len(chunks))
+    results = []
+    for result in mapped:
+        results.append(result)
+        if progress:
+            progress(len(results) / len(chunks), f'{len(results)}/{len(chunks)} chunks')
+    merged = _reduce(np.concatenate([r[0] for r in results]),
+                     np.concatenate([r[1] for r in results]),
+                     np.concatenate([r[2] for r in results]))
+    return merged, min(max(workers, 1), len(chunks))
+
+
+def exposure_report(grid, cells, overpressure, fluence, cities, max_cities=1000):
+    """Per-city and per-country exposure plus global affected areas.
+    cities holds equal-length columns (id, name, country, lat, lng, population); only
+    cities the event reaches are listed, strongest first."""
+    area = grid.cell_area_km2(cells)
+    areas = {}
+    for name, threshold in OVERPRESSURE_THRESHOLDS_KPA.items():
+        areas[name] = round(float(area[overpressure >= threshold].sum()), 1)
+    for name, threshold in FLUENCE_THRESHOLDS_KJ_M2.items():
+        areas[name] = round(float(area[fluence >= threshold].sum()), 1)
+
+    city_cells = grid.cell_of(cities['lat'], cities['lng'])
+    index = np.minimum(np.searchsorted(cells, city_cells), max(len(cells) - 1, 0))
+    hit = (cells[index] == city_cells) if len(cells) else np.zeros(len(city_cells), dtype=bool)
+    op = np.where(hit, overpressure[index] if len(cells) else 0.0, 0.0)
+    q = np.where(hit, fluence[index] if len(cells) else 0.0, 0.0)
+    # population share exposed, ramping from window breakage to total collapse pressure
+    severity = np.clip(np.log(np.maximum(op, 1e-9) / OVERPRESSURE_THRESHOLDS_KPA['window_breakage'])
+                       / math.log(OVERPRESSURE_THRESHOLDS_KPA['total_collapse']
+                                  / OVERPRESSURE_THRESHOLDS_KPA['window_breakage']), 0.0, 1.0)
+    exposed = np.round(cities['population'] * severity).astype(np.int64)
+
+    affected = np.nonzero((op > 0) | (q > 0))[0]
+    affected = affected[np.argsort(-op[affected], kind='stable')]
+    city_rows = [{
+        'city_id': str(cities['id'][i]),
+        'name': str(cities['name'][i]),
+        'country': str(cities['country'][i]) or None,
+        'peak_overpressure_kpa': round(float(op[i]), 2),
+        'thermal_fluence_kj_m2': round(float(q[i]), 2),
+        'exposed_population': int(exposed[i])
+    } for i in affected[:max_cities]]
+
+    country_names, country_of = np.unique(np.where(cities['country'][affected] == '', 'Unknown',
+                                                   cities['country'][affected]), return_inverse=True)
+    peak = np.zeros(len(country_names))
+    np.maximum.at(peak, country_of, op[affected])
+    countries = [{
+        'country': str(name),
+        'cities': int(count),
+        'exposed_population': int(total),
+        'peak_overpressure_kpa': round(float(p), 2)
+    } for name, count, total, p in zip(country_names, np.bincount(country_of, minlength=len(country_names)),
+                                       np.bincount(country_of, exposed[affected], len(country_names)), peak)]
+
+    return {
+        'affected_area_km2': areas,
+        'cities_affected': int(len(affected)),
+        'cities': city_rows,
+        'countries': sorted(countries, key=lambda c: -c['exposed_population'])
+    }
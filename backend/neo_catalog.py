@@ -0,0 +1,405 @@
+"""
+NEO catalogue
+Near-Earth objects seen in NASA feed and lookup responses, kept as numeric columns
+(diameter range, velocity, miss distance, approach epoch, H magnitude, hazard flag)
+and one UTF-8 string table for names instead of the nested JSON records, roughly a
+hundred bytes per object. Filters, sorts and aggregates are vectorised masks over the
+columns. Like the city catalogue the table is immutable: ingesting builds a merged
+copy and swaps the module reference, so readers never see a half-built table.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_OBJECTS = 500000
+# size classes on the mean estimated diameter (m)
+SIZE_CLASSES = (('small', 0.0, 140.0), ('medium', 140.0, 1000.0), ('large', 1000.0, np.inf))
+NUMERIC_COLUMNS = ('diameter_min_m', 'diameter_max_m', 'velocity_km_s', 'miss_distance_km',
+                   'approach_epoch_s', 'h_magnitude')
+# query fields: min_<field> / max_<field> filters and sort keys
+RANGE_FIELDS = ('diameter_m', 'diameter_min_m', 'diameter_max_m', 'velocity_km_s', 'miss_distance_km',
+                'h_magnitude')
+SORT_FIELDS = RANGE_FIELDS + ('approach_date', 'name')
+MAX_LIMIT = 10000
+# the parts of a NASA record the simulator reads; None keeps the whole value
+RECORD_FIELDS = {'id': None, 'name': None, 'is_potentially_hazardous_asteroid': None,
+                 'absolute_magnitude_h': None, 'estimated_diameter': {'meters': None}}
+APPROACH_FIELDS = {'close_approach_date': None, 'epoch_date_close_approach': None, 'orbiting_body': None,
+                   'relative_velocity': {'kilometers_per_second': None}, 'miss_distance': {'kilometers': None}}
+
+
+class StringTable:
+    """Strings packed into one UTF-8 buffer with row offsets"""
+
+    def __init__(self, values=(), data=None, offsets=None):
+        if data is None:
+            encoded = [str(value).encode('utf-8') for value in values]
+            data = b''.join(encoded)
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        self.data = data
+        self.offsets = offsets
+        self._folded = None
+
+    @classmethod
+    def concat(cls, tables):
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for table in tables:
+            offsets.append(table.offsets[1:] + base)
+            base += len(table.data)
+        return cls(data=b''.join(table.data for table in tables), offsets=np.concatenate(offsets))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+
+    def take(self, rows):
+        """Table of the given rows, gathered byte-wise without decoding"""
+        rows = np.asarray(rows, dtype=np.int64)
+        lengths = self.offsets[rows + 1] - self.offsets[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        gather = np.repeat(self.offsets[rows] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return StringTable(data=np.frombuffer(self.data, dtype=np.uint8)[gather].tobytes(), offsets=offsets)
+
+    @property
+    def nbytes(self):
+        return len(self.data) + self.offsets.nbytes
+
+    def contains(self, text):
+        """Row mask of the strings containing text (ASCII case-insensitive)"""
+        if self._folded is None:
+            self._folded = self.data.lower()
+        needle = text.encode('utf-8').lower()
+        starts = []
+        position = self._folded.find(needle)
+        while position != -1:
+            starts.append(position)
+            position = self._folded.find(needle, position + 1)
+        mask = np.zeros(len(self), dtype=bool)
+        if starts and needle:
+            starts = np.array(starts)
+            rows = np.searchsorted(self.offsets, starts, 'right') - 1
+            # a match must not run across the boundary into the next name
+            mask[rows[starts + len(needle) <= self.offsets[rows + 1]]] = True
+        return mask
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _approach(neo, now_ms):
+    """The close approach a record stands for: the only one in a feed record, the next
+    Earth approach (or the latest past one) in a lookup record"""
+    approaches = neo.get('close_approach_data') or []
+    if len(approaches) <= 1:
+        return approaches[0] if approaches else {}
+    earth = [a for a in approaches if a.get('orbiting_body', 'Earth') == 'Earth'] or approaches
+    upcoming = [a for a in earth if _float(a.get('epoch_date_close_approach')) >= now_ms]
+    return upcoming[0] if upcoming else earth[-1]
+
+
+def _pick(record, fields):
+    picked = {}
+    for key, nested in fields.items():
+        if key in record:
+            value = record[key]
+            picked[key] = _pick(value, nested) if nested and isinstance(value, dict) else value
+    return picked
+
+
+def compact_record(neo):
+    """A NASA NEO record cut down to the fields the handlers and the catalogue read.
+    Of a lookup's approach history only the first approach (the physics summary's) and
+    the one the catalogue stands for are kept."""
+    record = _pick(neo, RECORD_FIELDS)
+    approaches = neo.get('close_approach_data')
+    if approaches:
+        kept = [approaches[0]]
+        approach = _approach(neo, time.time() * 1000.0)
+        if approach is not approaches[0]:
+            kept.append(approach)
+        record['close_approach_data'] = [_pick(approach, APPROACH_FIELDS) for approach in kept]
+    elif approaches is not None:
+        record['close_approach_data'] = approaches
+    return record
+
+
+def compact_feed(feed):
+    """A NASA feed response with only its compacted records, grouped by day as sent"""
+    return {'near_earth_objects': {day: [compact_record(neo) for neo in neos]
+                                   for day, neos in feed.get('near_earth_objects', {}).items()}}
+
+
+def _epoch_seconds(approach):
+    epoch_ms = _float(approach.get('epoch_date_close_approach'))
+    if np.isfinite(epoch_ms):
+        return epoch_ms / 1000.0
+    try:
+        day = datetime.strptime(approach.get('close_approach_date', ''), '%Y-%m-%d')
+    except ValueError:
+        return np.nan
+    return day.replace(tzinfo=timezone.utc).timestamp()
+
+
+class NEOCatalog:
+    """Immutable column store of NEOs, one row per object id"""
+
+    def __init__(self, ids, columns, hazardous, names, sources=()):
+        self.ids = ids
+        self.columns = columns
+        self.hazardous = hazardous
+        self.names = names
+        self.sources = dict(sources)
+        self.index = dict(zip(ids.tolist(), range(len(ids))))
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0, dtype=np.int64), {name: np.zeros(0) for name in NUMERIC_COLUMNS},
+                   np.zeros(0, dtype=bool), StringTable([]))
+
+    @classmethod
+    def from_neos(cls, neos):
+        """Columns from NASA NEO records (feed entries or lookups); records without a
+        numeric id are skipped"""
+        now_ms = time.time() * 1000.0
+        ids, names, hazardous = [], [], []
+        values = {name: [] for name in NUMERIC_COLUMNS}
+        for neo in neos:
+            try:
+                neo_id = int(neo['id'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            approach = _approach(neo, now_ms)
+            diameter = neo.get('estimated_diameter', {}).get('meters', {})
+            ids.append(neo_id)
+            names.append(neo.get('name') or str(neo_id))
+            hazardous.append(bool(neo.get('is_potentially_hazardous_asteroid', False)))
+            values['diameter_min_m'].append(_float(diameter.get('estimated_diameter_min')))
+            values['diameter_max_m'].append(_float(diameter.get('estimated_diameter_max')))
+            values['velocity_km_s'].append(_float(approach.get('relative_velocity', {}).get('kilometers_per_second')))
+            values['miss_distance_km'].append(_float(approach.get('miss_distance', {}).get('kilometers')))
+            values['approach_epoch_s'].append(_epoch_seconds(approach))
+            values['h_magnitude'].append(_float(neo.get('absolute_magnitude_h')))
+        return cls(np.array(ids, dtype=np.int64), {name: np.array(v, dtype=float) for name, v in values.items()},
+                   np.array(hazardous, dtype=bool), StringTable(names))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, neo_id):
+        return int(neo_id) in self.index
+
+    @property
+    def nbytes(self):
+        return (self.ids.nbytes + self.hazardous.nbytes + self.names.nbytes
+                + sum(values.nbytes for values in self.columns.values()))
+
+    def take(self, rows, sources=None):
+        return NEOCatalog(self.ids[rows], {name: values[rows] for name, values in self.columns.items()},
+                          self.hazardous[rows], self.names.take(rows),
+                          self.sources if sources is None else sources)
+
+    def merge(self, other, source=None, max_objects=MAX_OBJECTS):
+        """Catalogue with other's rows replacing this one's for the same ids; beyond
+        max_objects the objects with the earliest approaches are dropped"""
+        ids = np.concatenate([other.ids, self.ids])
+        # np.unique keeps the first occurrence, so the newer rows win
+        _, first = np.unique(ids, return_index=True)
+        columns = {name: np.concatenate([other.columns[name], self.columns[name]]) for name in NUMERIC_COLUMNS}
+        hazardous = np.concatenate([other.hazardous, self.hazardous])
+        names = StringTable.concat([other.names, self.names])
+        if len(first) > max_objects:
+            epochs = np.nan_to_num(columns['approach_epoch_s'][first], nan=-np.inf)
+            first = first[np.argsort(-epochs, kind='stable')[:max_objects]]
+        first.sort()
+        sources = dict(self.sources)
+        if source is not None:
+            sources[source] = time.time()
+        return NEOCatalog(ids, columns, hazardous, names).take(first, sources)
+
+    def column(self, field):
+        if field == 'diameter_m':
+            return 0.5 * (self.columns['diameter_min_m'] + self.columns['diameter_max_m'])
+        if field == 'approach_date':
+            return self.columns['approach_epoch_s']
+        return self.columns[field]
+
+    def query(self, hazardous=None, ranges=None, name=None, approach_from=None, approach_to=None,
+              sort=None, descending=False):
+        """Rows matching every filter, optionally sorted (nan values last).
+
+        ranges maps RANGE_FIELDS to (min or None, max or None); approach bounds are
+        epoch seconds.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if hazardous is not None:
+            mask &= self.hazardous == hazardous
+        for field, (lo, hi) in (ranges or {}).items():
+            values = self.column(field)
+            if lo is not None:
+                mask &= values >= lo
+            if hi is not None:
+                mask &= values <= hi
+        epochs = self.columns['approach_epoch_s']
+        if approach_from is not None:
+            mask &= epochs >= approach_from
+        if approach_to is not None:
+            mask &= epochs <= approach_to
+        if name:
+            mask &= self.names.contains(name)
+        rows = np.nonzero(mask)[0]
+        if sort is None:
+            return rows
+        if sort == 'name':
+            order = np.argsort([self.names[row].lower() for row in rows], kind='stable')
+            return rows[order[::-1] if descending else order]
+        values = self.column(sort)[rows]
+        order = np.argsort(-values if descending else values, kind='stable')
+        return rows[order]
+
+    def record(self, row):
+        c = self.columns
+        epoch = c['approach_epoch_s'][row]
+        record = {
+            'id': str(self.ids[row]),
+            'name': self.names[row],
+            'is_hazardous': bool(self.hazardous[row]),
+            'approach_date': (datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d')
+                              if np.isfinite(epoch) else None),
+            'diameter_m': _finite(0.5 * (c['diameter_min_m'][row] + c['diameter_max_m'][row]))
+        }
+        for name in NUMERIC_COLUMNS:
+            if name != 'approach_epoch_s':
+                record[name] = _finite(c[name][row])
+        return record
+
+    def records(self, rows):
+        return [self.record(row) for row in rows]
+
+    def export_columns(self, rows):
+        """Column set for columnar.table_response"""
+        columns = {'id': self.ids[rows], 'name': np.array([self.names[row] for row in rows], dtype=str),
+                   'is_hazardous': self.hazardous[rows]}
+        columns.update((name, values[rows]) for name, values in self.columns.items())
+        return columns
+
+    def aggregate(self, rows=None):
+        """Counts, size classes and value ranges over a row set (everything by default)"""
+        rows = np.arange(len(self)) if rows is None else rows
+        diameter = self.column('diameter_m')[rows]
+        velocity = self.columns['velocity_km_s'][rows]
+        miss = self.columns['miss_distance_km'][rows]
+        epochs = self.columns['approach_epoch_s'][rows]
+        known = np.isfinite(diameter)
+        sizes = {label: int(np.count_nonzero((diameter >= lo) & (diameter < hi))) for label, lo, hi in SIZE_CLASSES}
+        closest = None
+        if np.isfinite(miss).any():
+            closest = self.record(rows[np.nanargmin(miss)])
+        return {
+            'count': int(len(rows)),
+            'hazardous': int(np.count_nonzero(self.hazardous[rows])),
+            'size_distribution': sizes,
+            'size_fractions': {label: round(count / max(int(known.sum()), 1), 4) for label, count in sizes.items()},
+            'diameter_m': _spread(diameter),
+            'velocity_km_s': _spread(velocity),
+            'miss_distance_km': _spread(miss),
+            'closest_approach': closest,
+            'approach_window': {
+                'first': _date(np.nanmin(epochs)) if np.isfinite(epochs).any() else None,
+                'last': _date(np.nanmax(epochs)) if np.isfinite(epochs).any() else None
+            }
+        }
+
+    def describe(self):
+        return {
+            'objects': len(self),
+            'bytes': int(self.nbytes),
+            'bytes_per_object': round(self.nbytes / len(self), 1) if len(self) else 0,
+            'sources': len(self.sources)
+        }
+
+
+def _finite(value):
+    return float(value) if np.isfinite(value) else None
+
+
+def _date(epoch):
+    return datetime.fromtimestamp(float(epoch), timezone.utc).strftime('%Y-%m-%d')
+
+
+def _spread(values):
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    return {'min': float(values.min()), 'median': float(np.median(values)), 'mean': float(values.mean()),
+            'max': float(values.max())}
+
+
+def parse_query(params):
+    """query() keyword arguments plus (offset, limit) from request parameters"""
+    kwargs = {'ranges': {}}
+    for field in RANGE_FIELDS:
+        lo, hi = params.get(f'min_{field}'), params.get(f'max_{field}')
+        if lo is not None or hi is not None:
+            kwargs['ranges'][field] = (None if lo is None else float(lo), None if hi is None else float(hi))
+    if params.get('hazardous') is not None:
+        kwargs['hazardous'] = str(params['hazardous']).lower() in ('1', 'true', 'yes')
+    for key, param in (('approach_from', 'from'), ('approach_to', 'to')):
+        if params.get(param):
+            try:
+                day = datetime.strptime(params[param], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            except ValueError:
+                raise ValueError(f"{param} must be a YYYY-MM-DD date")
+            # 'to' includes the whole day
+            kwargs[key] = day.timestamp() + (86399.999 if param == 'to' else 0)
+    kwargs['name'] = params.get('name')
+    sort = params.get('sort')
+    if sort is not None:
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}")
+        kwargs['sort'] = sort
+        kwargs['descending'] = str(params.get('order', 'asc')).lower() == 'desc'
+    offset = max(0, int(params.get('offset', 0)))
+    limit = min(max(1, int(params.get('limit', 100))), MAX_LIMIT)
+    return kwargs, offset, limit
+
+
+_current = NEOCatalog.empty()
+_ingest_lock = threading.Lock()
+
+
+def current():
+    return _current
+
+
+def ingest(neos, source=None):
+    """Merge NASA NEO records into the live catalogue"""
+    global _current
+    incoming = NEOCatalog.from_neos(neos)
+    with _ingest_lock:
+        _current = _current.merge(incoming, source)
+        return _current
+
+
+def ingest_feed(feed, source):
+    """Merge a NASA feed response, remembering its source (the feed cache key)"""
+    return ingest((neo for day in feed.get('near_earth_objects', {}).values() for neo in day), source)
+
+
+def ingested_at(source):
+    """When a source was last merged (epoch seconds), or None"""
+    return _current.sources.get(source)
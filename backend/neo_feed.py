@@ -0,0 +1,200 @@
+"""
+Live NEO approach feed
+A single poller fetches the NASA feed, scores it once per scenario model that has
+listeners and diffs the result against the previous snapshot by NEO id. Only the
+changes are broadcast, and each message is encoded once and handed to every
+subscriber as the same bytes, so upstream calls and per-update work stay flat no
+matter how many dashboards are connected.
+"""
+
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRACKED_FIELDS = ('name', 'diameter_m', 'velocity_km_s', 'miss_distance_km', 'approach_date',
+                  'risk_score', 'threat_level')
+SUBSCRIBER_QUEUE = 32
+
+
+def diff_snapshots(previous, current):
+    """Added, updated and removed objects between two {id: record} snapshots"""
+    added, updated = [], []
+    for neo_id, record in current.items():
+        old = previous.get(neo_id)
+        if old is None:
+            added.append(record)
+            continue
+        changed = [field for field in TRACKED_FIELDS if old.get(field) != record.get(field)]
+        if changed:
+            updated.append(dict(record, changed=changed, previous={field: old.get(field) for field in changed}))
+    removed = [neo_id for neo_id in previous if neo_id not in current]
+    return {'added': added, 'updated': updated, 'removed': removed}
+
+
+class Message:
+    """One broadcast, serialised once for every WebSocket and SSE client"""
+
+    __slots__ = ('event', 'sequence', 'text', 'sse')
+
+    def __init__(self, event, sequence, payload):
+        self.event = event
+        self.sequence = sequence
+        self.text = json.dumps(dict(payload, type=event, sequence=sequence), separators=(',', ':'))
+        self.sse = f'id: {sequence}\nevent: {event}\ndata: {self.text}\n\n'.encode('utf-8')
+
+
+class Subscriber:
+    """A client's bounded queue; a client that falls behind is resynced with a snapshot"""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE)
+        self.sent = -1
+
+    def push(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # drop the backlog rather than buffer without bound; a snapshot supersedes it
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def next(self):
+        """Next message to send, skipping anything an earlier snapshot already covered"""
+        while True:
+            message = await self.queue.get()
+            if message is None:
+                message = self.channel.snapshot()
+            if message.sequence > self.sent:
+                self.sent = message.sequence
+                return message
+
+
+class FeedChannel:
+    """Scored view of the feed for one scenario model, with its subscribers"""
+
+    def __init__(self, model):
+        self.model = model
+        self.records = None
+        self.sequence = 0
+        self.subscribers = set()
+        self.upstream_error = None
+        self._snapshot = None
+
+    def snapshot(self):
+        if self._snapshot is None or self._snapshot.sequence != self.sequence:
+            records = sorted((self.records or {}).values(), key=lambda r: -r['risk_score'])
+            self._snapshot = Message('snapshot', self.sequence, {
+                'model': self.model,
+                'count': len(records),
+                'asteroids': records,
+                'upstream_error': self.upstream_error
+            })
+        return self._snapshot
+
+    def publish(self, message):
+        for subscriber in self.subscribers:
+            subscriber.push(message)
+
+    def update(self, records):
+        """Take a freshly scored record list; broadcast whatever changed"""
+        current = {record['id']: record for record in records}
+        recovered = self.upstream_error is not None
+        self.upstream_error = None
+        if self.records is None:
+            self.records = current
+            self.sequence += 1
+            self.publish(self.snapshot())
+            return
+        changes = diff_snapshots(self.records, current)
+        self.records = current
+        if changes['added'] or changes['updated'] or changes['removed'] or recovered:
+            self.sequence += 1
+            self.publish(Message('changes', self.sequence, dict(changes, model=self.model, count=len(current),
+                                                                upstream_error=None)))
+
+    def fail(self, error):
+        """Tell subscribers (once per outage) that the upstream feed is failing"""
+        if self.upstream_error is None:
+            self.upstream_error = error
+            self.sequence += 1
+            self.publish(Message('status', self.sequence, {'model': self.model, 'upstream_error': error}))
+
+
+class NEOFeedHub:
+    """Runs the poller while anyone is subscribed and fans its updates out per model.
+
+    fetch_feed() is awaited once per poll and shared by every channel;
+    score(feed, model) returns that channel's list of scored records.
+    """
+
+    def __init__(self, fetch_feed, score, interval_seconds=60.0):
+        self.fetch_feed = fetch_feed
+        self.score = score
+        self.interval = interval_seconds
+        self.channels = {}
+        self.polls = 0
+        self._task = None
+        self._wake = asyncio.Event()
+
+    def subscribe(self, model):
+        channel = self.channels.get(model)
+        if channel is None:
+            channel = self.channels[model] = FeedChannel(model)
+        subscriber = Subscriber(channel)
+        channel.subscribers.add(subscriber)
+        if channel.records is not None:
+            subscriber.push(channel.snapshot())
+        else:
+            # a new channel should not wait a whole interval for its first snapshot
+            self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        channel = subscriber.channel
+        channel.subscribers.discard(subscriber)
+        if not channel.subscribers and self.channels.get(channel.model) is channel:
+            del self.channels[channel.model]
+
+    def stats(self):
+        return {
+            'polling': self._task is not None and not self._task.done(),
+            'polls': self.polls,
+            'channels': {model: len(channel.subscribers) for model, channel in self.channels.items()}
+        }
+
+    async def _run(self):
+        while self.channels:
+            self._wake.clear()
+            channels = list(self.channels.values())
+            self.polls += 1
+            try:
+                feed = await self.fetch_feed()
+            except Exception as e:
+                logger.warning(f"NEO feed poll failed: {e}")
+                for channel in channels:
+                    channel.fail(str(e))
+            else:
+                for channel in channels:
+                    try:
+                        channel.update(await self.score(feed, channel.model))
+                    except Exception as e:
+                        logger.error(f"Scoring NEO feed for model '{channel.model}' failed: {e}")
+                        channel.fail(str(e))
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,387 @@
+"""
+Admin-boundary exposure
+Loads country / region boundary polygons from GeoJSON files in backend/data/ and
+rasterizes them once onto an equal-angle world grid: a region code per cell (the
+boundary mask) and a population per cell. Cell population is catalogue cities spread
+over their areas plus each region's remaining population spread evenly over its
+cells. An exposure query then only reads the cells inside the damage footprint,
+evaluates the fatality profile at their distances and sums population, casualties
+and ring areas per region with bincount. That keeps continental footprints in
+the tens of milliseconds. The index is rebuilt when the boundary files or the
+city catalogue change.
+
+Files (GeoJSON FeatureCollections of Polygon / MultiPolygon features; later features
+are painted over earlier ones, so list enclosing regions first):
+    regions*.geojson | regions*.json
+        properties: country (or admin / ADMIN / NAME_0), region (or name / NAME_1),
+                    population (or pop_est / POP_EST, optional), iso_a2 (optional)
+The bundled regions.geojson holds simplified outlines of the regions around the sample
+cities; an admin-1 set such as Natural Earth's can be dropped in beside it.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from multi_impact import EARTH_RADIUS_KM, WorldGrid, great_circle_km
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.getenv('REGION_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+RESOLUTION_DEG = float(os.getenv('REGION_RESOLUTION_DEG', '0.1'))
+RELOAD_CHECK_SECONDS = float(os.getenv('REGION_RELOAD_CHECK_SECONDS', '2'))
+MAX_REACH_KM = 5000.0
+MAX_SUBSAMPLE = 8             # footprints a few cells wide are sampled at up to 8x8 points per cell
+CROSSING_BLOCK = 4_000_000    # edge x row crossings evaluated at once while rasterizing
+DISK_BLOCK = 4_000_000        # candidate city cells distance-checked at once
+PROPERTY_ALIASES = {
+    'country': ('country', 'admin', 'ADMIN', 'NAME_0', 'COUNTRY'),
+    'region': ('region', 'name', 'NAME_1', 'NAME'),
+    'population': ('population', 'pop_est', 'POP_EST'),
+    'iso_a2': ('iso_a2', 'ISO_A2', 'iso')
+}
+
+
+class BoundaryDataError(ValueError):
+    """Boundary files are missing fields or hold unusable geometry"""
+
+
+def source_files(data_dir=None):
+    data_dir = data_dir or DATA_DIR
+    return sorted(glob.glob(os.path.join(data_dir, 'regions*.geojson')) +
+                  glob.glob(os.path.join(data_dir, 'regions*.json')))
+
+
+def _signature(files):
+    digest = hashlib.sha1()
+    for path in files:
+        stat = os.stat(path)
+        digest.update(f'{path}:{stat.st_mtime_ns}:{stat.st_size};'.encode())
+    return digest.hexdigest()[:12]
+
+
+def _property(properties, field):
+    for name in PROPERTY_ALIASES[field]:
+        if properties.get(name) not in (None, ''):
+            return properties[name]
+    return None
+
+
+def _rings(geometry):
+    """Every ring of a Polygon / MultiPolygon as an (n, 2) lng/lat array"""
+    kind = (geometry or {}).get('type')
+    if kind == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif kind == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        raise BoundaryDataError(f"unsupported geometry type {kind!r}")
+    return [np.asarray(ring, dtype=float)[:, :2] for polygon in polygons for ring in polygon if len(ring) >= 3]
+
+
+def rasterize(rings, grid):
+    """Cell ids whose centres fall inside the rings (even-odd, so holes are cut out),
+    by scanline: each grid row toggles inside / outside at the edge crossings"""
+    start = np.concatenate([ring for ring in rings])
+    end = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings])
+    x0, y0, x1, y1 = start[:, 0], start[:, 1], end[:, 0], end[:, 1]
+    res = grid.resolution
+    row_lo = max(0, int(math.ceil((min(y0.min(), y1.min()) + 90.0) / res - 0.5)))
+    row_hi = min(grid.rows - 1, int(math.floor((max(y0.max(), y1.max()) + 90.0) / res - 0.5)))
+    col_lo = max(0, int(math.ceil((min(x0.min(), x1.min()) + 180.0) / res - 0.5)))
+    col_hi = min(grid.cols - 1, int(math.floor((max(x0.max(), x1.max()) + 180.0) / res - 0.5)))
+    if row_hi < row_lo or col_hi < col_lo:
+        return np.zeros(0, dtype=np.int64)
+    width = col_hi - col_lo + 1
+    cells = []
+    block = max(1, CROSSING_BLOCK // len(x0))
+    for first in range(row_lo, row_hi + 1, block):
+        rows = np.arange(first, min(first + block, row_hi + 1))
+        yc = -90.0 + (rows + 0.5) * res
+        crosses = (y0[:, None] <= yc[None, :]) != (y1[:, None] <= yc[None, :])
+        edge, row = np.nonzero(crosses)
+        x = x0[edge] + (yc[row] - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+        # the first cell centre at or east of the crossing flips parity
+        col = np.clip(np.ceil((x + 180.0) / res - 0.5).astype(np.int64) - col_lo, 0, width)
+        toggles = np.zeros((len(rows), width + 1), dtype=np.int8)
+        np.add.at(toggles, (row, col), 1)
+        inside = (np.cumsum(toggles[:, :width], axis=1, dtype=np.int32) & 1).astype(bool)
+        r, c = np.nonzero(inside)
+        cells.append((rows[r] * grid.cols + col_lo + c).astype(np.int64))
+    return np.concatenate(cells) if cells else np.zeros(0, dtype=np.int64)
+
+
+def load_features(files):
+    """(rings, properties) per feature from the boundary files"""
+    features = []
+    for path in files:
+        try:
+            with open(path, encoding='utf-8') as handle:
+                collection = json.load(handle)
+        except (OSError, ValueError) as e:
+            raise BoundaryDataError(f'Could not read {os.path.basename(path)}: {e}')
+        for position, feature in enumerate(collection.get('features', [])):
+            properties = feature.get('properties') or {}
+            label = f'{os.path.basename(path)} feature {position}'
+            country = _property(properties, 'country')
+            if country is None:
+                raise BoundaryDataError(f'{label}: no country property')
+            try:
+                rings = _rings(feature.get('geometry'))
+                population = _property(properties, 'population')
+                population = max(float(population), 0.0) if population is not None else 0.0
+            except (BoundaryDataError, TypeError, ValueError, IndexError) as e:
+                raise BoundaryDataError(f'{label}: {e}')
+            if rings:
+                features.append((rings, {
+                    'country': str(country),
+                    'region': None if _property(properties, 'region') is None else str(_property(properties, 'region')),
+                    'iso_a2': _property(properties, 'iso_a2'),
+                    'population': population
+                }))
+    return features
+
+
+class RegionIndex:
+    """Boundary mask and population grid for one boundary set and city catalogue"""
+
+    def __init__(self, features, cities, version='', sources=(), resolution_deg=RESOLUTION_DEG):
+        started = time.perf_counter()
+        self.grid = grid = WorldGrid(resolution_deg)
+        self.version = version
+        self.sources = list(sources)
+        self.regions = [properties for _, properties in features]
+        ncells = grid.rows * grid.cols
+        side_km = math.radians(grid.resolution) * EARTH_RADIUS_KM
+        self.row_area_km2 = side_km * side_km * np.cos(np.radians(-90.0 + (np.arange(grid.rows) + 0.5) * grid.resolution))
+
+        self.codes = np.full(ncells, -1, dtype=np.int32)
+        for code, (rings, _) in enumerate(features):
+            self.codes[rasterize(rings, grid)] = code
+
+        # cities are spread over their areas; cells outside every boundary get a
+        # per-country fallback region (from the first city reaching them) so their
+        # people are still counted
+        c = cities.columns
+        owner, cells = self._disks(c['lat'], c['lng'], np.sqrt(c['area_km2'] / math.pi))
+        outside = np.nonzero(self.codes[cells] < 0)[0]
+        if len(outside):
+            # pairs come in city order, so a cell's first pair is its first city
+            outside_cells, first = np.unique(cells[outside], return_index=True)
+            city_of = owner[outside[first]]
+            country = np.where(c['country'][city_of] == '', 'Unknown', c['country'][city_of]).astype(str)
+            names, country_of = np.unique(country, return_inverse=True)
+            first_city = np.full(len(names), len(cities))
+            np.minimum.at(first_city, country_of, city_of)
+            # fallback regions are numbered in the order their countries' cities come
+            by_first = np.argsort(first_city, kind='stable')
+            rank = np.empty(len(names), dtype=np.int32)
+            rank[by_first] = np.arange(len(names))
+            base = len(self.regions)
+            for name in names[by_first]:
+                self.regions.append({'country': str(name), 'region': None, 'iso_a2': None, 'population': 0.0})
+            self.codes[outside_cells] = base + rank[country_of.ravel()]
+        area = self.row_area_km2[cells // grid.cols]
+        share = c['population'][owner] * area / np.bincount(owner, area, len(cities))[owner]
+        self.population = np.bincount(cells, share, ncells).astype(np.float32)
+
+        # whatever each region's population leaves after its cities is spread evenly over it
+        inside = np.nonzero(self.codes >= 0)[0]
+        codes = self.codes[inside]
+        cell_area = self.row_area_km2[inside // grid.cols]
+        region_area = np.bincount(codes, cell_area, len(self.regions))
+        in_cities = np.bincount(self.codes[cells], share, len(self.regions))
+        totals = np.array([region['population'] for region in self.regions])
+        density = np.maximum(totals - in_cities, 0.0) / np.maximum(region_area, 1e-9)
+        self.population[inside] += (density[codes] * cell_area).astype(np.float32)
+
+        self.city_codes = self.codes[grid.cell_of(c['lat'], c['lng'])] if len(cities) else np.zeros(0, dtype=np.int32)
+        self.region_area_km2 = region_area
+        self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def _disks(self, lat, lng, radius_km):
+        """(city, cell) pairs of the cells whose centres lie within each city's radius, in
+        city order; a city whose disk misses every centre keeps its own cell"""
+        grid = self.grid
+        lat, lng, radius_km = (np.asarray(v, dtype=float) for v in (lat, lng, radius_km))
+        # the same lat/lng bounding boxes as WorldGrid.cells_near, for all cities at once
+        dlat = radius_km / 110.574
+        row_lo = np.maximum(0, ((lat - dlat + 90.0) / grid.resolution).astype(np.int64))
+        row_hi = np.minimum(grid.rows - 1, ((lat + dlat + 90.0) / grid.resolution).astype(np.int64))
+        widest = np.maximum(np.abs(lat) + dlat, 0.0)
+        dlng = radius_km / (111.320 * np.cos(np.radians(np.minimum(widest, 89.9))))
+        wrap = (widest >= 89.9) | (dlng >= 180.0)
+        col_lo = np.where(wrap, 0, np.floor((lng - dlng + 180.0) / grid.resolution)).astype(np.int64)
+        col_hi = np.where(wrap, grid.cols - 1, np.floor((lng + dlng + 180.0) / grid.resolution)).astype(np.int64)
+        width = col_hi - col_lo + 1
+        boxes = np.maximum(row_hi - row_lo + 1, 0) * width
+
+        owners, cells = [], []
+        ends = np.cumsum(boxes)
+        first = 0
+        while first < len(lat):
+            # blocks of cities with at most DISK_BLOCK candidate cells (or a single city)
+            last = max(first + 1, int(np.searchsorted(ends, (ends[first - 1] if first else 0) + DISK_BLOCK, 'right')))
+            city = np.repeat(np.arange(first, last), boxes[first:last])
+            step = np.arange(len(city)) - np.repeat(ends[first:last] - boxes[first:last], boxes[first:last])
+            row, col = np.divmod(step, width[city])
+            cell = (row_lo[city] + row) * grid.cols + (col_lo[city] + col) % grid.cols
+            cell_lat, cell_lng = grid.cell_centres(cell)
+            keep = great_circle_km(lat[city], lng[city], cell_lat, cell_lng) <= radius_km[city]
+            owners.append(city[keep])
+            cells.append(cell[keep])
+            first = last
+        owner = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int64)
+        cell = np.concatenate(cells) if cells else np.zeros(0, dtype=np.int64)
+        empty = np.nonzero(np.bincount(owner, minlength=len(lat)) == 0)[0]
+        if len(empty):
+            owner = np.concatenate([owner, empty])
+            cell = np.concatenate([cell, grid.cell_of(lat[empty], lng[empty])])
+            order = np.argsort(owner, kind='stable')
+            owner, cell = owner[order], cell[order]
+        return owner, cell
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'regions': len(self.regions),
+            'resolution_deg': self.grid.resolution,
+            'sources': [os.path.basename(p) for p in self.sources],
+            'populated_cells': int(np.count_nonzero(self.population)),
+            'build_ms': self.build_ms
+        }
+
+    def exposure(self, lat, lng, radii_km, fatality, cities, max_regions=200):
+        """Population, casualties, ring areas and infrastructure per region and country.
+
+        radii_km maps ring names to radii (the largest, capped at MAX_REACH_KM, bounds the
+        footprint); fatality(r_km) gives the fatality fraction at distances in km;
+        cities is the city catalogue the index was built from.
+        """
+        started = time.perf_counter()
+        grid = self.grid
+        reach = min(max(radii_km.values()), MAX_REACH_KM)
+        cells = grid.cells_near(lat, lng, reach)
+        cells = cells[self.population[cells] > 0]
+        # footprints only a few cells across are sampled below cell size
+        cell_km = math.radians(grid.resolution) * EARTH_RADIUS_KM
+        sub = int(min(MAX_SUBSAMPLE, max(1, math.ceil(4 * cell_km / max(reach, 1e-6)))))
+        offsets = (np.arange(sub) + 0.5) / sub - 0.5
+        cell_lat, cell_lng = grid.cell_centres(cells)
+        point_lat = cell_lat[:, None] + np.repeat(offsets, sub)[None, :] * grid.resolution
+        point_lng = cell_lng[:, None] + np.tile(offsets, sub)[None, :] * grid.resolution
+        distance = great_circle_km(lat, lng, point_lat, point_lng)
+        within = (distance <= reach).mean(axis=1)
+        keep = within > 0
+        cells, distance, within = cells[keep], distance[keep], within[keep]
+
+        population = self.population[cells].astype(float)
+        area = self.row_area_km2[cells // grid.cols]
+        # people at each sample point die at that point's rate; each point stands for an equal share
+        casualties = population * np.minimum(fatality(distance), 1.0).mean(axis=1)
+        codes = self.codes[cells]
+        n = len(self.regions)
+        exposed = np.bincount(codes, population * within, n)
+        killed = np.bincount(codes, casualties, n)
+        footprint = np.bincount(codes, area * within, n)
+        rings = {}
+        for name, radius in radii_km.items():
+            share = (distance <= radius).mean(axis=1)
+            rings[name] = (np.bincount(codes, population * share, n), np.bincount(codes, area * share, n))
+
+        infrastructure = {key: np.zeros(n) for key in ('cities', 'hospitals', 'shelters', 'evacuation_routes')}
+        city_names = [[] for _ in range(n)]
+        rows = cities.within_km(lat, lng, reach)
+        if len(rows):
+            c = cities.columns
+            d = great_circle_km(lat, lng, c['lat'][rows], c['lng'][rows])
+            rows = rows[fatality(d) > 0]
+            for row in rows:
+                code = self.city_codes[row]
+                infrastructure['cities'][code] += 1
+                for key in ('hospitals', 'shelters', 'evacuation_routes'):
+                    infrastructure[key][code] += c[key][row]
+                city_names[code].append(str(cities.ids[row]))
+
+        def entry(indices):
+            return {
+                'population_exposed': int(round(exposed[indices].sum())),
+                'casualties': int(round(killed[indices].sum())),
+                'area_km2': round(float(footprint[indices].sum()), 1),
+                'rings': {name: {'population': int(round(pop[indices].sum())),
+                                 'area_km2': round(float(ring_area[indices].sum()), 1)}
+                          for name, (pop, ring_area) in rings.items()},
+                'infrastructure': {key: int(values[indices].sum()) for key, values in infrastructure.items()}
+            }
+
+        touched = np.nonzero((exposed > 0) | (infrastructure['cities'] > 0))[0]
+        touched = touched[np.argsort(-killed[touched], kind='stable')]
+        regions = []
+        for code in touched[:max_regions]:
+            region = self.regions[code]
+            regions.append(dict(entry([code]), country=region['country'], region=region['region'],
+                                iso_a2=region['iso_a2'], city_ids=city_names[code]))
+        countries = {}
+        for code in touched:
+            countries.setdefault(self.regions[code]['country'], []).append(code)
+        country_rows = [dict(entry(codes), country=country, regions=len(codes)) for country, codes in countries.items()]
+
+        return {
+            'resolution_deg': grid.resolution,
+            'reach_km': round(reach, 2),
+            'truncated': max(radii_km.values()) > MAX_REACH_KM,
+            'samples_per_cell': sub * sub,
+            'cells': int(len(cells)),
+            'totals': entry(touched),
+            'countries': sorted(country_rows, key=lambda row: -row['casualties']),
+            'regions': regions,
+            'regions_affected': int(len(touched)),
+            'compute_ms': round((time.perf_counter() - started) * 1000, 1),
+            'index': self.version
+        }
+
+
+def build_index(cities, data_dir=None):
+    files = source_files(data_dir)
+    features = load_features(files)
+    version = f'{_signature(files) if files else "none"}-{cities.version}'
+    return RegionIndex(features, cities, version, files)
+
+
+_current = None
+_checked_at = 0.0
+_build_lock = threading.Lock()
+
+
+def current(cities):
+    """The index for the given city catalogue, rebuilt when it or the boundary files change
+    (re-checked at most every RELOAD_CHECK_SECONDS)"""
+    global _current, _checked_at
+    index = _current
+    stale = index is None or not index.version.endswith(f'-{cities.version}')
+    if not stale and time.monotonic() - _checked_at <= RELOAD_CHECK_SECONDS:
+        return index
+    with _build_lock:
+        _checked_at = time.monotonic()
+        files = source_files()
+        version = f'{_signature(files) if files else "none"}-{cities.version}'
+        if _current is not None and _current.version == version:
+            return _current
+        try:
+            index = build_index(cities)
+        except BoundaryDataError as e:
+            # an index built for another city catalogue cannot stand in (its rows differ)
+            if _current is None or not _current.version.endswith(f'-{cities.version}'):
+                raise
+            logger.error(f"Boundary reload failed, keeping {_current.version}: {e}")
+            return _current
+        _current = index
+        logger.info(f"Built region index {index.version}: {len(index.regions)} regions in {index.build_ms} ms")
+        return index
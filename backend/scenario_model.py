@@ -0,0 +1,313 @@
+"""
+Declarative impact-scenario models
+Loads damage models (zones, coefficients and formulas) from JSON/YAML files and
+compiles each one into a vectorized evaluation plan that is hot-reloaded on change.
+"""
+
+import ast
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+try:
+    import yaml
+except ImportError:  # YAML models are optional; JSON always works
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+MODEL_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+# Functions and constants available inside formulas. Everything maps to a numpy
+# ufunc so a plan evaluates scalars and whole arrays of scenarios the same way.
+FORMULA_FUNCTIONS = {
+    'min': np.minimum,
+    'max': np.maximum,
+    'clip': np.clip,
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'where': np.where,
+    'pi': np.pi,
+    'e': np.e,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load,
+    ast.Constant, ast.Compare,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.USub, ast.UAdd,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+
+
+class ScenarioModelError(ValueError):
+    """Raised when a scenario model is invalid or cannot be evaluated"""
+
+
+def _parse_formula(name, expression):
+    """Parse and validate a single formula, returning (tree, referenced names)"""
+    if isinstance(expression, (int, float)):
+        expression = repr(float(expression))
+    try:
+        tree = ast.parse(str(expression), mode='eval')
+    except SyntaxError as e:
+        raise ScenarioModelError(f"Formula '{name}' is not valid: {e.msg}")
+
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ScenarioModelError(f"Formula '{name}' uses unsupported syntax: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ScenarioModelError(f"Formula '{name}' may only contain numeric constants")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in FORMULA_FUNCTIONS):
+            raise ScenarioModelError(f"Formula '{name}' calls an unknown function")
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+    return tree, names
+
+
+class EvaluationPlan:
+    """A set of formulas compiled into one Python function over numpy values"""
+
+    def __init__(self, label, formulas, coefficients, defaults=None):
+        self.label = label
+        self.outputs = list(formulas)
+        self.defaults = dict(defaults or {})
+
+        parsed = {}
+        for name, expression in formulas.items():
+            if not name.isidentifier() or name in coefficients or name in FORMULA_FUNCTIONS:
+                raise ScenarioModelError(f"Formula name '{name}' in {label} is not a valid, unused identifier")
+            parsed[name] = _parse_formula(name, expression)
+
+        known = set(FORMULA_FUNCTIONS) | set(coefficients)
+        self.inputs = sorted({n for _, names in parsed.values() for n in names} - known - set(parsed))
+        order = self._dependency_order(parsed)
+
+        lines = ["def _plan(env):"]
+        for name in self.inputs:
+            lines.append(f"    {name} = env[{name!r}]")
+        for name in order:
+            lines.append(f"    {name} = {ast.unparse(parsed[name][0])}")
+        lines.append("    return {" + ", ".join(f"{n!r}: {n}" for n in self.outputs) + "}")
+
+        namespace = dict(FORMULA_FUNCTIONS)
+        namespace.update({k: float(v) for k, v in coefficients.items()})
+        exec(compile("\n".join(lines), f"<scenario plan {label}>", 'exec'), namespace)
+        self._fn = namespace['_plan']
+
+    def _dependency_order(self, parsed):
+        """Topologically sort formulas so config order does not matter"""
+        order, state = [], {}
+
+        def visit(name, chain):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ScenarioModelError(f"Circular formula dependency in {self.label}: {' -> '.join(chain + [name])}")
+            state[name] = 'visiting'
+            for dep in sorted(parsed[name][1]):
+                if dep in parsed:
+                    visit(dep, chain + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in parsed:
+            visit(name, [])
+        return order
+
+    def evaluate(self, env):
+        """Evaluate every formula; values in env may be scalars or numpy arrays"""
+        merged = dict(self.defaults)
+        merged.update({k: v for k, v in env.items() if v is not None})
+        missing = [name for name in self.inputs if name not in merged]
+        if missing:
+            raise ScenarioModelError(f"Missing inputs for {self.label}: {', '.join(missing)}")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._fn(merged)
+
+
+def to_python(value):
+    """Convert numpy results into JSON-serialisable Python values"""
+    if isinstance(value, dict):
+        return {k: to_python(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_python(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.item() if value.ndim == 0 else value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ScenarioModel:
+    """A compiled damage model: impact, risk, survival-zone and aftermath plans"""
+
+    def __init__(self, config, source=None):
+        self.name = config.get('name') or os.path.splitext(os.path.basename(source or 'default'))[0]
+        self.version = config.get('version', 1)
+        self.description = config.get('description', '')
+        self.source = source
+        # changes whenever the definition does; used to key memoized results
+        self.fingerprint = hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        self.coefficients = dict(config.get('coefficients', {}))
+        defaults = config.get('defaults', {})
+
+        for key, value in self.coefficients.items():
+            if not key.isidentifier() or not isinstance(value, (int, float)):
+                raise ScenarioModelError(f"Coefficient '{key}' must be a numeric value with an identifier name")
+
+        self.impact = EvaluationPlan(f"{self.name}.impact", config.get('impact', {}).get('formulas', {}),
+                                     self.coefficients, defaults)
+        self.risk = EvaluationPlan(f"{self.name}.risk", config.get('risk', {}).get('formulas', {}),
+                                   self.coefficients, defaults)
+
+        self.zones = [dict(z) for z in config.get('survival_zones', [])]
+        self.zone_plan = EvaluationPlan(f"{self.name}.survival_zones",
+                                        {f"zone_{i}": z['radius'] for i, z in enumerate(self.zones)},
+                                        self.coefficients, defaults)
+
+        self.layers = [dict(l) for l in config.get('aftermath_layers', [])]
+        layer_formulas = {}
+        for i, layer in enumerate(self.layers):
+            layer_formulas[f"layer_{i}"] = layer['intensity']
+            # optional: a computed duration alongside the descriptive one
+            if 'duration_years' in layer:
+                layer_formulas[f"layer_{i}_duration_years"] = layer['duration_years']
+        self.layer_plan = EvaluationPlan(f"{self.name}.aftermath_layers", layer_formulas,
+                                         self.coefficients, defaults)
+
+    def evaluate_impact(self, env):
+        return self.impact.evaluate(env)
+
+    def evaluate_risk(self, env):
+        return self.risk.evaluate(env)
+
+    def survival_zones(self, env):
+        """Zone definitions with radii evaluated for a single scenario"""
+        radii = self.zone_plan.evaluate(env)
+        zones = []
+        for i, zone in enumerate(self.zones):
+            entry = {k: v for k, v in zone.items() if k != 'radius'}
+            entry['radius'] = to_python(radii[f"zone_{i}"])
+            zones.append(entry)
+        return zones
+
+    def aftermath_layers(self, env):
+        """Layer definitions with intensities evaluated for a single scenario"""
+        intensities = self.layer_plan.evaluate(env)
+        layers = []
+        for i, layer in enumerate(self.layers):
+            entry = {k: v for k, v in layer.items() if k not in ('intensity', 'duration_years')}
+            entry['intensity'] = to_python(intensities[f"layer_{i}"])
+            if f"layer_{i}_duration_years" in intensities:
+                entry['duration_years'] = to_python(intensities[f"layer_{i}_duration_years"])
+            layers.append(entry)
+        return layers
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'description': self.description,
+            'source': os.path.basename(self.source) if self.source else None,
+            'coefficients': self.coefficients,
+            'impact_outputs': self.impact.outputs,
+            'risk_outputs': self.risk.outputs,
+            'survival_zones': [z['id'] for z in self.zones],
+            'aftermath_layers': [l['id'] for l in self.layers]
+        }
+
+
+def load_model_file(path):
+    """Read a model file (JSON, or YAML when PyYAML is installed) and compile it"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ScenarioModelError(f"PyYAML is required to load {os.path.basename(path)}")
+            config = yaml.safe_load(f)
+        else:
+            config = json.load(f)
+    if not isinstance(config, dict):
+        raise ScenarioModelError(f"{os.path.basename(path)} must contain a mapping")
+    return ScenarioModel(config, source=path)
+
+
+class ScenarioModelRegistry:
+    """Directory of scenario models, recompiled when their files change"""
+
+    def __init__(self, directory, check_interval=2.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._models = {}
+        self._mtimes = {}
+        self._errors = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload(force=True)
+
+    def reload(self, force=False):
+        """Compile new or modified model files and drop deleted ones"""
+        with self._lock:
+            try:
+                files = sorted(f for f in os.listdir(self.directory) if f.endswith(MODEL_EXTENSIONS))
+            except FileNotFoundError:
+                logger.error(f"Scenario model directory not found: {self.directory}")
+                files = []
+
+            models = dict(self._models)
+            seen = set()
+            for filename in files:
+                path = os.path.join(self.directory, filename)
+                seen.add(path)
+                mtime = os.stat(path).st_mtime
+                if not force and self._mtimes.get(path) == mtime:
+                    continue
+                self._mtimes[path] = mtime
+                try:
+                    compiled = load_model_file(path)
+                except Exception as e:
+                    # keep serving the previous version of a model that fails to compile
+                    logger.error(f"Failed to compile scenario model {filename}: {e}")
+                    self._errors[filename] = str(e)
+                    continue
+                self._errors.pop(filename, None)
+                for name, existing in list(models.items()):
+                    if existing.source == path and name != compiled.name:
+                        del models[name]
+                models[compiled.name] = compiled
+                logger.info(f"Compiled scenario model '{compiled.name}' from {filename}")
+
+            for name, existing in list(models.items()):
+                if existing.source not in seen:
+                    del models[name]
+                    self._mtimes.pop(existing.source, None)
+
+            self._models = models  # atomic swap for readers
+            self._last_check = time.time()
+
+    def _maybe_reload(self):
+        if time.time() - self._last_check >= self.check_interval:
+            self.reload()
+
+    def get(self, name):
+        self._maybe_reload()
+        compiled = self._models.get(name)
+        if compiled is None:
+            raise ScenarioModelError(f"Unknown scenario model '{name}'. Available: {', '.join(sorted(self._models))}")
+        return compiled
+
+    def names(self):
+        self._maybe_reload()
+        return sorted(self._models)
+
+    def errors(self):
+        return dict(self._errors)
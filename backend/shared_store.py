@@ -0,0 +1,298 @@
+"""
+Cross-process result store
+An mmap'd open-addressing hash table shared by every gunicorn worker on the host.
+Readers never lock: each slot is guarded by a sequence counter and every entry
+carries a CRC, so a torn or recycled read is detected and treated as a miss.
+Writers serialise on a file lock, append the entry to a bump-allocated arena
+(cleared wholesale when full) and then publish it by rewriting the slot.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import stat
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process store
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'METEOR01'
+HEADER = struct.Struct('<8sIIQQQQ')      # magic, nslots, reserved, arena_offset, arena_size, head, generation
+HEADER_SIZE = 64
+SLOT = struct.Struct('<QQQII')           # seq, key_hash, offset, length, crc
+ENTRY = struct.Struct('<Id')             # key length, expires_at
+HEAD_OFFSET = 32
+GENERATION_OFFSET = 40
+MAX_PROBES = 32
+READ_RETRIES = 8
+LOCAL_MAX_ENTRIES = 4096
+LOCAL_SWEEP_SECONDS = 60.0
+
+MISSING = object()
+
+
+def _key_hash(key):
+    # Python's hash() is salted per process, so use a stable digest; 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') or 1
+
+
+def _check_private(st, path, mode_bits):
+    """Values are unpickled, so anything another user could have written is refused"""
+    if st.st_uid != os.geteuid() or st.st_mode & 0o077 or stat.S_IFMT(st.st_mode) != mode_bits:
+        raise PermissionError(f"{path} must be owned by uid {os.geteuid()} and private to it "
+                              f"(found uid {st.st_uid}, mode {stat.filemode(st.st_mode)})")
+
+
+def private_dir(base):
+    """This user's 0700 directory under base, created if missing"""
+    path = os.path.join(base, f'meteorsim-{os.geteuid()}')
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    _check_private(os.lstat(path), path, stat.S_IFDIR)
+    return path
+
+
+class SharedResultStore:
+    """Pickled values keyed by string, shared across processes through one mmap'd file"""
+
+    def __init__(self, path, size_mb=64, nslots=16384):
+        self.path = path
+        self._local_lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            # O_CREAT leaves an existing file's owner and mode alone
+            _check_private(os.fstat(self._fd), path, stat.S_IFREG)
+        except OSError:
+            os.close(self._fd)
+            raise
+        total = max(int(size_mb * 1024 * 1024), HEADER_SIZE + nslots * SLOT.size + 1024 * 1024)
+
+        with self._write_lock():
+            existing = os.fstat(self._fd).st_size
+            if existing >= HEADER_SIZE:
+                header = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+                if header[0] == MAGIC:
+                    total, nslots = existing, header[1]
+                else:
+                    existing = 0
+            if existing < HEADER_SIZE:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, total)
+            self._mm = mmap.mmap(self._fd, total)
+            if existing < HEADER_SIZE:
+                arena_offset = HEADER_SIZE + nslots * SLOT.size
+                HEADER.pack_into(self._mm, 0, MAGIC, nslots, 0, arena_offset, total - arena_offset, 0, 0)
+
+        _, self.nslots, _, self.arena_offset, self.arena_size, _, _ = HEADER.unpack_from(self._mm, 0)
+
+    # -- locking -------------------------------------------------------------
+
+    class _Lock:
+        def __init__(self, store):
+            self.store = store
+
+        def __enter__(self):
+            self.store._local_lock.acquire()
+            fcntl.flock(self.store._fd, fcntl.LOCK_EX)
+
+        def __exit__(self, *exc):
+            fcntl.flock(self.store._fd, fcntl.LOCK_UN)
+            self.store._local_lock.release()
+
+    def _write_lock(self):
+        return self._Lock(self)
+
+    # -- slots -----------------------------------------------------------------
+
+    def _slot_offset(self, index):
+        return HEADER_SIZE + index * SLOT.size
+
+    def _read_slot(self, index):
+        """Consistent snapshot of a slot, or None if a writer kept it busy"""
+        offset = self._slot_offset(index)
+        for _ in range(READ_RETRIES):
+            seq, key_hash, entry_offset, length, crc = SLOT.unpack_from(self._mm, offset)
+            if seq & 1:
+                continue
+            if struct.unpack_from('<Q', self._mm, offset)[0] == seq:
+                return key_hash, entry_offset, length, crc
+        return None
+
+    def _publish_slot(self, index, key_hash, entry_offset, length, crc):
+        offset = self._slot_offset(index)
+        seq = struct.unpack_from('<Q', self._mm, offset)[0]
+        struct.pack_into('<Q', self._mm, offset, seq + 1)               # odd: readers back off
+        SLOT.pack_into(self._mm, offset, seq + 1, key_hash, entry_offset, length, crc)
+        struct.pack_into('<Q', self._mm, offset, seq + 2)               # even: published
+
+    def _reset(self):
+        """Drop every entry (arena full or table crowded); bumps the generation"""
+        for index in range(self.nslots):
+            if SLOT.unpack_from(self._mm, self._slot_offset(index))[1]:
+                self._publish_slot(index, 0, 0, 0, 0)
+        generation = struct.unpack_from('<Q', self._mm, GENERATION_OFFSET)[0]
+        struct.pack_into('<QQ', self._mm, HEAD_OFFSET, 0, generation + 1)
+
+    # -- public API ------------------------------------------------------------
+
+    def get(self, key, default=None):
+        key_bytes = key.encode('utf-8')
+        key_hash = _key_hash(key_bytes)
+        for probe in range(MAX_PROBES):
+            slot = self._read_slot((key_hash + probe) % self.nslots)
+            if slot is None:
+                return default
+            slot_hash, entry_offset, length, crc = slot
+            if slot_hash == 0:
+                return default
+            if slot_hash != key_hash:
+                continue
+            start = self.arena_offset + entry_offset
+            blob = self._mm[start:start + length]
+            if len(blob) != length or zlib.crc32(blob) != crc:
+                return default  # entry was recycled while we were reading it
+            key_len, expires_at = ENTRY.unpack_from(blob, 0)
+            if blob[ENTRY.size:ENTRY.size + key_len] != key_bytes:
+                continue
+            if expires_at and expires_at < time.time():
+                return default
+            return pickle.loads(blob[ENTRY.size + key_len:])
+        return default
+
+    def set(self, key, value, ttl_seconds=None):
+        key_bytes = key.encode('utf-8')
+        key_hash = _key_hash(key_bytes)
+        expires_at = time.time() + ttl_seconds if ttl_seconds else 0.0
+        blob = ENTRY.pack(len(key_bytes), expires_at) + key_bytes + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.arena_size // 4:
+            logger.warning(f"Shared store entry {key} too large ({len(blob)} bytes); not stored")
+            return False
+        crc = zlib.crc32(blob)
+
+        with self._write_lock():
+            for attempt in range(2):
+                head = struct.unpack_from('<Q', self._mm, HEAD_OFFSET)[0]
+                if head + len(blob) > self.arena_size:
+                    self._reset()
+                    head = 0
+                index = self._find_slot(key_hash, key_bytes)
+                if index is None:
+                    self._reset()
+                    continue
+                self._mm[self.arena_offset + head:self.arena_offset + head + len(blob)] = blob
+                struct.pack_into('<Q', self._mm, HEAD_OFFSET, (head + len(blob) + 7) & ~7)
+                self._publish_slot(index, key_hash, head, len(blob), crc)
+                return True
+        return False
+
+    def _find_slot(self, key_hash, key_bytes):
+        """Slot holding this key, or the first reusable one (empty, expired or stale)"""
+        now = time.time()
+        reusable = None
+        for probe in range(MAX_PROBES):
+            index = (key_hash + probe) % self.nslots
+            slot_hash, entry_offset, length, crc = SLOT.unpack_from(self._mm, self._slot_offset(index))[1:]
+            if slot_hash == 0:
+                return reusable if reusable is not None else index
+            start = self.arena_offset + entry_offset
+            blob = self._mm[start:start + length]
+            valid = len(blob) == length and zlib.crc32(blob) == crc
+            if valid and slot_hash == key_hash:
+                key_len = ENTRY.unpack_from(blob, 0)[0]
+                if blob[ENTRY.size:ENTRY.size + key_len] == key_bytes:
+                    return index
+            if reusable is None and (not valid or (0 < ENTRY.unpack_from(blob, 0)[1] < now)):
+                reusable = index
+        return reusable
+
+    def get_or_compute(self, key, ttl_seconds, compute_fn):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = compute_fn()
+            self.set(key, value, ttl_seconds)
+        return value
+
+    def stats(self):
+        _, nslots, _, _, arena_size, head, generation = HEADER.unpack_from(self._mm, 0)
+        used = sum(1 for i in range(nslots) if SLOT.unpack_from(self._mm, self._slot_offset(i))[1])
+        return {
+            'backend': 'shared-memory',
+            'path': self.path,
+            'slots_used': used,
+            'slots_total': nslots,
+            'arena_used_bytes': head,
+            'arena_size_bytes': arena_size,
+            'generation': generation
+        }
+
+
+class LocalResultStore:
+    """Per-process fallback with the same interface (no fcntl, or store disabled). Writes
+    sweep out expired entries and keep at most max_entries, dropping the oldest."""
+
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self._swept_at = time.monotonic()
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at and expires_at < time.time():
+            return default
+        return value
+
+    def set(self, key, value, ttl_seconds=None):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + ttl_seconds if ttl_seconds else 0.0, value)
+            if len(self._entries) > self.max_entries or time.monotonic() - self._swept_at > LOCAL_SWEEP_SECONDS:
+                self._evict()
+        return True
+
+    def _evict(self):
+        now = time.time()
+        self._swept_at = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at and expires_at < now]:
+            del self._entries[key]
+        # insertion order is write order, so the first keys are the oldest
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def get_or_compute(self, key, ttl_seconds, compute_fn):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = compute_fn()
+            self.set(key, value, ttl_seconds)
+        return value
+
+    def stats(self):
+        return {'backend': 'process-local', 'entries': len(self._entries)}
+
+
+def open_result_store():
+    """Shared store configured from the environment, or a local one when unavailable"""
+    if fcntl is None or os.getenv('SHARED_STORE', '1') == '0':
+        return LocalResultStore()
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    try:
+        path = os.getenv('SHARED_STORE_PATH') or os.path.join(private_dir(base), 'results')
+        return SharedResultStore(path, size_mb=float(os.getenv('SHARED_STORE_MB', '64')))
+    except OSError as e:
+        logger.error(f"Shared result store unavailable ({e}); using a per-process cache")
+        return LocalResultStore()
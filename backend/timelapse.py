@@ -0,0 +1,107 @@
+"""
+Time-lapse frame generator
+Precomputes time-stepped impact frames (fireball growth, shock front, thermal
+fluence, dust cloud) as float32 arrays so clients can play them back at 60 fps
+without running any physics themselves.
+"""
+
+import base64
+import math
+
+import numpy as np
+
+MEGATON_J = 4.184e15
+AIR_DENSITY = 1.225              # kg/m³ at sea level
+SOUND_SPEED = 343.0              # m/s
+AMBIENT_PRESSURE_KPA = 101.325
+SEDOV_XI = 1.03                  # Sedov-Taylor constant for gamma = 1.4
+LUMINOUS_EFFICIENCY = 3e-3       # fraction of energy radiated as heat (Collins et al. 2005)
+THERMAL_PULSE_SPEED = 2000.0     # m/s, sets the thermal pulse duration from fireball size
+
+FRAME_FIELDS = (
+    'time_s',
+    'fireball_radius_km',
+    'shock_radius_km',
+    'overpressure_kpa',
+    'thermal_fluence_kj_m2',
+    'dust_radius_km',
+    'dust_height_km',
+)
+
+TIME_SCALES = ('log', 'linear')
+MAX_FRAMES = 36000
+MAX_OVERPRESSURE_KPA = 1e6       # clamp for the singular point at the burst centre
+
+
+def _shock_radius_m(t, energy_j):
+    """Blast front radius: Sedov-Taylor growth, then an acoustic wave at sound speed"""
+    # Sedov front speed is 0.4 R/t; it becomes acoustic once that drops to SOUND_SPEED
+    t_acoustic = (0.4 * SEDOV_XI / SOUND_SPEED) ** (5.0 / 3.0) * (energy_j / AIR_DENSITY) ** (1.0 / 3.0)
+    r_acoustic = SEDOV_XI * (energy_j * t_acoustic ** 2 / AIR_DENSITY) ** 0.2
+    sedov = SEDOV_XI * (energy_j * np.minimum(t, t_acoustic) ** 2 / AIR_DENSITY) ** 0.2
+    return np.where(t <= t_acoustic, sedov, r_acoustic + SOUND_SPEED * (t - t_acoustic))
+
+
+def peak_overpressure_kpa(r_m, energy_j):
+    """Peak overpressure at the shock front (Kinney-Graham fit on TNT-scaled distance)"""
+    tnt_kg = energy_j / 4.184e6
+    z = np.maximum(r_m, 1.0) / tnt_kg ** (1.0 / 3.0)
+    ratio = 808.0 * (1 + (z / 4.5) ** 2) / (
+        np.sqrt(1 + (z / 0.048) ** 2) * np.sqrt(1 + (z / 0.32) ** 2) * np.sqrt(1 + (z / 1.35) ** 2))
+    return np.minimum(ratio * AMBIENT_PRESSURE_KPA, MAX_OVERPRESSURE_KPA)
+
+
+def _frame_times(t_end, frame_count, time_scale):
+    if time_scale == 'linear':
+        return np.linspace(0.0, t_end, frame_count)
+    # log spacing keeps the sub-second fireball visible next to minutes of blast/dust spread
+    t_start = max(t_end * 1e-5, 1e-3)
+    return np.concatenate(([0.0], np.geomspace(t_start, t_end, frame_count - 1)))
+
+
+def frame_table(diameter_m, velocity_km_s, density_kg_m3=2600.0, frame_count=600, time_scale='log'):
+    """Float32 matrix of shape (frame_count, len(FRAME_FIELDS)) for one scenario"""
+    radius = diameter_m / 2.0
+    mass_kg = (4.0 / 3.0) * math.pi * radius ** 3 * density_kg_m3
+    energy_j = 0.5 * mass_kg * (velocity_km_s * 1000.0) ** 2
+    energy_mt = energy_j / MEGATON_J
+
+    # Fireball stops growing at its maximum radius (Collins et al.: R_f = 0.002 E^(1/3) m)
+    fireball_max_m = 0.002 * energy_j ** (1.0 / 3.0)
+    thermal_pulse_s = fireball_max_m / THERMAL_PULSE_SPEED
+    thermal_reference_m = 1900.0 * energy_mt ** 0.41  # same thermal radius as the simulate endpoint
+
+    # Dust plume: buoyant rise to a height ~E^(1/4), spreading laterally as a gravity current
+    dust_height_max_km = min(50.0, 3.0 * energy_mt ** 0.25)
+    dust_rise_s = 60.0 + 30.0 * energy_mt ** 0.2
+    dust_spread_km_s = 0.02 * energy_mt ** 0.2
+
+    # Play until the blast has crossed the outermost survival ring (2.5 x shockwave radius)
+    outer_radius_m = 2.5 * 4600.0 * energy_mt ** 0.33
+    t_end = float(np.max([10.0, (outer_radius_m / SOUND_SPEED), 3 * dust_rise_s]))
+
+    t = _frame_times(t_end, frame_count, time_scale)
+    shock_m = _shock_radius_m(t, energy_j)
+    fireball_m = np.minimum(shock_m, fireball_max_m)
+    overpressure = peak_overpressure_kpa(shock_m, energy_j)
+    released = 1.0 - np.exp(-t / thermal_pulse_s)
+    fluence = LUMINOUS_EFFICIENCY * energy_j * released / (2 * math.pi * thermal_reference_m ** 2) / 1000.0
+    dust_height = dust_height_max_km * (1.0 - np.exp(-t / dust_rise_s))
+    dust_radius = fireball_m / 1000.0 + dust_spread_km_s * t * (dust_height / dust_height_max_km)
+
+    return np.column_stack([
+        t, fireball_m / 1000.0, shock_m / 1000.0, overpressure, fluence, dust_radius, dust_height
+    ]).astype('<f4')
+
+
+def delta_encode(table, decimals=3):
+    """Per-field delta encoding of fixed-point values (int32, base64) for JSON clients"""
+    scale = 10 ** decimals
+    fixed = np.round(table.astype(np.float64) * scale).astype(np.int64)
+    if np.abs(fixed).max(initial=0) >= 2 ** 31:
+        raise ValueError(f"Frame values too large for {decimals}-decimal delta encoding")
+    deltas = np.diff(fixed, axis=0, prepend=np.zeros((1, fixed.shape[1]), dtype=np.int64))
+    return {
+        name: base64.b64encode(deltas[:, i].astype('<i4').tobytes()).decode('ascii')
+        for i, name in enumerate(FRAME_FIELDS)
+    }, scale
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Physics validation harness
+Runs every physics path over the historical impact dataset and reports error
+against observed crater size and energy next to per-call throughput, so a
+faster approximation can be judged on both speed and fidelity.
+
+Usage:
+    python validate_physics.py                      # table report
+    python validate_physics.py --json               # machine-readable report
+    python validate_physics.py --save-baseline b.json
+    python validate_physics.py --baseline b.json    # exit 1 on accuracy/speed regression
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'validation', 'historical_impacts.json')
+
+
+def load_events(path=DATASET_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['events']
+
+
+def _detailed_physics(event):
+    from enhanced_app import calculate_detailed_impact_physics
+    # this path has a fixed 2600 kg/m³ density
+    physics = calculate_detailed_impact_physics(event['diameter_m'], event['velocity_km_s'])
+    return {'energy_mt': physics['kinetic_energy_mt'], 'crater_km': physics['crater_diameter_km']}
+
+
+def _impact_metrics(event):
+    from enhanced_app import compute_impact_metrics, estimate_transient_crater_km_from_megatons
+    metrics = compute_impact_metrics(event['diameter_m'], event['velocity_km_s'], event['density_kg_m3'])
+    return {
+        'energy_mt': metrics['megaton_tnt'],
+        'crater_km': estimate_transient_crater_km_from_megatons(metrics['megaton_tnt'])
+    }
+
+
+# name -> callable(event) returning {'energy_mt', 'crater_km'}; add new physics paths here
+PHYSICS_PATHS = {
+    'calculate_detailed_impact_physics': _detailed_physics,
+    'compute_impact_metrics': _impact_metrics,
+}
+
+
+def log_error(predicted, observed):
+    """|log10(predicted / observed)|: 0.3 is a factor of 2, 1.0 an order of magnitude"""
+    if observed is None or predicted is None or predicted <= 0 or observed <= 0:
+        return None
+    return abs(math.log10(predicted / observed))
+
+
+def measure_throughput(fn, events, min_seconds=0.2):
+    """Calls per second of fn over the dataset (repeated until min_seconds elapsed)"""
+    calls, start = 0, time.perf_counter()
+    while True:
+        for event in events:
+            fn(event)
+        calls += len(events)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def _summary(errors):
+    values = [e for e in errors if e is not None]
+    if not values:
+        return {'mean_log_error': None, 'max_log_error': None, 'events': 0}
+    return {'mean_log_error': sum(values) / len(values), 'max_log_error': max(values), 'events': len(values)}
+
+
+def run_validation(events=None, paths=None, min_seconds=0.2):
+    events = events if events is not None else load_events()
+    paths = paths or PHYSICS_PATHS
+    report = {}
+    for name, fn in paths.items():
+        rows, energy_errors, crater_errors = [], [], []
+        for event in events:
+            predicted = fn(event)
+            observed = event['observed']
+            energy_error = log_error(predicted['energy_mt'], observed.get('energy_mt'))
+            crater_error = log_error(predicted['crater_km'], observed.get('crater_km'))
+            energy_errors.append(energy_error)
+            crater_errors.append(crater_error)
+            rows.append({
+                'event': event['id'],
+                'predicted_energy_mt': predicted['energy_mt'],
+                'observed_energy_mt': observed.get('energy_mt'),
+                'energy_log_error': energy_error,
+                'predicted_crater_km': predicted['crater_km'],
+                'observed_crater_km': observed.get('crater_km'),
+                'crater_log_error': crater_error,
+                # airbursts leave no crater; a path that predicts one is flagged, not scored
+                'spurious_crater': observed.get('crater_km') is None and bool(predicted['crater_km'])
+            })
+        calls_per_second = measure_throughput(fn, events, min_seconds)
+        report[name] = {
+            'energy': _summary(energy_errors),
+            'crater': _summary(crater_errors),
+            'calls_per_second': calls_per_second,
+            'us_per_call': 1e6 / calls_per_second,
+            'events': rows
+        }
+    return report
+
+
+def compare_to_baseline(report, baseline, error_tolerance=0.05, speed_tolerance=0.5):
+    """List regressions: log error up by more than error_tolerance, or throughput below speed_tolerance x baseline"""
+    problems = []
+    for name, result in report.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for quantity in ('energy', 'crater'):
+            now, before = result[quantity]['mean_log_error'], base[quantity]['mean_log_error']
+            if now is not None and before is not None and now > before + error_tolerance:
+                problems.append(f"{name}: mean {quantity} log error {now:.3f} > baseline {before:.3f}")
+        if result['calls_per_second'] < base['calls_per_second'] * speed_tolerance:
+            problems.append(f"{name}: {result['calls_per_second']:.0f} calls/s < {speed_tolerance:.0%} of baseline "
+                            f"{base['calls_per_second']:.0f}")
+    return problems
+
+
+def _fmt(value, spec='.3f'):
+    if value is None:
+        width = spec.split('.')[0]
+        return '-'.rjust(int(width) if width.isdigit() else 1)
+    return format(value, spec)
+
+
+def print_report(report):
+    for name, result in report.items():
+        print(f"\n{name}  ({result['calls_per_second']:,.0f} calls/s, {result['us_per_call']:.2f} µs/call)")
+        print(f"  {'event':<20} {'E pred Mt':>11} {'E obs Mt':>11} {'E err':>7} {'crater pred':>12} {'crater obs':>11} {'D err':>7}")
+        for row in result['events']:
+            flag = '  (spurious crater)' if row['spurious_crater'] else ''
+            print(f"  {row['event']:<20} {_fmt(row['predicted_energy_mt'], '11.3g')} {_fmt(row['observed_energy_mt'], '11.3g')} "
+                  f"{_fmt(row['energy_log_error'], '7.2f')} {_fmt(row['predicted_crater_km'], '12.3g')} "
+                  f"{_fmt(row['observed_crater_km'], '11.3g')} {_fmt(row['crater_log_error'], '7.2f')}{flag}")
+        print(f"  mean |log10 error|: energy {_fmt(result['energy']['mean_log_error'])}, "
+              f"crater {_fmt(result['crater']['mean_log_error'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate impact physics against historical events')
+    parser.add_argument('--dataset', default=DATASET_PATH)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--min-seconds', type=float, default=0.2, help='timing budget per physics path')
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--baseline', metavar='PATH', help='fail if accuracy or speed regressed against this report')
+    parser.add_argument('--error-tolerance', type=float, default=0.05)
+    parser.add_argument('--speed-tolerance', type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    report = run_validation(load_events(args.dataset), min_seconds=args.min_seconds)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            problems = compare_to_baseline(report, json.load(f), args.error_tolerance, args.speed_tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
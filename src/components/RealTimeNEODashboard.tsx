@@ -49,11 +49,52 @@ const RealTimeNEODashboard: React.FC<RealTimeNEODashboardProps> = ({
 
   useEffect(() => {
     checkConnection();
-    loadData();
-    
-    // Set up periodic updates every 5 minutes
-    const interval = setInterval(loadData, 5 * 60 * 1000);
-    return () => clearInterval(interval);
+    loadStats();
+
+    // Hazardous objects are pushed by the backend; only the changes arrive after the first snapshot
+    const live = new Map<string, HazardAsteroid>();
+    let streaming = false;
+    let pollTimer: ReturnType<typeof setInterval> | null = null;
+
+    const publish = () => {
+      setHazardousAsteroids(
+        Array.from(live.values()).sort((a, b) => b.risk_score - a.risk_score).slice(0, 10)
+      );
+      setLastUpdate(new Date());
+      setIsLoading(false);
+    };
+
+    const unsubscribe = nasaService.subscribeHazardousAsteroids<HazardAsteroid>(
+      (message) => {
+        streaming = true;
+        if (message.type === 'snapshot') {
+          live.clear();
+          message.asteroids?.forEach((a) => live.set(a.id, a));
+        } else if (message.type === 'changes') {
+          message.removed?.forEach((id) => live.delete(id));
+          [...(message.added ?? []), ...(message.updated ?? [])].forEach((a) => live.set(a.id, a));
+        }
+        setIsConnected(!message.upstream_error);
+        publish();
+      },
+      () => {
+        if (!streaming && !pollTimer) {
+          // Backend without the stream (plain Flask server): poll every 5 minutes instead
+          unsubscribe();
+          loadHazardous();
+          pollTimer = setInterval(loadHazardous, 5 * 60 * 1000);
+        } else {
+          setIsConnected(false);
+        }
+      }
+    );
+
+    const statsInterval = setInterval(loadStats, 5 * 60 * 1000);
+    return () => {
+      unsubscribe();
+      clearInterval(statsInterval);
+      if (pollTimer) clearInterval(pollTimer);
+    };
   }, []);
 
   const checkConnection = async () => {
@@ -65,17 +106,27 @@ const RealTimeNEODashboard: React.FC<RealTimeNEODashboardProps> = ({
     }
   };
 
-  const loadData = async () => {
+  const loadHazardous = async () => {
     setIsLoading(true);
     try {
-      const [hazardousData, statsData] = await Promise.all([
-        nasaService.getHazardousAsteroids(),
-        nasaService.getNEOStats()
-      ]);
+      const hazardousData = await nasaService.getHazardousAsteroids();
 
       // Backend returns { success, count, asteroids }
       const list = Array.isArray(hazardousData?.asteroids) ? hazardousData.asteroids : [];
       setHazardousAsteroids(list.slice(0, 10));
+      setLastUpdate(new Date());
+      setIsConnected(true);
+    } catch (error) {
+      console.error('Error loading NEO data:', error);
+      setIsConnected(false);
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
+  const loadStats = async () => {
+    try {
+      const statsData = await nasaService.getNEOStats();
 
       // Backend returns { success, statistics: { total_discovered, potentially_hazardous, ... } }
       const stats = statsData?.statistics;
@@ -87,17 +138,16 @@ const RealTimeNEODashboard: React.FC<RealTimeNEODashboardProps> = ({
       } else {
         setNeoStats(null);
       }
-
-      setLastUpdate(new Date());
-      setIsConnected(true);
     } catch (error) {
-      console.error('Error loading NEO data:', error);
-      setIsConnected(false);
-    } finally {
-      setIsLoading(false);
+      console.error('Error loading NEO stats:', error);
     }
   };
 
+  const refresh = () => {
+    loadStats();
+    loadHazardous();
+  };
+
   const handleAsteroidClick = (asteroid: HazardAsteroid) => {
     setSelectedAsteroid(asteroid);
     onAsteroidSelect?.(asteroid as any);
@@ -159,7 +209,7 @@ const RealTimeNEODashboard: React.FC<RealTimeNEODashboardProps> = ({
         
         <div className="flex items-center gap-2">
           <button
-            onClick={loadData}
+            onClick={refresh}
             disabled={isLoading}
             className="p-2 bg-blue-600/20 hover:bg-blue-600/40 rounded-lg transition-colors"
           >
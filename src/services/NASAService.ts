@@ -56,6 +56,19 @@ export interface ImpactSimulation {
   };
 }
 
+// Messages on the backend /api/neo/stream feed: a snapshot on connect, then only changes
+export interface HazardFeedMessage<T extends { id: string }> {
+  type: 'snapshot' | 'changes' | 'status';
+  sequence: number;
+  model: string;
+  count?: number;
+  asteroids?: T[];
+  added?: T[];
+  updated?: Array<T & { changed: string[] }>;
+  removed?: string[];
+  upstream_error?: string | null;
+}
+
 class NASAService {
   private baseUrl: string;
 
@@ -103,6 +116,20 @@ class NASAService {
     }
   }
 
+  // Returns an unsubscribe function; onError fires whenever the stream drops (EventSource retries by itself)
+  subscribeHazardousAsteroids<T extends { id: string }>(
+    onMessage: (message: HazardFeedMessage<T>) => void,
+    onError?: () => void
+  ): () => void {
+    const source = new EventSource(`${this.baseUrl}/neo/stream`);
+    const handler = (event: MessageEvent) => onMessage(JSON.parse(event.data));
+    for (const type of ['snapshot', 'changes', 'status']) {
+      source.addEventListener(type, handler as EventListener);
+    }
+    source.onerror = () => onError?.();
+    return () => source.close();
+  }
+
   async getNEODetails(asteroidId: string): Promise<NEOData> {
     try {
       const response = await fetch(`${this.baseUrl}/neo/lookup/${asteroidId}`);